@@ -6,41 +6,84 @@ It sets up logging, database connections, middleware, and defines all API endpoi
 """
 
 from supabase import create_client, Client
-from openai import OpenAI
-from fastapi import FastAPI, HTTPException, Request
+from openai import AsyncOpenAI
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, StringConstraints, field_validator
 from dotenv import load_dotenv
 import os
+import secrets
 from services.search_service import SearchService
 from services.embedding_service import EmbeddingService
-from services.query_service import QueryService
+from services.embedding_cache import EmbeddingCache
+from services.cache import LRUCache
+from services.semantic_cache import SemanticCache
+from services.recommendation_service import RecommendationService
+from services.deadline import Deadline
+from services.single_flight import SingleFlight
+from services.resilience import CircuitOpenError, Dependency, ResiliencePolicy
+from services.query_service import QueryService, MATCH_COUNT, MAX_MATCH_COUNT
+from services.ranking import DEFAULT_RANKING_WEIGHTS, RankingWeights
+from services.projection import DEFAULT_ITEM_FIELDS, DEFAULT_SEARCH_FIELDS, ITEM_FIELDS, SEARCH_FIELDS, parse_fields
+from services.local_query_service import LocalQueryService
+from services.postgres_query_service import DEFAULT_EF_SEARCH, PostgresQueryService
+from services.hnsw_index import HNSWIndex
+from services.quantized_store import QuantizedEmbeddingStore
+from services.serialization import ORJSONResponse, dumps_json, negotiated_response
+from services.compression import CompressionMiddleware
+from services.metrics import MetricsMiddleware, StatsCollector
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+from services.structured_logging import RequestIdMiddleware, configure_logging
 from pathlib import Path
 import logging
-from typing import Dict, Any, List
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(pathname)s:%(lineno)d - %(funcName)s() - %(message)s',
-    handlers=[
-        logging.FileHandler("logs/app.log"),
-        logging.StreamHandler()
-    ]
-)
-logger: logging.Logger = logging.getLogger(__name__)
+from typing import Annotated, Dict, Any, List, AsyncIterator, Optional
 
 # Load data from .env file
 ENV_FILE_PATH: Path = Path(__file__).parent.parent/".env"
 load_dotenv(ENV_FILE_PATH)
 
-# Create supabase and openai clients
+# Log JSON lines from a background thread, so requests never wait on disk
+configure_logging(
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper()),
+    log_path=os.getenv("LOG_PATH", "logs/app.log") or None,
+    debug_sample_rate=float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))
+)
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Create supabase and openai clients; OpenAI calls are retried by their
+# Dependency below, so the SDK's own retries are turned off
 supabase_client: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
-openai_client: OpenAI = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+openai_client: AsyncOpenAI = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
-# Create FastAPI app
-app: FastAPI = FastAPI(title="Fashion Query API")
+# Retries, hedging and circuit breakers for calls to OpenAI and Supabase
+resilience_policy: ResiliencePolicy = ResiliencePolicy(
+    max_retries=int(os.getenv("RESILIENCE_MAX_RETRIES", "2")),
+    backoff_base=float(os.getenv("RESILIENCE_BACKOFF_BASE_MS", "100")) / 1000,
+    backoff_max=float(os.getenv("RESILIENCE_BACKOFF_MAX_MS", "2000")) / 1000,
+    hedging=os.getenv("HEDGING", "true").lower() == "true",
+    hedge_percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+    hedge_min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+)
+openai_dependency: Dependency = Dependency("openai", resilience_policy)
+supabase_dependency: Dependency = Dependency("supabase", resilience_policy)
+
+# Create FastAPI app, rendering JSON with orjson
+app: FastAPI = FastAPI(title="Fashion Query API", default_response_class=ORJSONResponse)
+
+# Compress large responses with Brotli or gzip
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    gzip_level=int(os.getenv("GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("BROTLI_QUALITY", "4"))
+)
+
+# Time each request and report the breakdown in a Server-Timing header
+app.add_middleware(MetricsMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -51,22 +94,248 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-class QueryRequest(BaseModel):
+# Tag every log record and response with a request ID; added last so that it
+# wraps all other middleware
+app.add_middleware(RequestIdMiddleware)
+
+# Maximum number of items fetched by one bulk lookup
+ITEMS_MAX_ASINS: int = int(os.getenv("ITEMS_MAX_ASINS", "100"))
+
+# Token that administrative endpoints require in the X-Admin-Token header;
+# they are disabled while it is unset
+ADMIN_TOKEN: Optional[str] = os.getenv("ADMIN_TOKEN") or None
+
+# Longest search prompt accepted, in characters
+PROMPT_MAX_LENGTH: int = int(os.getenv("PROMPT_MAX_LENGTH", "1000"))
+# A search prompt; empty prompts are rejected, since OpenAI cannot embed them
+Prompt = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=PROMPT_MAX_LENGTH)]
+
+# Limits of the batch search endpoint
+BATCH_MAX_PROMPTS: int = int(os.getenv("BATCH_MAX_PROMPTS", "1000"))
+BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Default time budget of a search, overridden per request by X-Timeout-Ms
+SEARCH_TIMEOUT_MS: Optional[int] = int(os.getenv("SEARCH_TIMEOUT_MS")) if os.getenv("SEARCH_TIMEOUT_MS") else None
+
+# Longest a client can long-poll for a deferred recommendation, in seconds
+RECOMMENDATION_MAX_WAIT_SECONDS: float = float(os.getenv("RECOMMENDATION_MAX_WAIT_SECONDS", "30"))
+
+class RankingWeightsRequest(BaseModel):
+    """
+    Per-request overrides of the weights used to rank search results.
+    
+    Attributes:
+        similarity (Optional[float]): Weight for semantic similarity to the prompt
+        rating (Optional[float]): Weight for the average rating
+        popularity (Optional[float]): Weight for the number of ratings
+        min_ratings (Optional[int]): Number of ratings needed for full confidence
+                                     in an item's average rating
+    """
+    similarity: Optional[float] = Field(default=None, ge=0)
+    rating: Optional[float] = Field(default=None, ge=0)
+    popularity: Optional[float] = Field(default=None, ge=0)
+    min_ratings: Optional[int] = Field(default=None, ge=1)
+
+class RankedRequest(BaseModel):
+    """
+    Base for search requests that may override the ranking weights and the
+    fields returned for each item.
+    
+    Attributes:
+        ranking_weights (Optional[RankingWeightsRequest]): Weights to use instead
+            of the defaults when ranking results
+        fields (Optional[List[str]]): Fields to return for each item, "*" for all
+            of them, or None for a compact default set
+    """
+    ranking_weights: Optional[RankingWeightsRequest] = None
+    fields: Optional[List[str]] = None
+    
+    @field_validator("fields")
+    @classmethod
+    def check_fields(cls, fields: Optional[List[str]]) -> Optional[List[str]]:
+        """
+        Reject unknown fields and expand "*".
+        """
+        if fields is None:
+            return None
+        return list(parse_fields(fields, SEARCH_FIELDS, DEFAULT_SEARCH_FIELDS))
+    
+    def weights(self) -> Optional[RankingWeights]:
+        """
+        Combine the requested ranking weights with the defaults.
+        
+        Returns:
+            Optional[RankingWeights]: The weights to rank with, or None if no
+                                      overrides were requested
+        """
+        if self.ranking_weights is None:
+            return None
+        return DEFAULT_RANKING_WEIGHTS.with_overrides(self.ranking_weights.model_dump())
+
+class QueryRequest(RankedRequest):
     """
     Represents a search query request.
     
     Attributes:
-        prompt (str): The search text provided by the user
+        prompt (Prompt): The search text provided by the user
+    """
+    prompt: Prompt
+
+class InvalidateItemsRequest(BaseModel):
     """
-    prompt: str
+    Represents a request to drop changed items from the item cache.
+    
+    Attributes:
+        asins (List[str]): Parent ASINs of the products that were rewritten
+    """
+    asins: List[str]
+
+class BatchQueryRequest(RankedRequest):
+    """
+    Represents a batch of search queries.
+    
+    Attributes:
+        prompts (List[Prompt]): The search texts, at most BATCH_MAX_PROMPTS of them
+        include_recommendation (bool): Whether to generate a recommendation for
+            each prompt, which adds an LLM call per prompt
+    """
+    prompts: List[Prompt] = Field(min_length=1, max_length=BATCH_MAX_PROMPTS)
+    include_recommendation: bool = False
         
 # Initialize services
-embedding_service: EmbeddingService = EmbeddingService(openai_client)
-query_service: QueryService = QueryService(supabase_client)
-search_service: SearchService = SearchService(openai_client, embedding_service, query_service)
+embedding_cache: EmbeddingCache = EmbeddingCache(
+    max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+    db_path=os.getenv("EMBEDDING_CACHE_PATH") or None
+)
+embedding_service: EmbeddingService = EmbeddingService(openai_client, embedding_cache, openai_dependency)
+# Vector search runs in Supabase by default, through PostgREST or a direct
+# Postgres connection, or in-process on a local copy of the catalog
+query_service: Any
+item_cache: LRUCache = LRUCache(
+    max_size=int(os.getenv("ITEM_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("ITEM_CACHE_TTL_SECONDS", "3600"))
+)
+if os.getenv("QUERY_BACKEND", "supabase") == "local":
+    # A prebuilt HNSW index is memory-mapped so startup does not copy it into memory
+    hnsw_index = HNSWIndex.load(os.getenv("HNSW_INDEX_PATH")) if os.getenv("HNSW_INDEX_PATH") else None
+    if hnsw_index is not None and os.getenv("HNSW_EF_SEARCH"):
+        hnsw_index.ef_search = int(os.getenv("HNSW_EF_SEARCH"))
+    # Workers started by serve.py map a catalog saved once for all of them,
+    # so each worker adds little memory beyond its caches
+    shared_catalog_path = os.getenv("LOCAL_SHARED_CATALOG_PATH") or None
+    # Quantized embeddings cut the memory of the exact scan by about 4x
+    embedding_store = (
+        QuantizedEmbeddingStore.load(os.getenv("EMBEDDING_STORE_PATH"), mmap=shared_catalog_path is not None)
+        if os.getenv("EMBEDDING_STORE_PATH") else None
+    )
+    if shared_catalog_path is not None:
+        query_service = LocalQueryService.load(shared_catalog_path, hnsw_index, embedding_store)
+    else:
+        query_service = LocalQueryService.from_dataset(
+            os.getenv("LOCAL_CATALOG_PATH", Path(__file__).parent.parent/"scripts"/"data"/"amazon_fashion_sample"),
+            hnsw_index,
+            embedding_store
+        )
+elif os.getenv("QUERY_BACKEND") == "postgres":
+    query_service = PostgresQueryService(
+        os.getenv("POSTGRES_DSN"),
+        item_cache,
+        supabase_dependency,
+        min_pool_size=int(os.getenv("POSTGRES_POOL_MIN_SIZE", "2")),
+        max_pool_size=int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10")),
+        ef_search=int(os.getenv("POSTGRES_EF_SEARCH", str(DEFAULT_EF_SEARCH)))
+    )
+else:
+    query_service = QueryService(supabase_client, item_cache, supabase_dependency)
+filter_cache: LRUCache = LRUCache(
+    max_size=int(os.getenv("FILTER_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("FILTER_CACHE_TTL_SECONDS", "86400"))
+)
+response_cache: SemanticCache = SemanticCache(
+    max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY_THRESHOLD", "0.97"))
+)
+# Queries and ranked candidates that later pages of a search are served from
+cursor_cache: LRUCache = LRUCache(
+    max_size=int(os.getenv("CURSOR_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("CURSOR_TTL_SECONDS", "600"))
+)
+# Recommendations are generated in the background unless disabled
+recommendation_service: Optional[RecommendationService] = (
+    RecommendationService(
+        LRUCache(
+            max_size=int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("RECOMMENDATION_TTL_SECONDS", "3600"))
+        ),
+        max_concurrency=int(os.getenv("RECOMMENDATION_CONCURRENCY", "8")),
+        max_queue_size=int(os.getenv("RECOMMENDATION_QUEUE_SIZE", "100"))
+    )
+    if os.getenv("DEFERRED_RECOMMENDATIONS", "true").lower() == "true" else None
+)
+# Store names the filter fast path may extract, listed one per line in a file
+# or taken from the local catalog; without them, prompts naming a store go to the LLM
+known_stores: Optional[List[str]] = None
+if os.getenv("FILTER_STORES_PATH"):
+    known_stores = Path(os.getenv("FILTER_STORES_PATH")).read_text().splitlines()
+elif isinstance(query_service, LocalQueryService):
+    known_stores = sorted({store for store in query_service.stores.tolist() if store})
+search_service: SearchService = SearchService(
+    openai_client,
+    embedding_service,
+    query_service,
+    filter_cache,
+    response_cache,
+    use_filter_parser=os.getenv("FILTER_FAST_PATH", "true").lower() == "true",
+    cursor_cache=cursor_cache,
+    recommendation_service=recommendation_service,
+    openai_dependency=openai_dependency,
+    single_flight=SingleFlight() if os.getenv("SINGLE_FLIGHT", "true").lower() == "true" else None,
+    known_stores=known_stores
+)
+
+# Workers started by serve.py write their metrics to files, aggregated when
+# /metrics is scraped; the counters kept by each worker are only in /stats
+metrics_registry: CollectorRegistry = REGISTRY
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    metrics_registry = CollectorRegistry()
+    MultiProcessCollector(metrics_registry)
+else:
+    # Expose cache and dependency counters to Prometheus, read when /metrics is scraped
+    REGISTRY.register(StatsCollector(
+        caches={
+            "embedding": embedding_cache.stats,
+            "filter": filter_cache.stats,
+            "response": response_cache.stats,
+            "cursor": cursor_cache.stats,
+            "item": lambda: query_service.item_cache.stats() if getattr(query_service, "item_cache", None) else None,
+            "filter_fast_path": lambda: search_service.filter_parser.stats() if search_service.filter_parser else None
+        },
+        dependencies={dependency.name: dependency.stats for dependency in (openai_dependency, supabase_dependency)}
+    ))
+
+def service_unavailable(error: CircuitOpenError) -> HTTPException:
+    """
+    Build the error returned while a dependency's circuit breaker is open.
+    
+    Args:
+        error (CircuitOpenError): The error raised instead of calling the dependency
+        
+    Returns:
+        HTTPException: A 503 error asking the client to retry once the breaker may have closed
+    """
+    logger.warning({
+        "event": "circuit_open",
+        "dependency": error.dependency
+    })
+    return HTTPException(
+        status_code=503,
+        detail=f"{error.dependency} is unavailable",
+        headers={"Retry-After": str(int(resilience_policy.reset_timeout))}
+    )
     
 @app.get("/")
-def default_message() -> Dict[str, str]:
+async def default_message() -> Dict[str, str]:
     """
     Root endpoint that provides a welcome message.
     
@@ -75,26 +344,75 @@ def default_message() -> Dict[str, str]:
     """
     return {"message": "Welcome to the Fashion Query API"}
 
+@app.get("/stats")
+async def get_stats() -> Dict[str, Any]:
+    """
+    Reports cache and fast-path statistics for monitoring.
+    
+    Returns:
+        Dict[str, Any]: Hit/miss counters for each cache used by the API, the
+            hit rate of the rule-based filter parser and the retry, hedging and
+            circuit breaker counters of each external dependency
+    """
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "filter_cache": filter_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "cursor_cache": cursor_cache.stats(),
+        "recommendations": recommendation_service.stats() if recommendation_service else None,
+        "single_flight": search_service.single_flight.stats() if search_service.single_flight else None,
+        "item_cache": query_service.item_cache.stats() if getattr(query_service, "item_cache", None) else None,
+        "filter_fast_path": search_service.filter_parser.stats() if search_service.filter_parser else None,
+        "dependencies": {dependency.name: dependency.stats() for dependency in (openai_dependency, supabase_dependency)}
+    }
+
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    """
+    Exposes Prometheus metrics.
+    
+    Returns:
+        Response: Search stage and request latency histograms, OpenAI token and
+            result counts, and the cache and dependency counters reported by `/stats`;
+            with several workers, only the histograms and counts, summed over workers
+    """
+    return Response(generate_latest(metrics_registry), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/search")
-def semantic_search(request: QueryRequest) -> Dict[str, Any]:
+async def semantic_search(
+    request: QueryRequest,
+    http_request: Request,
+    x_timeout_ms: Optional[int] = Header(default=None, ge=1)
+) -> Response:
     """
     Endpoint for semantic search of fashion products.
     
     Performs a semantic search using the provided query prompt and returns
-    matching fashion products.
+    matching fashion products. Given a deadline, through the X-Timeout-Ms
+    header or SEARCH_TIMEOUT_MS, stages that cannot finish in time are
+    skipped and listed in the response's "skipped_stages".
     
     Args:
         request (QueryRequest): Request object containing the search prompt
+        http_request (Request): The HTTP request, used to negotiate the response format
+        x_timeout_ms (Optional[int]): Milliseconds the client is willing to wait
         
     Returns:
-        Dict[str, Any]: Search results containing matched products and metadata
+        Response: Search results containing matched products and metadata, as
+            JSON or, if accepted, MessagePack
         
     Raises:
-        HTTPException: 500 error if search processing fails
+        HTTPException: 503 error if OpenAI's circuit breaker is open, 500 error
+            if search processing fails
     """
     try:
-        response: Dict[str, Any] = search_service.search(request.prompt)
-        return response
+        deadline = Deadline.from_milliseconds(x_timeout_ms or SEARCH_TIMEOUT_MS)
+        response: Dict[str, Any] = await search_service.search(
+            request.prompt, request.weights(), request.fields, deadline
+        )
+        return negotiated_response(http_request, response)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
         # Log the error for internal monitoring
         logger.error({
@@ -104,22 +422,257 @@ def semantic_search(request: QueryRequest) -> Dict[str, Any]:
         # Return a user-friendly error message
         raise HTTPException(status_code=500)
 
+@app.post("/search/stream")
+async def semantic_search_stream(request: QueryRequest) -> StreamingResponse:
+    """
+    Streaming endpoint for semantic search of fashion products.
+    
+    Performs the same search as `/search`, but returns newline-delimited JSON
+    (NDJSON) events so clients can render the extracted filters and ranked
+    products before the recommendation has been generated. The recommendation
+    text is streamed as it is produced by the model.
+    
+    Args:
+        request (QueryRequest): Request object containing the search prompt
+        
+    Returns:
+        StreamingResponse: An NDJSON stream of search events (see
+            `SearchService.search_stream`), ending with a "done" event or an
+            "error" event if the search fails part way through
+    """
+    async def event_stream() -> AsyncIterator[bytes]:
+        try:
+            async for event in search_service.search_stream(request.prompt, request.weights(), request.fields):
+                yield dumps_json(event) + b"\n"
+        except Exception as e:
+            # Log the error for internal monitoring
+            logger.error({
+                "event": "search_stream_error",
+                "error": str(e)
+            })
+            # The status code has already been sent, so report the failure in-band
+            yield dumps_json({"event": "error"}) + b"\n"
+            
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@app.post("/search/batch")
+async def semantic_search_batch(request: BatchQueryRequest, http_request: Request) -> Response:
+    """
+    Endpoint for semantic search of many prompts in one request.
+    
+    All prompts are embedded with a single OpenAI call, and the remaining
+    stages run for up to BATCH_MAX_CONCURRENCY prompts at a time. A failure
+    for one prompt is reported in its result instead of failing the batch;
+    if the shared OpenAI call fails, each prompt is embedded on its own.
+    
+    Args:
+        request (BatchQueryRequest): Request object containing the search prompts
+        http_request (Request): The HTTP request, used to negotiate the response format
+        
+    Returns:
+        Response: Search results for each prompt, in input order, in the
+            "results" key; failed prompts have an "error" field instead
+    """
+    results = await search_service.search_batch(
+        request.prompts,
+        include_recommendation=request.include_recommendation,
+        ranking_weights=request.weights(),
+        fields=request.fields,
+        max_concurrency=BATCH_MAX_CONCURRENCY
+    )
+    failures = sum("error" in result for result in results)
+    if failures:
+        logger.error({
+            "event": "search_batch_error",
+            "failed_prompts": failures,
+            "total_prompts": len(results)
+        })
+    return negotiated_response(http_request, {"results": results})
+
+@app.get("/search/next")
+async def next_search_page(
+    http_request: Request,
+    cursor: str,
+    page_size: int = Query(default=MATCH_COUNT, ge=1, le=MAX_MATCH_COUNT)
+) -> Response:
+    """
+    Endpoint for the next page of a previous search's results.
+    
+    The first call for a search fetches its remaining candidates from the
+    database with the prompt embedding cached by `/search` or `/search/stream`;
+    later pages are served from the cache. OpenAI is never called again.
+    
+    Args:
+        http_request (Request): The HTTP request, used to negotiate the response format
+        cursor (str): Cursor returned with the previous page
+        page_size (int): Number of items to return
+        
+    Returns:
+        Response: The next page of items in "response" and the cursor for
+            the following page in "cursor" (None on the last page)
+        
+    Raises:
+        HTTPException: 404 error if the cursor is invalid or has expired, or 503
+            error if the database's circuit breaker is open
+    """
+    try:
+        page = await search_service.next_page(cursor, page_size)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Cursor not found or expired")
+    return negotiated_response(http_request, page)
+
+@app.get("/recommendations/{recommendation_id}")
+async def get_recommendation(
+    recommendation_id: str,
+    wait: float = Query(default=0, ge=0, le=RECOMMENDATION_MAX_WAIT_SECONDS)
+) -> Dict[str, Any]:
+    """
+    Endpoint for the recommendation of a previous search.
+    
+    `/search` returns a `recommendation_id` while the recommendation is still
+    being generated. Clients can poll this endpoint, or long-poll by passing
+    `wait`, which holds the request until the recommendation is ready or the
+    given number of seconds has passed.
+    
+    Args:
+        recommendation_id (str): ID returned by `/search`
+        wait (float): Maximum number of seconds to wait for a pending recommendation
+        
+    Returns:
+        Dict[str, Any]: The recommendation's "id", its "status" ("pending", "done"
+            or "failed") and the "recommendation" text once it is done
+        
+    Raises:
+        HTTPException: 404 error if the ID is unknown or has expired
+    """
+    if recommendation_service is None:
+        raise HTTPException(status_code=404, detail="Recommendations are not deferred")
+    result = await recommendation_service.wait(recommendation_id, wait)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Recommendation not found or expired")
+    return result
+
+@app.get("/items")
+async def get_items(http_request: Request, asins: str, fields: Optional[str] = None) -> Response:
+    """
+    Retrieves information for several products in one request.
+    
+    Cached items are served from memory and the rest are fetched with a
+    single database query that selects only the requested fields.
+    
+    Args:
+        http_request (Request): The HTTP request, used to negotiate the response format
+        asins (str): Comma-separated parent ASINs, at most ITEMS_MAX_ASINS of them
+        fields (Optional[str]): Comma-separated fields to return for each product,
+            "*" for all of them, or None for a compact default set
+            
+    Returns:
+        Response: The products found, in request order, in "items", and the
+            ASINs that do not exist in "missing"
+        
+    Raises:
+        HTTPException: 422 error if too many ASINs or unknown fields are requested,
+            503 error if Supabase's circuit breaker is open, 500 error if the lookup fails
+    """
+    parent_asins = list(dict.fromkeys(asin.strip() for asin in asins.split(",") if asin.strip()))
+    if len(parent_asins) > ITEMS_MAX_ASINS:
+        raise HTTPException(status_code=422, detail=f"At most {ITEMS_MAX_ASINS} ASINs can be requested at once")
+    try:
+        selected_fields = parse_fields(fields, ITEM_FIELDS, DEFAULT_ITEM_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        items: Dict[str, Dict[str, Any]] = await query_service.get_items(parent_asins, selected_fields)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
+    except Exception as e:
+        # Log the error for internal monitoring
+        logger.error({
+            "event": "get_items_error",
+            "error": str(e)
+        })
+        raise HTTPException(status_code=500)
+    logger.info({
+        "event": "get_items",
+        "requested": len(parent_asins),
+        "found": len(items)
+    })
+    return negotiated_response(http_request, {
+        "items": [items[asin] for asin in parent_asins if asin in items],
+        "missing": [asin for asin in parent_asins if asin not in items]
+    })
+
+def require_admin_token(x_admin_token: Optional[str]) -> None:
+    """
+    Checks the token sent to an administrative endpoint.
+    
+    Args:
+        x_admin_token (Optional[str]): Value of the X-Admin-Token header
+        
+    Raises:
+        HTTPException: 404 error if ADMIN_TOKEN is unset, so the endpoint is
+            disabled, or 401 error if the token is missing or wrong
+    """
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.post("/items/invalidate")
+async def invalidate_items(
+    request: InvalidateItemsRequest,
+    x_admin_token: Optional[str] = Header(default=None)
+) -> Dict[str, int]:
+    """
+    Drops rewritten products from the item cache.
+    
+    Called after products are upserted so `/items` stops serving their
+    previous data. Requires ADMIN_TOKEN in the X-Admin-Token header.
+    
+    Args:
+        request (InvalidateItemsRequest): Request object containing the changed ASINs
+        x_admin_token (Optional[str]): The administrative token
+        
+    Returns:
+        Dict[str, int]: The number of products that were cached, in "invalidated"
+        
+    Raises:
+        HTTPException: 404 error if ADMIN_TOKEN is unset, or 401 error if the
+            token is missing or wrong
+    """
+    require_admin_token(x_admin_token)
+    return {"invalidated": query_service.invalidate_items(request.asins)}
+
 @app.get("/items/{parent_asin}")
-def get_item(parent_asin: str) -> Dict[str, Any]:
+async def get_item(http_request: Request, parent_asin: str, fields: Optional[str] = None) -> Response:
     """
     Retrieves detailed information for a specific product.
     
     Args:
+        http_request (Request): The HTTP request, used to negotiate the response format
         parent_asin (str): The parent ASIN (Amazon Standard Identification Number)
             that uniquely identifies the product
+        fields (Optional[str]): Comma-separated fields to return, or None for
+            the complete product
             
     Returns:
-        Dict[str, Any]: Detailed product information
+        Response: Detailed product information
+        
+    Raises:
+        HTTPException: 404 error if the product does not exist, 422 error if
+            unknown fields are requested, 503 error if Supabase's circuit
+            breaker is open, 500 error if the lookup fails
     """
     try:
-        response: Dict[str, Any] = query_service.get_item(parent_asin)
-        logger.info(f"Retrieved item with parent_asin: {parent_asin}")
-        return response
+        selected_fields = parse_fields(fields, ITEM_FIELDS, ITEM_FIELDS) if fields is not None else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        response: Optional[Dict[str, Any]] = await query_service.get_item(parent_asin, selected_fields)
+    except CircuitOpenError as e:
+        raise service_unavailable(e)
     except Exception as e:
         # Log the error for internal monitoring
         logger.error({
@@ -127,6 +680,13 @@ def get_item(parent_asin: str) -> Dict[str, Any]:
             "error": str(e)
         })
         raise HTTPException(status_code=500)
+    if response is None:
+        raise HTTPException(status_code=404, detail=f"Item '{parent_asin}' not found")
+    logger.info({
+        "event": "get_item",
+        "parent_asin": parent_asin
+    })
+    return negotiated_response(http_request, response)
     
 @app.api_route("/{path_name:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"])
 async def catch_all(request: Request, path_name: str) -> JSONResponse:
@@ -143,7 +703,10 @@ async def catch_all(request: Request, path_name: str) -> JSONResponse:
     Returns:
         JSONResponse: A 404 response with an error message
     """
-    logger.info(f"Catch-all route called for path: {path_name}")
+    logger.info({
+        "event": "unknown_path",
+        "path": path_name
+    })
     return JSONResponse(
         status_code=404,
         content={"error": f"Path '/{path_name}' not found. Please check the documentation for the correct path."}
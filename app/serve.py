@@ -0,0 +1,193 @@
+"""
+Multi-Worker Server
+
+This script serves the API from several worker processes, so that requests
+are handled on every core instead of one. With QUERY_BACKEND=local, the
+catalog is first saved once in a memory-mappable format (see
+LocalQueryService.save), and every worker maps that copy read-only instead of
+loading the dataset itself, so adding workers adds little memory. The HNSW
+index and quantized embedding store, when configured, are memory-mapped by
+every worker as well.
+
+Run it from the app directory:
+
+    python serve.py --workers 4
+
+The saved catalog is rebuilt when the dataset or the quantized store is newer
+than it, or with --rebuild.
+
+Requests are not routed to the worker that served earlier ones, so features
+that keep state in a worker cannot be used with several workers: cursors of
+/search/next, deferred recommendations of /recommendations/{id}, and the item
+cache, which /items/invalidate only clears in one worker. The server refuses
+to start with more than one worker until they are turned off. Prometheus
+metrics are written by every worker to files in --metrics-dir and aggregated
+by /metrics; the cache and dependency counters of /stats stay per worker.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import uvicorn
+from dotenv import load_dotenv
+
+APP_DIR: Path = Path(__file__).resolve().parent
+ENV_FILE_PATH: Path = APP_DIR.parent/".env"
+DEFAULT_CATALOG_PATH: Path = APP_DIR.parent/"scripts"/"data"/"amazon_fashion_sample"
+
+
+def newest_modification(paths: List[Path]) -> float:
+    """
+    Find the latest modification time of a set of files and directories.
+
+    Args:
+        paths (List[Path]): Files or directories, searched recursively
+
+    Returns:
+        float: The latest modification time, or 0 if none of the paths exist
+    """
+    times = [0.0]
+    for path in paths:
+        if path.is_dir():
+            times.extend(file.stat().st_mtime for file in path.rglob("*") if file.is_file())
+        elif path.exists():
+            times.append(path.stat().st_mtime)
+    return max(times)
+
+
+def per_worker_features() -> List[str]:
+    """
+    List the enabled features whose state is kept by a single worker.
+
+    Returns:
+        List[str]: The setting that turns off each enabled feature, and the
+                   endpoint that would break
+    """
+    features = []
+    if int(os.getenv("CURSOR_CACHE_SIZE", "256")) > 0:
+        features.append("CURSOR_CACHE_SIZE=0 (cursors of /search/next)")
+    if os.getenv("DEFERRED_RECOMMENDATIONS", "true").lower() == "true":
+        features.append("DEFERRED_RECOMMENDATIONS=false (jobs of /recommendations/{id})")
+    # The local catalog has no item cache
+    if os.getenv("QUERY_BACKEND", "supabase") != "local" and int(os.getenv("ITEM_CACHE_SIZE", "10000")) > 0:
+        features.append("ITEM_CACHE_SIZE=0 (the item cache cleared by /items/invalidate)")
+    return features
+
+
+def prepare_metrics_directory(metrics_path: Optional[Path]) -> Path:
+    """
+    Empty the directory the workers write their Prometheus metrics to.
+
+    Args:
+        metrics_path (Optional[Path]): The directory, or None for a new temporary one
+
+    Returns:
+        Path: The empty directory
+    """
+    if metrics_path is None:
+        return Path(tempfile.mkdtemp(prefix="fashion-search-metrics-"))
+    # Files left by a previous run would be added to this run's metrics
+    shutil.rmtree(metrics_path, ignore_errors=True)
+    metrics_path.mkdir(parents=True)
+    return metrics_path
+
+
+def export_catalog(catalog_path: Path, shared_path: Path, embedding_store_path: Optional[Path]) -> None:
+    """
+    Load the dataset and save it in the format the workers map.
+
+    Run in its own process, so the server's supervisor does not keep a copy
+    of the dataset once it is saved.
+
+    Args:
+        catalog_path (Path): The embedded dataset
+        shared_path (Path): Directory to save the catalog to
+        embedding_store_path (Optional[Path]): The quantized store the workers
+                                               search, which orders the items
+    """
+    from services.local_query_service import LocalQueryService
+    from services.quantized_store import QuantizedEmbeddingStore
+
+    store = QuantizedEmbeddingStore.load(embedding_store_path, mmap=True) if embedding_store_path else None
+    LocalQueryService.from_dataset(catalog_path, store=store).save(shared_path)
+
+
+def prepare_shared_catalog(shared_path: Path, rebuild: bool) -> None:
+    """
+    Save the local catalog for the workers, unless an up-to-date copy exists.
+
+    Args:
+        shared_path (Path): Directory of the saved catalog
+        rebuild (bool): Whether to save it even if it is up to date
+    """
+    catalog_path = Path(os.getenv("LOCAL_CATALOG_PATH", DEFAULT_CATALOG_PATH))
+    embedding_store_path = Path(os.getenv("EMBEDDING_STORE_PATH")) if os.getenv("EMBEDDING_STORE_PATH") else None
+    sources = [catalog_path] + ([embedding_store_path] if embedding_store_path else [])
+
+    meta_path = shared_path/"meta.json"
+    if not rebuild and meta_path.exists() and meta_path.stat().st_mtime >= newest_modification(sources):
+        print(f"Using the saved catalog in {shared_path}")
+        return
+
+    print(f"Saving the catalog from {catalog_path} to {shared_path}")
+    process = multiprocessing.get_context("spawn").Process(
+        target=export_catalog, args=(catalog_path, shared_path, embedding_store_path)
+    )
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise SystemExit(f"Saving the catalog failed with exit code {process.exitcode}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Serve the API from several worker processes')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to bind (default: 8000)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Worker processes (default: the number of CPUs)')
+    parser.add_argument('--shared-catalog-path', type=Path, default=None,
+                        help='Directory of the catalog mapped by the workers when QUERY_BACKEND=local '
+                             '(default: LOCAL_SHARED_CATALOG_PATH, or the dataset path with a "_shared" suffix)')
+    parser.add_argument('--rebuild', action='store_true', help='Save the catalog even if it is up to date')
+    parser.add_argument('--metrics-dir', type=Path, default=None,
+                        help='Directory emptied on startup where the workers write Prometheus metrics '
+                             '(default: a new temporary directory)')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    load_dotenv(ENV_FILE_PATH)
+
+    if args.workers > 1:
+        features = per_worker_features()
+        if features:
+            raise SystemExit(
+                "Requests are not routed to the same worker, so these features only work with one "
+                f"worker. Turn them off to use {args.workers} workers:\n  " + "\n  ".join(features)
+            )
+        # Every worker writes its metrics to files, which /metrics aggregates
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(prepare_metrics_directory(args.metrics_dir))
+
+    if os.getenv("QUERY_BACKEND", "supabase") == "local":
+        shared_path = args.shared_catalog_path or Path(os.getenv(
+            "LOCAL_SHARED_CATALOG_PATH",
+            f"{os.getenv('LOCAL_CATALOG_PATH', DEFAULT_CATALOG_PATH)}_shared"
+        ))
+        shared_path = shared_path.resolve()
+        prepare_shared_catalog(shared_path, args.rebuild)
+        # Workers inherit the environment and load the saved catalog instead of the dataset
+        os.environ["LOCAL_SHARED_CATALOG_PATH"] = str(shared_path)
+
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, app_dir=str(APP_DIR))
@@ -0,0 +1,26 @@
+"""
+Atomic Write Module
+
+This module writes the files of saved indexes, stores and catalogs, which
+running processes may have memory-mapped. Each file is written under a
+temporary name and then moved into place, so readers see either the previous
+version or the complete new one, never a partial file.
+"""
+
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Callable
+
+
+def write_atomically(path: Path, write: Callable[[BinaryIO], Any]) -> None:
+    """
+    Write a file under a temporary name in the same directory, then rename it into place.
+
+    Args:
+        path (Path): The file to write
+        write (Callable[[BinaryIO], Any]): Function writing the contents to an open binary file
+    """
+    temporary_path = path.with_name(f".{path.name}.tmp")
+    with open(temporary_path, "wb") as file:
+        write(file)
+    os.replace(temporary_path, path)
@@ -0,0 +1,143 @@
+"""
+Cache Module
+
+This module provides the in-process caching primitives shared by the services,
+including prompt normalization for cache keys and a size-bounded LRU cache
+with optional expiry.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Matches runs of whitespace to be collapsed when normalizing prompts
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a search prompt for use in cache keys.
+
+    Prompts that differ only in case or whitespace produce the same results,
+    so they are mapped to the same key.
+
+    Args:
+        prompt (str): The user's search query
+
+    Returns:
+        str: The lowercased prompt with surrounding whitespace removed and
+             internal whitespace collapsed to single spaces
+    """
+    return WHITESPACE_PATTERN.sub(" ", prompt).strip().lower()
+
+
+class LRUCache:
+    """
+    A thread-safe, size-bounded least-recently-used cache.
+
+    When the cache is full, inserting a new key evicts the entry that was
+    read or written least recently. If a TTL is given, entries also expire
+    that many seconds after they were written. Hits and misses are counted
+    so callers can report how effective the cache is.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size (int): Maximum number of entries to keep
+            ttl_seconds (Optional[float]): Lifetime of each entry in seconds,
+                                           or None for entries that never expire
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        # Maps each key to a (expiry time, value) pair
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Retrieve a value and mark it as most recently used.
+
+        Args:
+            key (Hashable): The cache key
+
+        Returns:
+            Optional[Any]: The cached value, or None if the key is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key (Hashable): The cache key
+            value (Any): The value to cache
+        """
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> bool:
+        """
+        Remove an entry, for example when the value it caches has changed.
+
+        Args:
+            key (Hashable): The cache key
+
+        Returns:
+            bool: True if the key was cached
+        """
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report the cache's size and hit/miss counters.
+
+        Returns:
+            Dict[str, int]: The number of entries, capacity, hits, misses and
+                            expired entries
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,147 @@
+"""
+Compression Module
+
+This module provides ASGI middleware that compresses response bodies with
+Brotli or gzip, chosen from the client's Accept-Encoding header. Brotli is
+only offered when the brotli package is installed. Streamed responses, such
+as the NDJSON search stream, are passed through untouched so that each event
+still reaches the client as soon as it is sent.
+"""
+
+import gzip
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best supported encoding accepted by the client.
+
+    Args:
+        accept_encoding (str): The Accept-Encoding request header
+
+    Returns:
+        Optional[str]: "br", "gzip", or None if neither is accepted
+    """
+    accepted = {}
+    for entry in accept_encoding.split(","):
+        coding, _, params = entry.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    available: List[str] = (["br"] if brotli is not None else []) + ["gzip"]
+    for coding in available:
+        if accepted.get(coding, accepted.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compress complete response bodies above a size threshold.
+
+    Small bodies are sent as they are, since compressing them costs more time
+    than it saves on the wire.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4
+    ) -> None:
+        """
+        Initialize the middleware.
+
+        Args:
+            app (ASGIApp): The application to wrap
+            minimum_size (int): Smallest body, in bytes, that is compressed
+            gzip_level (int): gzip compression level (1-9)
+            brotli_quality (int): Brotli quality (0-11); low values suit dynamic responses
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """
+        Compress a body with the given encoding.
+
+        Args:
+            body (bytes): The response body
+            encoding (str): "br" or "gzip"
+
+        Returns:
+            bytes: The compressed body
+        """
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        streaming = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, streaming
+            if message["type"] == "http.response.start":
+                # Hold the headers back until the body shows whether to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            if streaming:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                # Streamed, small or already encoded bodies are sent unchanged
+                streaming = message.get("more_body", False)
+                await send(start_message)
+                await send(message)
+                return
+
+            body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
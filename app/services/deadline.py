@@ -0,0 +1,88 @@
+"""
+Deadline Module
+
+This module tracks a request's time budget. A search is split into stages
+that must each finish by a fixed fraction of the request's deadline, so a
+slow stage is abandoned early enough for the later stages to still run.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class StageBudgets:
+    """
+    Fractions of a request's deadline by which each search stage must finish.
+
+    Filter extraction and the prompt embedding start together, so their
+    budgets both count from the start of the request.
+
+    Attributes:
+        filters (float): Cutoff for extracting filters from the prompt
+        embedding (float): Cutoff for embedding the prompt
+        database (float): Cutoff for querying and ranking the items
+        recommendation (float): Cutoff for generating the recommendation
+    """
+    filters: float = 0.5
+    embedding: float = 0.5
+    database: float = 0.8
+    recommendation: float = 1.0
+
+
+DEFAULT_STAGE_BUDGETS = StageBudgets()
+
+
+class Deadline:
+    """
+    Point in time by which a request must be answered.
+    """
+
+    def __init__(self, timeout_seconds: Optional[float] = None) -> None:
+        """
+        Start the deadline's clock.
+
+        Args:
+            timeout_seconds (Optional[float]): Time allowed for the request, or
+                                               None for no deadline
+        """
+        self.timeout_seconds = timeout_seconds
+        self.started_at = time.monotonic()
+
+    @classmethod
+    def from_milliseconds(cls, timeout_ms: Optional[int]) -> "Deadline":
+        """
+        Create a deadline from a timeout in milliseconds, such as an X-Timeout-Ms header.
+
+        Args:
+            timeout_ms (Optional[int]): Time allowed for the request, or None for no deadline
+
+        Returns:
+            Deadline: The started deadline
+        """
+        return cls(timeout_ms / 1000 if timeout_ms is not None else None)
+
+    @property
+    def expires_at(self) -> Optional[float]:
+        """
+        Monotonic time at which the deadline passes, or None if there is no deadline.
+        """
+        if self.timeout_seconds is None:
+            return None
+        return self.started_at + self.timeout_seconds
+
+    def time_left(self, fraction: float = 1.0) -> Optional[float]:
+        """
+        Compute the time left until a fraction of the deadline has passed.
+
+        Args:
+            fraction (float): Fraction of the deadline by which a stage must finish
+
+        Returns:
+            Optional[float]: Seconds left, never negative, or None if there is no deadline
+        """
+        if self.timeout_seconds is None:
+            return None
+        cutoff = self.started_at + self.timeout_seconds * min(fraction, 1.0)
+        return max(cutoff - time.monotonic(), 0.0)
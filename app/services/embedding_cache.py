@@ -0,0 +1,231 @@
+"""
+Embedding Cache Module
+
+This module provides a two-tier cache for prompt embeddings. Vectors are kept
+in a bounded in-process LRU tier and, optionally, in a SQLite database on disk
+so that cached embeddings survive restarts. Disk reads run in a worker thread
+and disk writes are batched by a background writer, so the event loop never
+waits on SQLite.
+"""
+
+import asyncio
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from services.cache import LRUCache, normalize_prompt
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for prompt embeddings keyed on the normalized prompt and model name.
+
+    Embeddings are stored as packed float32 bytes rather than lists of Python
+    floats, which cuts the memory used by each cached 1536-d vector from
+    roughly 50 KB to 6 KB. Lookups check the in-process LRU tier first and
+    then the on-disk tier, promoting disk hits into memory. New embeddings
+    are written to disk after they are added to memory, in batches of up to
+    WRITE_BATCH_SIZE per transaction.
+    """
+
+    # Most embeddings committed to disk in one transaction
+    WRITE_BATCH_SIZE: int = 256
+
+    def __init__(self, max_size: int = 10000, db_path: Optional[Union[str, Path]] = None):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            max_size (int): Maximum number of embeddings kept in memory
+            db_path (Optional[Union[str, Path]]): Path of the SQLite database used as
+                                                  the persistent tier, or None to
+                                                  cache in memory only
+        """
+        self.memory = LRUCache(max_size)
+        self.disk_hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes: "queue.Queue[Tuple[str, bytes]]" = queue.Queue()
+
+        if db_path is not None:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+            # WAL keeps readers unblocked while an embedding is being written
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+            threading.Thread(target=self._write_batches, name="embedding-cache-writer", daemon=True).start()
+            # Write out pending embeddings before the process exits
+            atexit.register(self.flush)
+
+    @staticmethod
+    def _key(prompt: str, model: str) -> str:
+        """
+        Build the cache key for a prompt and embedding model.
+
+        Args:
+            prompt (str): The text that was embedded
+            model (str): Name of the embedding model
+
+        Returns:
+            str: The cache key
+        """
+        return f"{model}\x00{normalize_prompt(prompt)}"
+
+    async def get(self, prompt: str, model: str) -> Optional[List[float]]:
+        """
+        Look up the cached embedding for a prompt.
+
+        Args:
+            prompt (str): The text that was embedded
+            model (str): Name of the embedding model
+
+        Returns:
+            Optional[List[float]]: The cached embedding, or None on a miss
+        """
+        embeddings = await self.get_many([prompt], model)
+        return embeddings.get(prompt)
+
+    async def get_many(self, prompts: Sequence[str], model: str) -> Dict[str, List[float]]:
+        """
+        Look up the cached embeddings of several prompts.
+
+        Prompts missing from memory are read from disk together, in a worker
+        thread.
+
+        Args:
+            prompts (Sequence[str]): The texts that were embedded
+            model (str): Name of the embedding model
+
+        Returns:
+            Dict[str, List[float]]: The cached embedding of each prompt found
+        """
+        vectors: Dict[str, bytes] = {}
+        missing: Dict[str, str] = {}
+        for prompt in dict.fromkeys(prompts):
+            key = self._key(prompt, model)
+            vector = self.memory.get(key)
+            if vector is not None:
+                vectors[prompt] = vector
+            else:
+                missing[key] = prompt
+
+        if missing and self._db is not None:
+            rows = await asyncio.to_thread(self._read, list(missing))
+            for key, vector in rows:
+                vectors[missing.pop(key)] = vector
+                self.disk_hits += 1
+                self.memory.set(key, vector)
+
+        self.misses += len(missing)
+        return {prompt: np.frombuffer(vector, dtype=np.float32).tolist() for prompt, vector in vectors.items()}
+
+    def _read(self, keys: List[str]) -> List[Tuple[str, bytes]]:
+        """
+        Read embeddings from disk.
+
+        Args:
+            keys (List[str]): Cache keys to read
+
+        Returns:
+            List[Tuple[str, bytes]]: The key and packed vector of each stored embedding
+        """
+        placeholders = ", ".join("?" * len(keys))
+        with self._db_lock:
+            return self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys
+            ).fetchall()
+
+    def set(self, prompt: str, model: str, embedding: List[float]) -> None:
+        """
+        Store the embedding for a prompt in memory and queue it for the disk tier.
+
+        Args:
+            prompt (str): The text that was embedded
+            model (str): Name of the embedding model
+            embedding (List[float]): The embedding vector
+        """
+        key = self._key(prompt, model)
+        vector = np.asarray(embedding, dtype=np.float32).tobytes()
+        self.memory.set(key, vector)
+
+        if self._db is not None:
+            self._writes.put((key, vector))
+
+    def _write_batches(self) -> None:
+        """
+        Write queued embeddings to disk, committing each batch in one transaction.
+        """
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._db_lock:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", batch
+                    )
+                    self._db.commit()
+            except sqlite3.Error:
+                # Losing cached embeddings only costs later API calls
+                logger.exception({"event": "embedding_cache_write_error", "embeddings": len(batch)})
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+
+    def flush(self) -> None:
+        """
+        Wait until every queued embedding has been written to disk.
+        """
+        if self._db is not None:
+            self._writes.join()
+
+    def record_miss_latency(self, seconds: float) -> None:
+        """
+        Record how long an uncached embedding request took.
+
+        The average miss latency is used to estimate the time saved by hits.
+
+        Args:
+            seconds (float): Duration of the OpenAI embedding request
+        """
+        self.miss_seconds += seconds
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Report the cache's hit/miss counters and the latency it saved.
+
+        Returns:
+            Dict[str, Union[int, float]]: Memory and disk hits, misses, the
+                                          number of embeddings held in memory,
+                                          and the estimated seconds saved
+        """
+        memory_hits = self.memory.hits
+        hits = memory_hits + self.disk_hits
+        average_miss_seconds = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "memory_hits": memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / (hits + self.misses) if hits + self.misses else 0.0,
+            "memory_size": len(self.memory),
+            "memory_max_size": self.memory.max_size,
+            "estimated_seconds_saved": hits * average_miss_seconds
+        }
@@ -5,30 +5,49 @@ This module provides functionality for generating embeddings using OpenAI's API.
 It includes methods for generating prompt embeddings and handling embedding-related tasks.
 """
 
-from openai import OpenAI
-from typing import List, Any
+from openai import AsyncOpenAI
+from typing import Dict, List, Any, Optional
+import time
+from services.embedding_cache import EmbeddingCache
+from services.resilience import Dependency, call_dependency
+from services.metrics import record_token_usage
 
 class EmbeddingService:
     """
     Service for generating text embeddings using OpenAI's API.
     
     This service handles the creation of vector embeddings from text inputs,
-    which can be used for semantic search and similarity comparisons.
+    which can be used for semantic search and similarity comparisons. When an
+    embedding cache is provided, repeated prompts are served from the cache
+    instead of calling the API.
     """
     
     # Default embedding model to use
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    # Maximum number of inputs accepted by one embeddings request
+    MAX_BATCH_INPUTS: int = 2048
     
-    def __init__(self, openai_client: OpenAI):
+    def __init__(
+        self,
+        openai_client: AsyncOpenAI,
+        cache: Optional[EmbeddingCache] = None,
+        dependency: Optional[Dependency] = None
+    ):
         """
         Initialize the embedding service.
         
         Args:
-            openai_client (OpenAI): Initialized OpenAI client instance
+            openai_client (AsyncOpenAI): Initialized async OpenAI client instance
+            cache (Optional[EmbeddingCache]): Cache for previously generated prompt
+                                              embeddings, or None to disable caching
+            dependency (Optional[Dependency]): Retries, hedging and circuit breaker
+                                               for OpenAI calls, or None to call directly
         """
         self.openai_client = openai_client
+        self.cache = cache
+        self.dependency = dependency
         
-    def generate_prompt_embedding(self, prompt: str) -> List[float]:
+    async def generate_prompt_embedding(self, prompt: str) -> List[float]:
         """
         Generate an embedding vector for the provided text prompt.
         
@@ -44,11 +63,80 @@ class EmbeddingService:
         Raises:
             Exception: If the OpenAI API request fails
         """
-        # Call OpenAI's embeddings API with the provided prompt
-        response = self.openai_client.embeddings.create(
-            model=self.EMBEDDING_MODEL,
-            input=[prompt]
+        # Serve repeated prompts from the cache
+        if self.cache is not None:
+            cached_embedding = await self.cache.get(prompt, self.EMBEDDING_MODEL)
+            if cached_embedding is not None:
+                return cached_embedding
+        
+        # Call OpenAI's embeddings API with the provided prompt; the call is
+        # idempotent, so a slow request can be hedged
+        start_time = time.perf_counter()
+        response = await call_dependency(
+            self.dependency,
+            "embeddings",
+            lambda: self.openai_client.embeddings.create(
+                model=self.EMBEDDING_MODEL,
+                input=[prompt]
+            ),
+            idempotent=True
         )
         
-        # Extract and return just the embedding vector from the response
-        return response.data[0].embedding
\ No newline at end of file
+        record_token_usage("embeddings", response.usage)
+        
+        # Extract just the embedding vector from the response
+        embedding = response.data[0].embedding
+        
+        if self.cache is not None:
+            self.cache.record_miss_latency(time.perf_counter() - start_time)
+            self.cache.set(prompt, self.EMBEDDING_MODEL, embedding)
+        
+        return embedding
+    
+    async def generate_prompt_embeddings(self, prompts: List[str]) -> List[List[float]]:
+        """
+        Generate embedding vectors for several prompts with as few API calls as possible.
+        
+        Cached prompts are served from the cache, and the remaining distinct
+        prompts are sent together in a single embeddings request (split only
+        when there are more than MAX_BATCH_INPUTS of them).
+        
+        Args:
+            prompts (List[str]): The texts to generate embeddings for
+            
+        Returns:
+            List[List[float]]: One embedding vector per prompt, in input order
+            
+        Raises:
+            Exception: If an OpenAI API request fails
+        """
+        embeddings: Dict[str, List[float]] = {}
+        if self.cache is not None:
+            embeddings = await self.cache.get_many(prompts, self.EMBEDDING_MODEL)
+        
+        # Embed each distinct uncached prompt once
+        missing = list(dict.fromkeys(prompt for prompt in prompts if prompt not in embeddings))
+        for start in range(0, len(missing), self.MAX_BATCH_INPUTS):
+            batch = missing[start:start + self.MAX_BATCH_INPUTS]
+            start_time = time.perf_counter()
+            # Batch latency depends on the batch size, so batches are retried but not hedged
+            response = await call_dependency(
+                self.dependency,
+                "embeddings_batch",
+                lambda: self.openai_client.embeddings.create(
+                    model=self.EMBEDDING_MODEL,
+                    input=batch
+                )
+            )
+            record_token_usage("embeddings_batch", response.usage)
+            
+            # The API returns one embedding per input, identified by its position
+            for data in response.data:
+                embeddings[batch[data.index]] = data.embedding
+            
+            if self.cache is not None:
+                self.cache.record_miss_latency(time.perf_counter() - start_time)
+                for prompt in batch:
+                    self.cache.set(prompt, self.EMBEDDING_MODEL, embeddings[prompt])
+        
+        return [embeddings[prompt] for prompt in prompts]
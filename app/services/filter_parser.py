@@ -0,0 +1,371 @@
+"""
+Filter Parser Module
+
+This module provides a deterministic, rule-based alternative to LLM filter
+extraction. It recognizes the simple filter phrases that make up most search
+prompts ("under $50", "4+ stars", "from Levi's", "not discontinued") and
+declines any prompt it cannot parse confidently, so that the caller can fall
+back to the LLM. Store names are only accepted when they name a known store,
+since an unknown name would filter out every product.
+"""
+
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+Number = Union[int, float]
+
+# A number with an optional leading dollar sign or trailing currency word
+MONEY = r"(?P<{name}_pre>\$)?\s*(?P<{name}>\d+(?:\.\d{{1,2}})?)\s*(?P<{name}_post>dollars?|usd|bucks)?"
+# A rating out of 5 stars
+RATING = r"(?P<rating>[0-5](?:\.\d)?)"
+# A number of reviews or ratings
+COUNT = r"(?P<count>\d+)"
+# Words ending a rating phrase such as "4 stars and up"
+OR_BETTER = r"(?:and|or)\s+(?:up|above|higher|more|better)"
+
+# Words that suggest a filter the rules did not recognize
+UNPARSED_SIGNALS = {
+    "star", "stars", "rated", "rating", "ratings", "review", "reviews", "price", "priced",
+    "cost", "costs", "cheap", "cheaper", "cheapest", "expensive", "affordable", "budget",
+    "dollar", "dollars", "usd", "bucks", "sale", "discount", "discontinued", "store", "brand",
+    "sold", "seller", "not", "no", "without", "except", "popular", "best", "top", "under",
+    "over", "below", "above", "between", "less", "more", "least", "most", "than", "max",
+    "min", "maximum", "minimum"
+}
+
+# Words that mark a prompt as being about fashion
+FASHION_TERMS = {
+    "accessory", "accessories", "anklet", "apparel", "attire", "backpack", "bag", "bandana",
+    "beanie", "belt", "bikini", "blazer", "blouse", "boot", "bootie", "bow", "boxer", "bra",
+    "bracelet", "brief", "cap", "cardigan", "chain", "choker", "cloak", "clothes", "clothing",
+    "clutch", "coat", "costume", "cufflink", "dress", "earring", "fashion", "flat", "fleece",
+    "flip-flop", "garment", "glove", "gown", "handbag", "hat", "headband", "heel", "hoodie",
+    "jacket", "jean", "jeans", "jersey", "jewelry", "jewellery", "jumpsuit", "kimono", "lingerie",
+    "loafer", "legging", "leggings", "mitten", "necklace", "nightgown", "outfit", "overalls",
+    "pajama", "pajamas", "pant", "pants", "parka", "pendant", "polo", "poncho", "purse",
+    "raincoat", "ring", "robe", "romper", "sandal", "scarf", "shawl", "shirt", "shoe", "short",
+    "shorts", "skirt", "slipper", "sneaker", "sock", "stiletto", "suit", "sunglasses",
+    "suspender", "sweater", "sweatpants", "sweatshirt", "swimsuit", "swimwear", "tank", "tee",
+    "tie", "tights", "top", "tote", "trouser", "trousers", "tunic", "tuxedo", "underwear",
+    "uniform", "vest", "wallet", "watch", "wear", "windbreaker", "wristwatch"
+}
+
+# Prompts longer than this are left to the LLM
+MAX_PROMPT_WORDS = 16
+
+# Words introducing a store name, as in "from Levi's" or "sold by the Hanes store"
+STORE_PREFIX = re.compile(r"\b(?:sold\s+by|from|by)\s+(?:the\s+)?", re.IGNORECASE)
+# A "store" suffix after the name, which is not part of it
+STORE_SUFFIX = re.compile(r"\s+store\b", re.IGNORECASE)
+# Text after a store name that adds another one, as in "from Zara and H&M"
+STORE_CONTINUATION = re.compile(r"\s*(?:,|&|/|\+|\band\b|\bor\b)\s*\S")
+# Longest store name looked up, in words
+MAX_STORE_WORDS = 6
+# Words that turn a filter around, as in "not discontinued"
+NEGATIONS = {"not", "no", "without", "except"}
+
+
+def _number(text: str) -> Number:
+    """
+    Convert a matched number to an int when it is whole, otherwise a float.
+
+    Args:
+        text (str): The matched number
+
+    Returns:
+        Number: The parsed number
+    """
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def filter_tokens(prompt: str) -> Tuple[str, ...]:
+    """
+    Pick out the words of a prompt that its filters depend on.
+
+    Prompts that differ only in these words, such as "dresses under $30" and
+    "dresses under $80", can embed almost identically but need different
+    filters, so the response cache only shares responses between prompts
+    whose tokens are equal.
+
+    Args:
+        prompt (str): The user's search query
+
+    Returns:
+        Tuple[str, ...]: The prompt's numbers and negations, followed by the
+                         words after each store prefix such as "from", lowercased
+    """
+    text = prompt.lower()
+    tokens = re.findall(r"\d+(?:\.\d+)?", text)
+    tokens.extend(word for word in re.findall(r"\w+", text) if word in NEGATIONS)
+    for prefix in STORE_PREFIX.finditer(text):
+        tokens.append(" ".join(text[prefix.end():].split()[:MAX_STORE_WORDS]))
+    return tuple(tokens)
+
+
+def _is_money(match: "re.Match[str]", name: str) -> bool:
+    """
+    Check that a matched amount carries a currency marker.
+
+    Args:
+        match (re.Match[str]): The match containing the amount
+        name (str): Name of the amount's group
+
+    Returns:
+        bool: True if the amount has a dollar sign or a trailing currency word
+    """
+    return bool(match.group(f"{name}_pre") or match.group(f"{name}_post"))
+
+
+class FilterParser:
+    """
+    Rule-based extractor for the filters described by the filter schema.
+
+    `parse` returns filters in the same shape as the LLM's structured output,
+    or None when the prompt contains anything the rules cannot account for.
+    Attempts and successful parses are counted so the fast-path hit rate can
+    be monitored.
+    """
+
+    def __init__(self, filter_schema: Dict[str, Any], known_stores: Optional[Iterable[str]] = None):
+        """
+        Initialize the parser.
+
+        Args:
+            filter_schema (Dict[str, Any]): The filter schema used for LLM extraction;
+                                            its properties define the returned keys
+            known_stores (Optional[Iterable[str]]): Names of the catalog's stores;
+                                                    prompts naming any other store,
+                                                    or any store if None, are left
+                                                    to the LLM
+        """
+        self.filter_keys: List[str] = [
+            key for key in filter_schema["schema"]["properties"] if key != "is_related_to_fashion"
+        ]
+        # Store names are matched case-insensitively and returned as the catalog spells them
+        self.known_stores: Dict[str, str] = {}
+        for store in known_stores or []:
+            if store and store.strip():
+                self.known_stores.setdefault(store.strip().lower(), store.strip())
+        self.hits = 0
+        self.misses = 0
+
+        # Each rule is a pattern and a function that turns its match into
+        # filter values, or returns None to reject the match
+        money = MONEY.format(name="amount")
+        low = MONEY.format(name="low")
+        high = MONEY.format(name="high")
+        rules: List[Tuple[str, Callable[["re.Match[str]"], Optional[Dict[str, Any]]]]] = [
+            (r"\bnot\s+discontinued\b|\bstill\s+(?:available|made|in\s+production)\b",
+             lambda m: {"discontinued": "No"}),
+            (r"\bdiscontinued\b",
+             lambda m: {"discontinued": "Yes"}),
+            (rf"\bbetween\s+{low}\s+and\s+{high}",
+             self._price_range),
+            (rf"(?<![\w.]){low}\s*(?:-|to)\s*{high}",
+             self._price_range),
+            (rf"\b(?:under|below|less\s+than|cheaper\s+than|no\s+more\s+than|at\s+most|up\s+to|max(?:imum)?(?:\s+of)?|within|(?:a\s+)?budget\s+of)\s+{money}",
+             lambda m: {"max_price": _number(m.group("amount"))} if _is_money(m, "amount") else None),
+            (rf"\b(?:over|above|more\s+than|at\s+least|min(?:imum)?(?:\s+of)?|starting\s+at)\s+{money}",
+             lambda m: {"min_price": _number(m.group("amount"))} if _is_money(m, "amount") else None),
+            (rf"\b(?:at\s+least|minimum\s+of|rated(?:\s+(?:over|above|at\s+least))?)\s+{RATING}\s*stars?(?:\s+{OR_BETTER})?\b",
+             lambda m: {"min_avg_rating": _number(m.group("rating"))}),
+            (rf"\b{RATING}\s*\+\s*stars?\b|\b{RATING.replace('rating', 'rating2')}\s*stars?\s+{OR_BETTER}\b",
+             lambda m: {"min_avg_rating": _number(m.group("rating") or m.group("rating2"))}),
+            (rf"\b(?:under|below|less\s+than)\s+{RATING}\s*stars?\b",
+             lambda m: {"max_avg_rating": _number(m.group("rating"))}),
+            (rf"\b{COUNT}\s*\+\s*(?:reviews|ratings)\b|\b(?:at\s+least|over|more\s+than)\s+{COUNT.replace('count', 'count2')}\s*(?:reviews|ratings)\b",
+             lambda m: {"min_rating_count": int(m.group("count") or m.group("count2"))}),
+            (rf"\b(?:under|fewer\s+than|less\s+than)\s+{COUNT}\s*(?:reviews|ratings)\b",
+             lambda m: {"max_rating_count": int(m.group("count"))}),
+        ]
+        self._rules = [(re.compile(pattern, re.IGNORECASE), handler) for pattern, handler in rules]
+
+    @staticmethod
+    def _price_range(match: "re.Match[str]") -> Optional[Dict[str, Any]]:
+        """
+        Convert a matched price range into minimum and maximum price filters.
+
+        Args:
+            match (re.Match[str]): The match containing "low" and "high" amounts
+
+        Returns:
+            Optional[Dict[str, Any]]: The price filters, or None if neither amount
+                                      is marked as money or the range is reversed
+        """
+        if not (_is_money(match, "low") or _is_money(match, "high")):
+            return None
+        low, high = _number(match.group("low")), _number(match.group("high"))
+        if low > high:
+            return None
+        return {"min_price": low, "max_price": high}
+
+    def _parse_store(self, text: str) -> Optional[Tuple[Optional[str], str]]:
+        """
+        Find the store named in a prompt, such as "from Levi's".
+
+        The words after "from", "by" or "sold by" are looked up in the
+        known stores, trying the longest run of words first. Capitalized names
+        that are not known stores ("from Italy", "by Monday") and phrases
+        naming several stores ("from Zara and H&M") cannot be parsed, while
+        other lowercase words after the prefix, as in "from the 80s", are
+        left in the prompt.
+
+        Args:
+            text (str): The prompt, or what is left of it after the other rules
+
+        Returns:
+            Optional[Tuple[Optional[str], str]]: The store, or None if no store is
+                named, and the text without the store phrase; or None if a store
+                phrase could not be parsed
+        """
+        store_name = None
+        position = 0
+        while (prefix := STORE_PREFIX.search(text, position)) is not None:
+            position = prefix.end()
+            words = list(re.finditer(r"\S+", text[prefix.end():]))[:MAX_STORE_WORDS]
+            if not words:
+                continue
+            for word in reversed(words):
+                name = text[prefix.end():prefix.end() + word.end()]
+                # Keep trailing punctuation if it is part of the name, as in "Tiffany & Co."
+                for candidate in (name, name.rstrip(",.;:!?")):
+                    store = self.known_stores.get(candidate.lower())
+                    if store is not None:
+                        break
+                if store is not None:
+                    end = prefix.end() + len(candidate)
+                    break
+            else:
+                # A capitalized name that is not a known store needs the LLM;
+                # lowercase words, as in "from the 80s", are not a store name
+                if words[0].group(0)[0].isupper():
+                    return None
+                continue
+
+            if store_name is not None and store_name != store:
+                return None
+            suffix = STORE_SUFFIX.match(text, end)
+            if suffix:
+                end = suffix.end()
+            if STORE_CONTINUATION.match(text, end):
+                return None
+            store_name = store
+            text = text[:prefix.start()] + " " + text[end:]
+            position = prefix.start()
+        return store_name, text
+
+    def parse(self, prompt: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Extract filter criteria from a prompt without calling the LLM.
+
+        Args:
+            prompt (str): The user's search query
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], bool]]: A tuple of the filter parameters
+                and True (the query is fashion-related), in the same format as
+                LLM extraction, or None if the prompt could not be parsed
+                confidently
+        """
+        result = self._parse(prompt)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def _parse(self, prompt: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Apply the rules to a prompt and check that nothing was left unparsed.
+
+        Args:
+            prompt (str): The user's search query
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], bool]]: See `parse`
+        """
+        if len(prompt.split()) > MAX_PROMPT_WORDS:
+            return None
+
+        filters: Dict[str, Any] = {}
+        remainder = prompt
+        for pattern, handler in self._rules:
+            for match in list(pattern.finditer(remainder)):
+                values = handler(match)
+                if values is None:
+                    continue
+                # Conflicting values for the same filter need the LLM's judgement
+                for key, value in values.items():
+                    if key in filters and filters[key] != value:
+                        return None
+                filters.update(values)
+                remainder = remainder.replace(match.group(0), " ", 1)
+
+        store = self._parse_store(remainder)
+        if store is None:
+            return None
+        if store[0] is not None:
+            filters["store_name"] = store[0]
+        remainder = store[1]
+
+        # Any leftover number or filter word means something was not understood
+        words = re.findall(r"[\w$'-]+", remainder.lower())
+        if any(re.search(r"[\d$]", word) or word in UNPARSED_SIGNALS for word in words):
+            return None
+
+        # Only prompts that clearly name a fashion item skip the relevance check.
+        # Words like "ring", "watch" or "suit" have other meanings, so without
+        # a parsed filter every word must be a fashion term ("ring light" is not)
+        is_fashion_term = [self._singular(word) in FASHION_TERMS for word in words]
+        if not any(is_fashion_term) or (not filters and not all(is_fashion_term)):
+            return None
+
+        # Contradictory bounds need the LLM's judgement
+        for low_key, high_key in (
+            ("min_price", "max_price"),
+            ("min_avg_rating", "max_avg_rating"),
+            ("min_rating_count", "max_rating_count")
+        ):
+            if filters.get(low_key) is not None and filters.get(high_key) is not None \
+                    and filters[low_key] > filters[high_key]:
+                return None
+
+        # Return only the keys the schema defines, in schema order
+        if not set(filters) <= set(self.filter_keys):
+            return None
+        return {key: filters.get(key) for key in self.filter_keys}, True
+
+    @staticmethod
+    def _singular(word: str) -> str:
+        """
+        Reduce a word to an approximate singular form for vocabulary lookups.
+
+        Args:
+            word (str): A lowercase word
+
+        Returns:
+            str: The word without a possessive or plural suffix
+        """
+        word = word.removesuffix("'s").removesuffix("'")
+        if word in FASHION_TERMS:
+            return word
+        for suffix in ("es", "s"):
+            if word.endswith(suffix) and word[:-len(suffix)] in FASHION_TERMS:
+                return word[:-len(suffix)]
+        return word
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Report how often the fast path parsed a prompt without the LLM.
+
+        Returns:
+            Dict[str, Union[int, float]]: Parsed prompts, fallbacks to the LLM,
+                                          and the fast-path hit rate
+        """
+        attempts = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "fallbacks": self.misses,
+            "hit_rate": self.hits / attempts if attempts else 0.0
+        }
@@ -0,0 +1,486 @@
+"""
+HNSW Index Module
+
+This module provides an in-process approximate nearest neighbor index based on
+Hierarchical Navigable Small World graphs. The index is built from product
+embeddings, saved to disk as NumPy arrays, memory-mapped when it is loaded and
+updated with single-item inserts, so it never needs a full rebuild.
+"""
+
+import heapq
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from services.atomic_write import write_atomically
+
+# Files making up a saved index
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.npy"
+LEVELS_FILE = "levels.npy"
+LEVEL0_FILE = "level0.npy"
+UPPER_FILE = "upper.npz"
+
+
+class HNSWIndex:
+    """
+    Approximate nearest neighbor index over unit-length vectors using cosine distance.
+
+    Nodes are identified by string keys (the products' parent ASINs). The
+    bottom layer of the graph is a fixed-width neighbor matrix and is stored
+    together with the vectors in memory-mappable .npy files; the sparse upper
+    layers are small and are loaded into memory.
+
+    Tuning parameters:
+        - M: neighbors per node on the upper layers (2 * M on the bottom layer);
+          higher values improve recall at the cost of memory and build time
+        - ef_construction: candidate list size while inserting; higher values
+          build a better graph more slowly
+        - ef_search: candidate list size while searching; higher values improve
+          recall at the cost of latency
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        seed: int = 0
+    ):
+        """
+        Initialize an empty index.
+
+        Args:
+            dim (int): Dimensionality of the indexed vectors
+            M (int): Number of neighbors per node on the upper layers
+            ef_construction (int): Size of the candidate list used while inserting
+            ef_search (int): Default size of the candidate list used while searching
+            seed (int): Seed for the random level assignment
+        """
+        self.dim = dim
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.level_multiplier = 1 / math.log(M)
+        self.entry_point = -1
+        self.max_level = -1
+        self.keys: List[str] = []
+        self._node_by_key: Dict[str, int] = {}
+        self._rng = np.random.default_rng(seed)
+
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._levels = np.zeros(0, dtype=np.int16)
+        self._level0 = np.full((0, self.M0), -1, dtype=np.int32)
+        # Neighbor lists of the upper layers; _upper[level - 1] maps node -> neighbors
+        self._upper: List[Dict[int, np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._node_by_key
+
+    @classmethod
+    def build(
+        cls,
+        keys: Sequence[str],
+        vectors: np.ndarray,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64
+    ) -> "HNSWIndex":
+        """
+        Build an index from a set of vectors.
+
+        Args:
+            keys (Sequence[str]): Key of each vector
+            vectors (np.ndarray): Matrix with one vector per row
+            M (int): Number of neighbors per node on the upper layers
+            ef_construction (int): Size of the candidate list used while inserting
+            ef_search (int): Default size of the candidate list used while searching
+
+        Returns:
+            HNSWIndex: The populated index
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = cls(vectors.shape[1], M=M, ef_construction=ef_construction, ef_search=ef_search)
+        index._reserve(len(keys))
+        for key, vector in zip(keys, vectors):
+            index.insert(key, vector)
+        return index
+
+    # -----------------------------------------------------------------
+    # Storage
+    # -----------------------------------------------------------------
+
+    def _reserve(self, capacity: int) -> None:
+        """
+        Make sure the node arrays can hold `capacity` nodes and are writable.
+
+        Arrays are grown geometrically, so repeated single inserts stay cheap.
+        Memory-mapped arrays are copied into memory the first time the index
+        is modified.
+
+        Args:
+            capacity (int): Number of nodes the arrays must hold
+        """
+        current = self._vectors.shape[0]
+        if capacity <= current and self._vectors.flags.writeable and self._level0.flags.writeable:
+            return
+
+        new_capacity = max(capacity, current * 2 if capacity > current else current, 16)
+        count = len(self.keys)
+
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:count] = self._vectors[:count]
+        levels = np.zeros(new_capacity, dtype=np.int16)
+        levels[:count] = self._levels[:count]
+        level0 = np.full((new_capacity, self.M0), -1, dtype=np.int32)
+        level0[:count] = self._level0[:count]
+
+        self._vectors, self._levels, self._level0 = vectors, levels, level0
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Save the index to a directory.
+
+        Files are replaced atomically, so processes mapping the previous
+        version are unaffected.
+
+        Args:
+            path (Union[str, Path]): Directory to write the index to
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        count = len(self.keys)
+
+        write_atomically(path / VECTORS_FILE, lambda f: np.save(f, self._vectors[:count]))
+        write_atomically(path / LEVELS_FILE, lambda f: np.save(f, self._levels[:count]))
+        write_atomically(path / LEVEL0_FILE, lambda f: np.save(f, self._level0[:count]))
+
+        upper_arrays = {}
+        for level, layer in enumerate(self._upper, start=1):
+            nodes = np.array(sorted(layer), dtype=np.int32)
+            neighbors = np.full((len(nodes), self.M), -1, dtype=np.int32)
+            for row, node in enumerate(nodes):
+                neighbors[row, :len(layer[node])] = layer[node]
+            upper_arrays[f"nodes_{level}"] = nodes
+            upper_arrays[f"neighbors_{level}"] = neighbors
+        write_atomically(path / UPPER_FILE, lambda f: np.savez(f, **upper_arrays))
+
+        meta = {
+            "dim": self.dim,
+            "M": self.M,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "entry_point": self.entry_point,
+            "max_level": self.max_level,
+            "keys": self.keys
+        }
+        write_atomically(path / META_FILE, lambda f: f.write(json.dumps(meta).encode()))
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> "HNSWIndex":
+        """
+        Load an index saved with `save`.
+
+        Args:
+            path (Union[str, Path]): Directory the index was saved to
+            mmap (bool): Whether to memory-map the vectors and bottom layer
+                         instead of reading them into memory
+
+        Returns:
+            HNSWIndex: The loaded index
+        """
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text())
+        index = cls(
+            meta["dim"],
+            M=meta["M"],
+            ef_construction=meta["ef_construction"],
+            ef_search=meta["ef_search"]
+        )
+        mmap_mode = "r" if mmap else None
+        index._vectors = np.load(path / VECTORS_FILE, mmap_mode=mmap_mode)
+        index._level0 = np.load(path / LEVEL0_FILE, mmap_mode=mmap_mode)
+        index._levels = np.load(path / LEVELS_FILE)
+        index.keys = meta["keys"]
+        index._node_by_key = {key: node for node, key in enumerate(index.keys)}
+        index.entry_point = meta["entry_point"]
+        index.max_level = meta["max_level"]
+
+        with np.load(path / UPPER_FILE) as upper_arrays:
+            for level in range(1, index.max_level + 1):
+                nodes = upper_arrays[f"nodes_{level}"]
+                neighbors = upper_arrays[f"neighbors_{level}"]
+                index._upper.append({
+                    int(node): row[row >= 0] for node, row in zip(nodes, neighbors)
+                })
+        return index
+
+    # -----------------------------------------------------------------
+    # Graph traversal
+    # -----------------------------------------------------------------
+
+    @staticmethod
+    def _normalize(vector: Union[Sequence[float], np.ndarray]) -> np.ndarray:
+        """
+        Convert a vector to a unit-length float32 array.
+
+        Args:
+            vector (Union[Sequence[float], np.ndarray]): The vector
+
+        Returns:
+            np.ndarray: The normalized vector
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _distances(self, query: np.ndarray, nodes: Sequence[int]) -> np.ndarray:
+        """
+        Compute the cosine distances from a query to a set of nodes.
+
+        Args:
+            query (np.ndarray): Normalized query vector
+            nodes (Sequence[int]): Nodes to compare against
+
+        Returns:
+            np.ndarray: Distance to each node
+        """
+        return 1 - self._vectors[nodes] @ query
+
+    def _neighbors(self, node: int, level: int) -> np.ndarray:
+        """
+        Get the neighbors of a node on a layer.
+
+        Args:
+            node (int): The node
+            level (int): The layer
+
+        Returns:
+            np.ndarray: The node's neighbors
+        """
+        if level == 0:
+            row = self._level0[node]
+            return row[row >= 0]
+        return self._upper[level - 1].get(node, np.zeros(0, dtype=np.int32))
+
+    def _set_neighbors(self, node: int, level: int, neighbors: Sequence[int]) -> None:
+        """
+        Replace the neighbors of a node on a layer.
+
+        Args:
+            node (int): The node
+            level (int): The layer
+            neighbors (Sequence[int]): The new neighbors
+        """
+        if level == 0:
+            self._level0[node] = -1
+            self._level0[node, :len(neighbors)] = neighbors
+        else:
+            self._upper[level - 1][node] = np.asarray(neighbors, dtype=np.int32)
+
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        entry_points: Sequence[int],
+        ef: int,
+        level: int
+    ) -> List[Tuple[float, int]]:
+        """
+        Greedy best-first search for the nodes closest to a query on one layer.
+
+        Args:
+            query (np.ndarray): Normalized query vector
+            entry_points (Sequence[int]): Nodes to start from
+            ef (int): Number of closest nodes to track
+            level (int): The layer to search
+
+        Returns:
+            List[Tuple[float, int]]: Up to `ef` (distance, node) pairs, closest first
+        """
+        visited = set(entry_points)
+        distances = self._distances(query, list(entry_points))
+        candidates = [(float(d), n) for d, n in zip(distances, entry_points)]
+        heapq.heapify(candidates)
+        # Max-heap of the best results found so far, keyed on negated distance
+        results = [(-d, n) for d, n in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if distance > -results[0][0] and len(results) >= ef:
+                break
+
+            unvisited = [n for n in self._neighbors(node, level).tolist() if n not in visited]
+            if not unvisited:
+                continue
+            visited.update(unvisited)
+
+            for neighbor_distance, neighbor in zip(self._distances(query, unvisited).tolist(), unvisited):
+                if len(results) < ef or neighbor_distance < -results[0][0]:
+                    heapq.heappush(candidates, (neighbor_distance, neighbor))
+                    heapq.heappush(results, (-neighbor_distance, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted((-negative_distance, node) for negative_distance, node in results)
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], limit: int) -> List[int]:
+        """
+        Choose a node's neighbors with the HNSW diversity heuristic.
+
+        A candidate is kept only if it is closer to the node than to every
+        neighbor already kept, which spreads links across different
+        directions. Remaining slots are then filled with the closest
+        candidates that were skipped.
+
+        Args:
+            candidates (List[Tuple[float, int]]): (distance, node) pairs, closest first
+            limit (int): Maximum number of neighbors
+
+        Returns:
+            List[int]: The selected neighbors
+        """
+        if len(candidates) <= limit:
+            return [candidate for _, candidate in candidates]
+
+        nodes = np.array([candidate for _, candidate in candidates], dtype=np.int64)
+        distances = np.array([distance for distance, _ in candidates])
+        vectors = self._vectors[nodes]
+        pairwise_distances = 1 - vectors @ vectors.T
+
+        # Distance from each candidate to its closest selected neighbor so far
+        closest_selected = np.full(len(nodes), np.inf)
+        selected: List[int] = []
+        skipped: List[int] = []
+        for i in range(len(nodes)):
+            if len(selected) >= limit:
+                break
+            if distances[i] < closest_selected[i]:
+                selected.append(i)
+                np.minimum(closest_selected, pairwise_distances[i], out=closest_selected)
+            else:
+                skipped.append(i)
+        return nodes[selected + skipped[:limit - len(selected)]].tolist()
+
+    def _link(self, node: int, neighbor: int, level: int) -> None:
+        """
+        Add a link from `neighbor` back to `node`, pruning the neighbor's list if it is full.
+
+        Args:
+            node (int): The node being linked to
+            neighbor (int): The node whose neighbor list is updated
+            level (int): The layer
+        """
+        current = self._neighbors(neighbor, level)
+        if node in current:
+            return
+        limit = self.M0 if level == 0 else self.M
+        if len(current) < limit:
+            self._set_neighbors(neighbor, level, np.append(current, node))
+            return
+
+        linked = np.append(current, node)
+        distances = self._distances(self._vectors[neighbor], linked)
+        order = np.argsort(distances)
+        candidates = [(float(distances[i]), int(linked[i])) for i in order]
+        self._set_neighbors(neighbor, level, self._select_neighbors(candidates, limit))
+
+    # -----------------------------------------------------------------
+    # Public operations
+    # -----------------------------------------------------------------
+
+    def insert(self, key: str, vector: Union[Sequence[float], np.ndarray]) -> None:
+        """
+        Insert a vector, or replace the vector of an existing key.
+
+        Replacing a vector re-links the node at every layer it belongs to;
+        links from other nodes to it are kept and pruned as usual.
+
+        Args:
+            key (str): Key of the vector
+            vector (Union[Sequence[float], np.ndarray]): The vector
+        """
+        query = self._normalize(vector)
+        node = self._node_by_key.get(key)
+
+        if node is None:
+            node = len(self.keys)
+            self._reserve(node + 1)
+            level = int(-math.log(1 - self._rng.random()) * self.level_multiplier)
+            self.keys.append(key)
+            self._node_by_key[key] = node
+            self._levels[node] = level
+            while len(self._upper) < level:
+                self._upper.append({})
+            for layer in range(level + 1):
+                self._set_neighbors(node, layer, [])
+        else:
+            # Existing links are kept while searching and replaced below
+            self._reserve(len(self.keys))
+            level = int(self._levels[node])
+
+        self._vectors[node] = query
+        if len(self.keys) == 1:
+            self.entry_point, self.max_level = node, level
+            return
+
+        # Descend greedily through the layers above the node's level
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+
+        # Connect the node on each of its layers
+        for layer in range(min(level, self.max_level), -1, -1):
+            candidates = [
+                (distance, candidate)
+                for distance, candidate in self._search_layer(query, entry_points, self.ef_construction, layer)
+                if candidate != node
+            ]
+            neighbors = self._select_neighbors(candidates, self.M0 if layer == 0 else self.M)
+            self._set_neighbors(node, layer, neighbors)
+            for neighbor in neighbors:
+                self._link(node, neighbor, layer)
+            entry_points = [candidate for _, candidate in candidates] or entry_points
+
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def search(
+        self,
+        vector: Union[Sequence[float], np.ndarray],
+        k: int,
+        ef_search: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the approximate k nearest neighbors of a vector.
+
+        Args:
+            vector (Union[Sequence[float], np.ndarray]): The query vector
+            k (int): Number of neighbors to return
+            ef_search (Optional[int]): Candidate list size, defaulting to the
+                                       index's ef_search; raised to k if smaller
+
+        Returns:
+            List[Tuple[str, float]]: (key, cosine distance) pairs, closest first
+        """
+        if self.entry_point < 0:
+            return []
+
+        query = self._normalize(vector)
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+
+        ef = max(ef_search or self.ef_search, k)
+        results = self._search_layer(query, entry_points, ef, 0)[:k]
+        return [(self.keys[node], distance) for distance, node in results]
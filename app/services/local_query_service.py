@@ -0,0 +1,570 @@
+"""
+Local Query Service Module
+
+This module provides an in-process alternative to the Supabase vector search.
+The catalog's embeddings are held in a contiguous float32 matrix and its
+filterable fields in column arrays, so a search is a single matrix-vector
+product followed by vectorized filtering and a partial sort.
+
+A catalog can be saved to a directory and loaded back memory-mapped, so that
+several worker processes share one copy of it in the page cache instead of
+each holding its own.
+"""
+
+import asyncio
+import json
+import mmap
+from collections.abc import Sequence as SequenceABC
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import orjson
+
+from services.query_service import MATCH_COUNT, MATCH_THRESHOLD, MAX_MATCH_COUNT
+from services.hnsw_index import HNSWIndex
+from services.quantized_store import QuantizedEmbeddingStore
+from services.projection import project
+from services.serialization import ORJSON_OPTIONS
+from services.atomic_write import write_atomically
+
+# Fields returned for each match, mirroring the get_fashion_items RPC
+RESULT_FIELDS = ["parent_asin", "title", "images", "average_rating", "rating_number", "price", "store"]
+
+# Candidates from a quantized scan that are reranked with exact vectors
+RERANK_COUNT = 200
+
+# Files making up a saved catalog
+META_FILE = "meta.json"
+KEYS_FILE = "keys.json"
+ITEMS_FILE = "items.bin"
+OFFSETS_FILE = "offsets.npy"
+EMBEDDINGS_FILE = "embeddings.npy"
+COLUMN_FILES = {
+    "prices": "prices.npy",
+    "average_ratings": "average_ratings.npy",
+    "rating_numbers": "rating_numbers.npy",
+    "stores": "stores.npy",
+    "discontinued": "discontinued.npy"
+}
+
+
+class MappedItems(SequenceABC):
+    """
+    Read-only list of product records kept as JSON in a memory-mapped file.
+
+    Records are decoded when accessed, so a process only holds the ones it
+    is currently using, and the file's pages are shared between processes.
+    """
+
+    def __init__(self, items_path: Union[str, Path], offsets: np.ndarray):
+        """
+        Map a file of concatenated JSON records.
+
+        Args:
+            items_path (Union[str, Path]): The file of records
+            offsets (np.ndarray): Start of each record in the file, followed by
+                                  the end of the last one
+        """
+        self._offsets = offsets
+        with open(items_path, "rb") as file:
+            # Empty files cannot be mapped
+            self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("item index out of range")
+        return orjson.loads(self._data[self._offsets[index]:self._offsets[index + 1]])
+
+
+class LocalQueryService:
+    """
+    Service for querying an in-memory copy of the fashion items catalog.
+
+    Exposes the same interface as QueryService and applies the same
+    threshold, filters, ordering and result cap as the get_fashion_items
+    RPC, so the two can be swapped by configuration. Searches are exact
+    unless an HNSW index is provided, in which case the index supplies the
+    candidates and the exact scan is only used when too few of them pass
+    the filters. With a quantized embedding store, the scan runs over the
+    compact codes and only the best candidates are scored exactly.
+    """
+
+    def __init__(
+        self,
+        items: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray],
+        index: Optional[HNSWIndex] = None,
+        store: Optional[QuantizedEmbeddingStore] = None
+    ):
+        """
+        Initialize the local query service.
+
+        Args:
+            items (List[Dict[str, Any]]): Product records, using the column names
+                                           of the fashion_products table
+            embeddings (Optional[np.ndarray]): Matrix of product embeddings with one
+                                               row per item, in the same order as
+                                               `items`, or None if `store` is given
+            index (Optional[HNSWIndex]): Approximate nearest neighbor index keyed by
+                                         parent ASIN, or None for exact search only
+            store (Optional[QuantizedEmbeddingStore]): Quantized embeddings with one
+                                                       row per item, used instead of
+                                                       a float32 matrix
+        """
+        if embeddings is None and store is None:
+            raise ValueError("Either embeddings or a quantized embedding store is required")
+
+        self.items = items
+        self.index = index
+        self.store = store
+        self._index_by_asin = {item["parent_asin"]: i for i, item in enumerate(items)}
+
+        # Store unit-length rows so cosine similarity is a plain dot product
+        self.embeddings: Optional[np.ndarray] = None
+        if store is None:
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            self.embeddings = np.ascontiguousarray(embeddings / np.where(norms > 0, norms, 1))
+        elif store.keys != [item["parent_asin"] for item in items]:
+            raise ValueError("The quantized embedding store's rows do not match the catalog items")
+
+        # Filterable columns; missing numbers are NaN so that, as in SQL,
+        # they never satisfy a comparison
+        self.prices = self._float_column(items, "price")
+        self.average_ratings = self._float_column(items, "average_rating")
+        self.rating_numbers = self._float_column(items, "rating_number")
+        self.stores = np.array([item.get("store") for item in items], dtype=object)
+        self.discontinued = np.array([self._discontinued_status(item) for item in items], dtype=object)
+
+    @classmethod
+    def from_dataset(
+        cls,
+        dataset_path: Union[str, Path],
+        index: Optional[HNSWIndex] = None,
+        store: Optional[QuantizedEmbeddingStore] = None
+    ) -> "LocalQueryService":
+        """
+        Load the catalog from a Hugging Face dataset saved to disk.
+
+        The dataset must have the format produced by the ingestion scripts,
+        including an "embedding" column.
+
+        Args:
+            dataset_path (Union[str, Path]): Path of the dataset on disk
+            index (Optional[HNSWIndex]): Approximate nearest neighbor index to
+                                         search before falling back to exact search
+            store (Optional[QuantizedEmbeddingStore]): Quantized embeddings to search
+                                                       instead of the dataset's
+                                                       embedding column
+
+        Returns:
+            LocalQueryService: A service serving the dataset's products
+        """
+        from datasets import load_from_disk
+
+        dataset = load_from_disk(str(dataset_path))
+        items = [
+            cls._normalize_record(record)
+            for record in dataset.remove_columns("embedding")
+        ]
+        if store is not None:
+            # Order the items like the store's rows and skip loading the float32 embeddings
+            items_by_asin = {item["parent_asin"]: item for item in items}
+            return cls([items_by_asin[key] for key in store.keys], None, index, store)
+
+        embeddings = np.asarray(dataset.with_format("numpy")["embedding"], dtype=np.float32)
+        return cls(items, embeddings, index)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Save the catalog to a directory, in the format read by `load`.
+
+        Items are written as JSON records and the embeddings (normalized) and
+        filter columns as NumPy arrays. Embeddings are not written for a
+        catalog searched through a quantized store, which has its own copy.
+        Files are replaced atomically, so workers mapping the previous
+        version are unaffected.
+
+        Args:
+            path (Union[str, Path]): Directory to write the catalog to
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        offsets = np.zeros(len(self.items) + 1, dtype=np.int64)
+
+        def write_items(file) -> None:
+            for i, item in enumerate(self.items):
+                offsets[i + 1] = offsets[i] + file.write(orjson.dumps(item, option=ORJSON_OPTIONS))
+
+        write_atomically(path / ITEMS_FILE, write_items)
+        write_atomically(path / OFFSETS_FILE, lambda f: np.save(f, offsets))
+        if self.embeddings is not None:
+            write_atomically(path / EMBEDDINGS_FILE, lambda f: np.save(f, self.embeddings))
+        for attribute, name in COLUMN_FILES.items():
+            column = getattr(self, attribute)
+            if column.dtype == object:
+                # Fixed-width strings can be memory-mapped; missing stores become ""
+                column = np.array([value or "" for value in column], dtype=str)
+            write_atomically(path / name, lambda f: np.save(f, column))
+        write_atomically(path / KEYS_FILE, lambda f: f.write(json.dumps(list(self._index_by_asin)).encode()))
+        write_atomically(path / META_FILE, lambda f: f.write(json.dumps({
+            "count": len(self.items),
+            "embeddings": self.embeddings is not None
+        }).encode()))
+
+    @classmethod
+    def load(
+        cls,
+        path: Union[str, Path],
+        index: Optional[HNSWIndex] = None,
+        store: Optional[QuantizedEmbeddingStore] = None
+    ) -> "LocalQueryService":
+        """
+        Load a catalog saved with `save`, memory-mapping its items, embeddings
+        and filter columns.
+
+        Only the lookup from parent ASIN to position is built in memory.
+
+        Args:
+            path (Union[str, Path]): Directory the catalog was saved to
+            index (Optional[HNSWIndex]): Approximate nearest neighbor index to
+                                         search before falling back to exact search
+            store (Optional[QuantizedEmbeddingStore]): Quantized embeddings to search,
+                                                       required if the catalog was
+                                                       saved without embeddings
+
+        Returns:
+            LocalQueryService: A service serving the saved products
+        """
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text())
+        keys = json.loads((path / KEYS_FILE).read_text())
+        if store is None and not meta["embeddings"]:
+            raise ValueError("The catalog was saved without embeddings, so a quantized embedding store is required")
+        if store is not None and store.keys != keys:
+            raise ValueError("The quantized embedding store's rows do not match the catalog items")
+
+        service = cls.__new__(cls)
+        service.items = MappedItems(path / ITEMS_FILE, np.load(path / OFFSETS_FILE))
+        service.index = index
+        service.store = store
+        service._index_by_asin = {key: i for i, key in enumerate(keys)}
+        service.embeddings = np.load(path / EMBEDDINGS_FILE, mmap_mode="r") if store is None else None
+        for attribute, name in COLUMN_FILES.items():
+            setattr(service, attribute, np.load(path / name, mmap_mode="r"))
+        return service
+
+    @staticmethod
+    def _normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a raw dataset record to the types stored in the database.
+
+        The raw dataset encodes missing values as the string "None", prices as
+        strings and details as a JSON string.
+
+        Args:
+            record (Dict[str, Any]): A record from the dataset
+
+        Returns:
+            Dict[str, Any]: The record with database types
+        """
+        item = {key: (None if value == "None" else value) for key, value in record.items()}
+        try:
+            item["price"] = float(item["price"]) if item.get("price") is not None else None
+        except ValueError:
+            item["price"] = None
+        if isinstance(item.get("details"), str):
+            item["details"] = json.loads(item["details"])
+        return item
+
+    @staticmethod
+    def _float_column(items: List[Dict[str, Any]], field: str) -> np.ndarray:
+        """
+        Build a float64 column from a numeric field, using NaN for missing values.
+
+        Args:
+            items (List[Dict[str, Any]]): Product records
+            field (str): Name of the numeric field
+
+        Returns:
+            np.ndarray: The column
+        """
+        return np.array(
+            [item.get(field) if item.get(field) is not None else np.nan for item in items],
+            dtype=np.float64
+        )
+
+    @staticmethod
+    def _discontinued_status(item: Dict[str, Any]) -> str:
+        """
+        Read whether an item is discontinued, defaulting to "No" like the RPC.
+
+        Args:
+            item (Dict[str, Any]): A product record
+
+        Returns:
+            str: The item's "Is Discontinued By Manufacturer" detail, or "No"
+        """
+        details = item.get("details") or {}
+        return details.get("Is Discontinued By Manufacturer") or "No"
+
+    def _filter_mask(self, filter_expression: Dict[str, Any]) -> np.ndarray:
+        """
+        Build a mask of the items that satisfy the filter criteria.
+
+        Filters set to None are ignored, as in the get_fashion_items RPC.
+
+        Args:
+            filter_expression (Dict[str, Any]): Filter criteria to apply
+
+        Returns:
+            np.ndarray: Boolean mask with one entry per item
+        """
+        mask = np.ones(len(self.items), dtype=bool)
+        bounds = [
+            ("min_price", self.prices, np.greater_equal),
+            ("max_price", self.prices, np.less_equal),
+            ("min_avg_rating", self.average_ratings, np.greater_equal),
+            ("max_avg_rating", self.average_ratings, np.less_equal),
+            ("min_rating_count", self.rating_numbers, np.greater_equal),
+            ("max_rating_count", self.rating_numbers, np.less_equal),
+        ]
+        for key, column, compare in bounds:
+            if filter_expression.get(key) is not None:
+                mask &= compare(column, filter_expression[key])
+        if filter_expression.get("store_name") is not None:
+            mask &= self.stores == filter_expression["store_name"]
+        if filter_expression.get("discontinued") is not None:
+            mask &= self.discontinued == filter_expression["discontinued"]
+        return mask
+
+    def search(
+        self,
+        prompt_embedding: List[float],
+        filter_expression: Dict[str, Any],
+        match_threshold: float = MATCH_THRESHOLD,
+        match_count: int = MATCH_COUNT
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the items closest to an embedding that satisfy the filter criteria.
+
+        Args:
+            prompt_embedding (List[float]): The embedding vector to search against
+            filter_expression (Dict[str, Any]): Filter criteria to apply
+            match_threshold (float): Minimum cosine similarity of a match
+            match_count (int): Maximum number of matches to return (capped at 100)
+
+        Returns:
+            List[Dict[str, Any]]: Matches ordered by ascending cosine distance, with
+                                  the same fields as the get_fashion_items RPC
+        """
+        query = np.asarray(prompt_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        if query_norm > 0:
+            query = query / query_norm
+
+        mask = self._filter_mask(filter_expression)
+        limit = min(match_count, MAX_MATCH_COUNT)
+
+        if self.index is not None:
+            matches = self._search_index(query, mask, match_threshold, limit)
+            if matches is not None:
+                return matches
+
+        if self.store is not None:
+            return self._search_store(query, mask, match_threshold, limit)
+
+        # Score every item at once, then keep the ones passing all filters
+        distances = 1 - self.embeddings @ query
+        candidates = np.flatnonzero(mask & (distances < 1 - match_threshold))
+
+        # Select the closest matches without sorting every candidate
+        if candidates.size > limit:
+            candidates = candidates[np.argpartition(distances[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(distances[candidates], kind="stable")]
+
+        return [self._result_row(i, float(distances[i])) for i in candidates]
+
+    def _search_store(
+        self,
+        query: np.ndarray,
+        mask: np.ndarray,
+        match_threshold: float,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Find matches by scanning the quantized store and reranking exactly.
+
+        Args:
+            query (np.ndarray): Normalized query embedding
+            mask (np.ndarray): Items satisfying the filter criteria
+            match_threshold (float): Minimum cosine similarity of a match
+            limit (int): Maximum number of matches to return
+
+        Returns:
+            List[Dict[str, Any]]: Matches ordered by ascending cosine distance
+        """
+        rows, distances = self.store.search(
+            query, max(RERANK_COUNT, limit), mask=mask, min_similarity=match_threshold
+        )
+        keep = distances < 1 - match_threshold
+        return [
+            self._result_row(int(row), float(distance))
+            for row, distance in zip(rows[keep][:limit], distances[keep][:limit])
+        ]
+
+    def _search_index(
+        self,
+        query: np.ndarray,
+        mask: np.ndarray,
+        match_threshold: float,
+        limit: int
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Find matches among the approximate nearest neighbors from the HNSW index.
+
+        Args:
+            query (np.ndarray): Normalized query embedding
+            mask (np.ndarray): Items satisfying the filter criteria
+            match_threshold (float): Minimum cosine similarity of a match
+            limit (int): Maximum number of matches to return
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Matches ordered by ascending cosine
+                distance, or None if the neighbors retrieved could not fill
+                the result and an exact search is needed
+        """
+        # Over-fetch so that most filtered searches can still be answered
+        neighbors = self.index.search(query, max(self.index.ef_search, limit * 4))
+
+        matches = []
+        for parent_asin, distance in neighbors:
+            index = self._index_by_asin.get(parent_asin)
+            if index is None or not mask[index] or distance >= 1 - match_threshold:
+                continue
+            matches.append(self._result_row(index, distance))
+            if len(matches) == limit:
+                return matches
+
+        # Too few matches is only final if the neighbors already reached past the threshold
+        reached_threshold = len(neighbors) == len(self.index) or (
+            neighbors and neighbors[-1][1] >= 1 - match_threshold
+        )
+        return matches if reached_threshold else None
+
+    def _result_row(self, index: int, cosine_distance: float) -> Dict[str, Any]:
+        """
+        Build a search result in the shape returned by the get_fashion_items RPC.
+
+        Args:
+            index (int): Position of the item in the catalog
+            cosine_distance (float): Distance between the item and the query
+
+        Returns:
+            Dict[str, Any]: The search result
+        """
+        item = self.items[index]
+        row = {field: item.get(field) for field in RESULT_FIELDS}
+        row["cosine_distance"] = cosine_distance
+        # Loaded catalogs hold the status in a NumPy string array
+        row["discontinued_item"] = str(self.discontinued[index])
+        return row
+
+    async def query_postgres(
+        self,
+        prompt_embedding: List[float],
+        filter_expression: Dict[str, Any],
+        match_count: int = MATCH_COUNT,
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Perform a vector similarity search on fashion items.
+
+        Named after QueryService.query_postgres so the services are
+        interchangeable. The search runs in a worker thread, since NumPy
+        releases the GIL during the matrix-vector product.
+
+        Args:
+            prompt_embedding (List[float]): The embedding vector to search against
+            filter_expression (Dict[str, Any]): Optional filters to apply to the search
+            match_count (int): Maximum number of matches to return (capped at 100)
+            fields (Optional[Sequence[str]]): Accepted for compatibility with
+                                              QueryService; matches always have
+                                              every result field, since nothing
+                                              is sent over the network
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Dictionary containing the matched items
+                                            in the "response" key
+        """
+        matches = await asyncio.to_thread(
+            self.search, prompt_embedding, filter_expression, match_count=match_count
+        )
+        return {
+            "response": matches
+        }
+
+    async def get_item(
+        self,
+        parent_asin: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a specific fashion item by its parent ASIN.
+
+        Args:
+            parent_asin (str): The parent ASIN (Amazon Standard Identification Number)
+                              that uniquely identifies the product
+            fields (Optional[Sequence[str]]): Fields to return, or None for all
+
+        Returns:
+            Optional[Dict[str, Any]]: The item data, or None if it is not in the catalog
+        """
+        items = await self.get_items([parent_asin], fields)
+        return items.get(parent_asin)
+
+    async def get_items(
+        self,
+        parent_asins: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve several fashion items by their parent ASINs.
+
+        Args:
+            parent_asins (List[str]): The parent ASINs of the products
+            fields (Optional[Sequence[str]]): Fields to return, or None for all
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The data of each item in the catalog,
+                                       keyed by parent ASIN
+        """
+        return {
+            parent_asin: (
+                project(self.items[self._index_by_asin[parent_asin]], fields)
+                if fields is not None else self.items[self._index_by_asin[parent_asin]]
+            )
+            for parent_asin in parent_asins
+            if parent_asin in self._index_by_asin
+        }
+
+    def invalidate_items(self, parent_asins: List[str]) -> int:
+        """
+        Accept cache invalidations like QueryService; the local catalog has no item cache.
+
+        Args:
+            parent_asins (List[str]): The parent ASINs of the changed products
+
+        Returns:
+            int: Always 0
+        """
+        return 0
@@ -0,0 +1,262 @@
+"""
+Metrics Module
+
+This module measures where request time goes. Search stages are timed with
+`span`, which feeds a Prometheus histogram and the timings of the current
+request; `MetricsMiddleware` starts those timings for each request and
+reports them in a Server-Timing header, so browser devtools show the
+breakdown. Cache and dependency counters are read from their `stats()` only
+when Prometheus scrapes `/metrics`, adding nothing to the request path.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+T = TypeVar("T")
+
+STAGE_SECONDS = Histogram(
+    "search_stage_seconds",
+    "Duration of each completed search stage",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_seconds",
+    "Duration of HTTP requests until the response starts",
+    ["method", "route", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+SEARCH_RESULTS = Histogram(
+    "search_results",
+    "Number of items returned by the database for a search",
+    buckets=(0, 1, 5, 10, 25, 50, 100)
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens",
+    "Tokens used by OpenAI calls",
+    ["operation", "kind"]
+)
+
+
+class Timings:
+    """
+    Durations of the stages of one request, in the order they finished.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.spans.append((stage, seconds))
+
+    def header(self) -> str:
+        """
+        Format the timings as a Server-Timing header.
+
+        Returns:
+            str: Each stage's duration in milliseconds, followed by the total
+                 time since the request started
+        """
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.spans]
+        entries.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+# Timings of the request being handled; tasks started by the request inherit them
+_current_timings: ContextVar[Optional[Timings]] = ContextVar("current_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """
+    Record the duration of a completed stage.
+
+    Args:
+        stage (str): Name of the stage
+        seconds (float): Its duration
+    """
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.record(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Time a block of code as a search stage.
+
+    Stages that raise or are cancelled are not recorded, so the histograms
+    only describe work that completed.
+
+    Args:
+        stage (str): Name of the stage
+    """
+    start_time = time.perf_counter()
+    yield
+    record_stage(stage, time.perf_counter() - start_time)
+
+
+@contextmanager
+def capture_stages() -> Iterator[List[Tuple[str, float]]]:
+    """
+    Collect the stages completed inside a block apart from the current request's.
+
+    Used for work shared by several requests, which each add the collected
+    stages to their own timings with `replay_stages`. The stages are still
+    observed by the Prometheus histogram once, as they complete.
+
+    Yields:
+        List[Tuple[str, float]]: The stages and durations, filled in as they complete
+    """
+    timings = Timings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings.spans
+    finally:
+        _current_timings.reset(token)
+
+
+def replay_stages(spans: List[Tuple[str, float]]) -> None:
+    """
+    Add stages timed elsewhere to the current request's timings, without
+    observing them in the histogram again.
+
+    Args:
+        spans (List[Tuple[str, float]]): Stages and their durations
+    """
+    timings = _current_timings.get()
+    if timings is not None:
+        for stage, seconds in spans:
+            timings.record(stage, seconds)
+
+
+async def timed(stage: str, awaitable: Awaitable[T]) -> T:
+    """
+    Await a coroutine as a search stage, for stages run as tasks.
+
+    Args:
+        stage (str): Name of the stage
+        awaitable (Awaitable[T]): The stage's coroutine
+
+    Returns:
+        T: The coroutine's result
+    """
+    with span(stage):
+        return await awaitable
+
+
+def record_token_usage(operation: str, usage: Any) -> None:
+    """
+    Count the tokens used by an OpenAI call.
+
+    Args:
+        operation (str): Name of the call, such as "filters" or "embeddings"
+        usage (Any): The response's usage, from the Responses or Embeddings API
+    """
+    if usage is None:
+        return
+    input_tokens = getattr(usage, "input_tokens", None)
+    if input_tokens is None:
+        input_tokens = getattr(usage, "prompt_tokens", 0)
+    OPENAI_TOKENS.labels(operation, "input").inc(input_tokens or 0)
+    OPENAI_TOKENS.labels(operation, "output").inc(getattr(usage, "output_tokens", 0) or 0)
+
+
+class StatsCollector:
+    """
+    Prometheus collector exposing the counters that services keep in `stats()`.
+    """
+
+    def __init__(
+        self,
+        caches: Dict[str, Callable[[], Optional[Dict[str, Any]]]],
+        dependencies: Dict[str, Callable[[], Dict[str, Any]]]
+    ) -> None:
+        """
+        Initialize the collector.
+
+        Args:
+            caches (Dict[str, Callable[[], Optional[Dict[str, Any]]]]): Functions
+                returning the stats of each cache, or None if the cache is disabled
+            dependencies (Dict[str, Callable[[], Dict[str, Any]]]): Functions
+                returning the stats of each external dependency
+        """
+        self.caches = caches
+        self.dependencies = dependencies
+
+    def collect(self) -> Iterator[Any]:
+        hits = CounterMetricFamily("cache_hits", "Cache lookups that found an entry", labels=["cache"])
+        misses = CounterMetricFamily("cache_misses", "Cache lookups that found nothing", labels=["cache"])
+        size = GaugeMetricFamily("cache_entries", "Entries held by a cache", labels=["cache"])
+        for name, stats in self.caches.items():
+            cache_stats = stats()
+            if cache_stats is None:
+                continue
+            # The embedding cache splits hits between memory and disk, and the
+            # filter parser counts its misses as fallbacks to the LLM
+            hits.add_metric([name], cache_stats.get(
+                "hits", cache_stats.get("memory_hits", 0) + cache_stats.get("disk_hits", 0)
+            ))
+            misses.add_metric([name], cache_stats.get("misses", cache_stats.get("fallbacks", 0)))
+            entries = cache_stats.get("size", cache_stats.get("memory_size"))
+            if entries is not None:
+                size.add_metric([name], entries)
+        yield from (hits, misses, size)
+
+        counters = {
+            key: CounterMetricFamily(f"dependency_{key}", f"Dependency {key.replace('_', ' ')}", labels=["dependency"])
+            for key in ("calls", "failures", "retries", "rejections", "hedges", "hedge_wins")
+        }
+        breaker_open = GaugeMetricFamily(
+            "dependency_breaker_open", "Whether a dependency's circuit breaker rejects calls", labels=["dependency"]
+        )
+        for name, stats in self.dependencies.items():
+            dependency_stats = stats()
+            for key, counter in counters.items():
+                counter.add_metric([name], dependency_stats[key])
+            breaker_open.add_metric([name], int(dependency_stats["breaker"] != "closed"))
+        yield from counters.values()
+        yield breaker_open
+
+
+class MetricsMiddleware:
+    """
+    Time each request, adding a Server-Timing header to its response.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings()
+        token = _current_timings.set(timings)
+
+        async def send_with_timings(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.header())
+                # Browsers hide the timings of cross-origin responses without this
+                headers.append("Timing-Allow-Origin", "*")
+                # Label by route template so that item ASINs do not become labels
+                route = scope.get("route")
+                REQUEST_SECONDS.labels(
+                    scope["method"], getattr(route, "path", "unmatched"), str(message["status"])
+                ).observe(time.perf_counter() - timings.started_at)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _current_timings.reset(token)
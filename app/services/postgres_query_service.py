@@ -0,0 +1,248 @@
+"""
+Postgres Query Service Module
+
+This module queries the fashion items database over a direct asyncpg
+connection pool instead of through PostgREST. Searches still call the
+get_fashion_items function, so they return exactly the same rows as the
+Supabase RPC, but the prompt embedding is sent in pgvector's binary format
+rather than as a JSON array of 1536 numbers, and each query is prepared
+once per connection.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import asyncpg
+except ImportError:  # asyncpg is only needed for QUERY_BACKEND=postgres
+    asyncpg = None
+
+from services.cache import LRUCache
+from services.resilience import Dependency, call_dependency
+from services.query_service import MATCH_COUNT, MATCH_THRESHOLD, QueryService
+from services.projection import RANKING_FIELDS, sql_columns
+
+# Filter parameters of get_fashion_items, in signature order, with the type
+# each value is converted to
+FILTER_PARAMETERS = (
+    ("min_price", float),
+    ("max_price", float),
+    ("min_avg_rating", float),
+    ("max_avg_rating", float),
+    ("min_rating_count", int),
+    ("max_rating_count", int),
+    ("store_name", str),
+    ("discontinued", str)
+)
+
+# pgvector's default candidate list size, which the RPC searches with
+DEFAULT_EF_SEARCH: int = 40
+
+
+def encode_vector(vector: Sequence[float]) -> bytes:
+    """
+    Encode a vector in pgvector's binary format.
+
+    Args:
+        vector (Sequence[float]): The vector
+
+    Returns:
+        bytes: The dimension and an unused flag as big-endian int16, followed
+               by the values as big-endian float32
+    """
+    values = np.asarray(vector, dtype=">f4")
+    return np.array([len(values), 0], dtype=">i2").tobytes() + values.tobytes()
+
+
+def decode_vector(data: bytes) -> List[float]:
+    """
+    Decode a vector from pgvector's binary format.
+
+    Args:
+        data (bytes): The encoded vector
+
+    Returns:
+        List[float]: The vector's values
+    """
+    dimension = int(np.frombuffer(data, dtype=">i2", count=1)[0])
+    return np.frombuffer(data, dtype=">f4", count=dimension, offset=4).astype(np.float32).tolist()
+
+
+class PostgresQueryService(QueryService):
+    """
+    Service for querying the database for fashion items over asyncpg.
+
+    A drop-in replacement for QueryService, with which it shares the item
+    cache. The pool is created on first use, since it needs a running event
+    loop. Column values are decoded the way PostgREST renders them in JSON:
+    JSONB as dictionaries and numerics as ints or floats.
+
+    Connections must not go through a transaction-mode pooler (Supabase's
+    port 6543), which does not support prepared statements; use the direct
+    connection or the session-mode pooler.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        item_cache: Optional[LRUCache] = None,
+        dependency: Optional[Dependency] = None,
+        min_pool_size: int = 2,
+        max_pool_size: int = 10,
+        ef_search: int = DEFAULT_EF_SEARCH
+    ):
+        """
+        Initialize the query service.
+
+        Args:
+            dsn (str): Postgres connection string
+            item_cache (Optional[LRUCache]): Cache of items keyed by parent ASIN,
+                                             or None to disable caching
+            dependency (Optional[Dependency]): Retries, hedging and circuit breaker
+                                               for database calls, or None to call directly
+            min_pool_size (int): Connections opened when the pool is created
+            max_pool_size (int): Maximum number of open connections
+            ef_search (int): HNSW candidate list size of every connection's
+                             session; the default matches the RPC's results
+
+        Raises:
+            ImportError: If asyncpg is not installed
+        """
+        if asyncpg is None:
+            raise ImportError("QUERY_BACKEND=postgres requires asyncpg (pip install asyncpg)")
+        super().__init__(None, item_cache, dependency)
+        self.dsn = dsn
+        self.min_pool_size = min_pool_size
+        self.max_pool_size = max_pool_size
+        self.ef_search = ef_search
+        self._pool: Optional["asyncpg.Pool"] = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _init_connection(self, connection: "asyncpg.Connection") -> None:
+        """
+        Prepare a new pooled connection.
+
+        Args:
+            connection (asyncpg.Connection): The connection
+        """
+        # pgvector may be installed in any schema, such as Supabase's "extensions"
+        vector_schema = await connection.fetchval(
+            "SELECT typnamespace::regnamespace::text FROM pg_type WHERE typname = 'vector'"
+        )
+        await connection.set_type_codec(
+            "vector", schema=vector_schema, encoder=encode_vector, decoder=decode_vector, format="binary"
+        )
+        await connection.set_type_codec(
+            "jsonb", schema="pg_catalog", encoder=json.dumps, decoder=json.loads, format="text"
+        )
+        # Parsing numerics as JSON numbers yields ints or floats, like PostgREST
+        await connection.set_type_codec(
+            "numeric", schema="pg_catalog", encoder=str, decoder=json.loads, format="text"
+        )
+
+    async def pool(self) -> "asyncpg.Pool":
+        """
+        Get the connection pool, creating it on first use.
+
+        Returns:
+            asyncpg.Pool: The connection pool
+        """
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=self.min_pool_size,
+                        max_size=self.max_pool_size,
+                        init=self._init_connection,
+                        # Sent when connecting, so the RESET ALL run when a
+                        # connection is released returns to it
+                        server_settings={"hnsw.ef_search": str(int(self.ef_search))}
+                    )
+        return self._pool
+
+    async def close(self) -> None:
+        """
+        Close the connection pool, if it was created.
+        """
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def _fetch(self, operation: str, query: str, *args: Any) -> List[Dict[str, Any]]:
+        """
+        Run a read query on a pooled connection.
+
+        asyncpg prepares each distinct query text once per connection and
+        reuses the statement afterwards.
+
+        Args:
+            operation (str): Name of the operation, used by the dependency
+            query (str): The SQL query
+            *args (Any): The query's parameters
+
+        Returns:
+            List[Dict[str, Any]]: The rows returned
+        """
+        pool = await self.pool()
+        rows = await call_dependency(
+            self.dependency, operation, lambda: pool.fetch(query, *args), idempotent=True
+        )
+        return [dict(row) for row in rows]
+
+    async def query_postgres(
+        self,
+        prompt_embedding: List[float],
+        filter_expression: Dict[str, Any],
+        match_count: int = MATCH_COUNT,
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Perform a vector similarity search on fashion items.
+
+        Calls get_fashion_items like the Supabase RPC, selecting only the
+        requested fields (plus the ones needed for ranking) from its results.
+
+        Args:
+            prompt_embedding (List[float]): The embedding vector to search against
+            filter_expression (Dict[str, Any]): Optional filters to apply to the search
+            match_count (int): Maximum number of matches to return (capped at 100)
+            fields (Optional[Sequence[str]]): Result fields to return, or None for all
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Dictionary containing the matched items
+                                            in the "response" key
+        """
+        columns = ", ".join(sql_columns([*RANKING_FIELDS, *fields])) if fields is not None else "*"
+        placeholders = ", ".join(f"${i}" for i in range(1, len(FILTER_PARAMETERS) + 4))
+        query = f"SELECT {columns} FROM get_fashion_items({placeholders})"
+        filters = [
+            convert(filter_expression[name]) if filter_expression.get(name) is not None else None
+            for name, convert in FILTER_PARAMETERS
+        ]
+        rows = await self._fetch("vector_search", query, prompt_embedding, MATCH_THRESHOLD, match_count, *filters)
+        return {
+            "response": rows
+        }
+
+    async def _fetch_items(
+        self,
+        parent_asins: List[str],
+        fields: Optional[Sequence[str]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch items from the fashion_products table.
+
+        Args:
+            parent_asins (List[str]): The parent ASINs of the products
+            fields (Optional[Sequence[str]]): Fields to select, or None for all columns
+
+        Returns:
+            List[Dict[str, Any]]: The rows found, each including its parent ASIN
+        """
+        columns = ", ".join(sql_columns(["parent_asin", *fields])) if fields is not None else "*"
+        query = f"SELECT {columns} FROM fashion_products WHERE parent_asin = ANY($1::text[])"
+        return await self._fetch("get_items", query, parent_asins)
@@ -0,0 +1,146 @@
+"""
+Projection Module
+
+This module defines the fields that search results and items can be reduced
+to, and helpers to push a field selection down into PostgREST or SQL queries
+and to project fetched rows. Responses default to a compact set of fields, since
+the full image arrays dominate the payload and are rarely displayed.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Fields returned by the get_fashion_items RPC, plus the derived thumbnail
+# and the ranking score
+SEARCH_FIELDS: Tuple[str, ...] = (
+    "parent_asin", "title", "images", "thumbnail", "average_rating", "rating_number", "price",
+    "store", "cosine_distance", "discontinued_item", "score"
+)
+# Columns of the fashion_products table, plus the derived thumbnail
+ITEM_FIELDS: Tuple[str, ...] = (
+    "parent_asin", "main_category", "title", "average_rating", "rating_number", "features",
+    "description", "price", "images", "thumbnail", "videos", "store", "categories", "details",
+    "bought_together"
+)
+
+# Fields returned when a request does not choose any
+DEFAULT_SEARCH_FIELDS: Tuple[str, ...] = ("parent_asin", "title", "thumbnail", "price", "average_rating", "score")
+DEFAULT_ITEM_FIELDS: Tuple[str, ...] = ("parent_asin", "title", "thumbnail", "price", "average_rating")
+
+# Fields the search pipeline needs for ranking and the recommendation,
+# fetched whatever the response includes
+RANKING_FIELDS: Tuple[str, ...] = ("parent_asin", "title", "cosine_distance", "average_rating", "rating_number")
+
+# Fields computed by the API rather than read from the database
+COMPUTED_FIELDS = {"score"}
+
+# PostgREST selection of the first thumbnail URL from the images JSONB
+THUMBNAIL_SELECT = "thumbnail:images->thumb->>0"
+# The same selection in SQL, for queries sent to Postgres directly
+THUMBNAIL_SQL = "images->'thumb'->>0 AS thumbnail"
+
+
+def parse_fields(
+    fields: Optional[Union[str, Sequence[str]]],
+    allowed: Sequence[str],
+    default: Sequence[str]
+) -> Tuple[str, ...]:
+    """
+    Validate a requested field selection.
+
+    Args:
+        fields (Optional[Union[str, Sequence[str]]]): Field names, as a list or a
+                                                      comma-separated string; "*"
+                                                      selects every field and None
+                                                      the default fields
+        allowed (Sequence[str]): Fields that can be selected
+        default (Sequence[str]): Fields used when none are requested
+
+    Returns:
+        Tuple[str, ...]: The selected fields, without duplicates
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if fields is None:
+        return tuple(default)
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    fields = [field.strip() for field in fields if field.strip()]
+    if not fields:
+        return tuple(default)
+    if "*" in fields:
+        return tuple(allowed)
+
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(allowed)}")
+    return tuple(dict.fromkeys(fields))
+
+
+def select_columns(fields: Iterable[str]) -> List[str]:
+    """
+    Convert fields to PostgREST select columns.
+
+    Args:
+        fields (Iterable[str]): Field names
+
+    Returns:
+        List[str]: Columns to pass to `select`, with the thumbnail read from
+                   the images JSONB and computed fields left out
+    """
+    return [
+        THUMBNAIL_SELECT if field == "thumbnail" else field
+        for field in dict.fromkeys(fields)
+        if field not in COMPUTED_FIELDS
+    ]
+
+
+def sql_columns(fields: Iterable[str]) -> List[str]:
+    """
+    Convert fields to SQL select columns.
+
+    Args:
+        fields (Iterable[str]): Field names
+
+    Returns:
+        List[str]: Quoted column names, with the thumbnail read from the images
+                   JSONB and computed fields left out
+    """
+    return [
+        THUMBNAIL_SQL if field == "thumbnail" else f'"{field}"'
+        for field in dict.fromkeys(fields)
+        if field not in COMPUTED_FIELDS
+    ]
+
+
+def thumbnail_url(row: Dict[str, Any]) -> Optional[str]:
+    """
+    Read the first thumbnail URL of a row.
+
+    Args:
+        row (Dict[str, Any]): A search result or item
+
+    Returns:
+        Optional[str]: The thumbnail URL, or None if the row has none
+    """
+    if "thumbnail" in row:
+        return row["thumbnail"]
+    thumbnails = (row.get("images") or {}).get("thumb") or []
+    return thumbnails[0] if thumbnails else None
+
+
+def project(row: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """
+    Reduce a row to the selected fields.
+
+    Args:
+        row (Dict[str, Any]): A search result or item
+        fields (Sequence[str]): The fields to keep
+
+    Returns:
+        Dict[str, Any]: A new dictionary with exactly the selected fields
+    """
+    return {
+        field: thumbnail_url(row) if field == "thumbnail" else row.get(field)
+        for field in fields
+    }
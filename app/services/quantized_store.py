@@ -0,0 +1,232 @@
+"""
+Quantized Embedding Store Module
+
+This module provides a compact in-memory copy of the catalog's embeddings.
+Each vector is kept as int8 codes with a per-vector scale (or as float16) for
+a first-pass similarity scan, and the best candidates are reranked with the
+exact float32 vectors, which stay on disk in a memory-mapped file and are only
+read for the rows being reranked.
+"""
+
+import json
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from services.atomic_write import write_atomically
+
+# Files making up a saved store
+META_FILE = "meta.json"
+KEYS_FILE = "keys.json"
+CODES_FILE = "codes.npy"
+SCALES_FILE = "scales.npy"
+VECTORS_FILE = "vectors.npy"
+
+# Supported code types
+CODE_DTYPES = ("int8", "float16")
+
+
+class QuantizedEmbeddingStore:
+    """
+    Store of unit-length embeddings with quantized codes and exact reranking.
+
+    With int8 codes each vector component is rounded to `round(x / scale)`,
+    where `scale` is the vector's largest absolute component divided by 127,
+    so a 1536-d vector takes 1.5 KB instead of 6 KB. The approximate scan is
+    done in chunks so the codes are never expanded to float32 all at once.
+    """
+
+    # Rows converted to float32 at a time during the approximate scan; small
+    # chunks stay in the CPU cache, so the scan runs at memory bandwidth
+    SCAN_CHUNK_SIZE: int = 128
+
+    def __init__(
+        self,
+        keys: List[str],
+        codes: np.ndarray,
+        scales: Optional[np.ndarray],
+        vectors: np.ndarray
+    ):
+        """
+        Initialize the store. Use `build` or `load` to create one.
+
+        Args:
+            keys (List[str]): Key of each row
+            codes (np.ndarray): Quantized vectors, int8 or float16
+            scales (Optional[np.ndarray]): Per-row scale of int8 codes, or None for float16
+            vectors (np.ndarray): Exact unit-length float32 vectors, usually memory-mapped
+        """
+        self.keys = keys
+        self.codes = codes
+        self.scales = scales
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def code_dtype(self) -> str:
+        return str(self.codes.dtype)
+
+    @property
+    def resident_bytes(self) -> int:
+        """
+        Memory held by the codes and scales, which are scanned on every search.
+        """
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    @staticmethod
+    def quantize(vectors: np.ndarray, code_dtype: str = "int8") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Encode vectors as quantized codes.
+
+        Args:
+            vectors (np.ndarray): Float32 matrix with one vector per row
+            code_dtype (str): "int8" for scalar quantization or "float16"
+
+        Returns:
+            Tuple[np.ndarray, Optional[np.ndarray]]: The codes and, for int8,
+                                                     the per-row scales
+        """
+        if code_dtype not in CODE_DTYPES:
+            raise ValueError(f"Unsupported code type {code_dtype!r}, expected one of {CODE_DTYPES}")
+        if code_dtype == "float16":
+            return vectors.astype(np.float16), None
+
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @classmethod
+    def build(
+        cls,
+        keys: Sequence[str],
+        vectors: np.ndarray,
+        path: Union[str, Path],
+        code_dtype: str = "int8"
+    ) -> "QuantizedEmbeddingStore":
+        """
+        Quantize a set of vectors and save the store to a directory.
+
+        Args:
+            keys (Sequence[str]): Key of each vector
+            vectors (np.ndarray): Matrix with one vector per row
+            path (Union[str, Path]): Directory to save the store to
+            code_dtype (str): "int8" for scalar quantization or "float16"
+
+        Returns:
+            QuantizedEmbeddingStore: The saved store, with its exact vectors memory-mapped
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms > 0, norms, 1)
+        codes, scales = cls.quantize(vectors, code_dtype)
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        write_atomically(path / VECTORS_FILE, lambda file: np.save(file, vectors))
+        write_atomically(path / CODES_FILE, lambda file: np.save(file, codes))
+        if scales is not None:
+            write_atomically(path / SCALES_FILE, lambda file: np.save(file, scales))
+        write_atomically(path / KEYS_FILE, lambda file: file.write(json.dumps(list(keys)).encode()))
+        write_atomically(path / META_FILE, lambda file: file.write(json.dumps({
+            "code_dtype": code_dtype,
+            "count": len(keys),
+            "dim": int(vectors.shape[1])
+        }).encode()))
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = False) -> "QuantizedEmbeddingStore":
+        """
+        Load a saved store, reading the codes into memory and memory-mapping
+        the exact vectors.
+
+        Args:
+            path (Union[str, Path]): Directory the store was saved to
+            mmap (bool): Whether to memory-map the codes and scales too, so that
+                         worker processes share one copy of them
+
+        Returns:
+            QuantizedEmbeddingStore: The loaded store
+        """
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text())
+        keys = json.loads((path / KEYS_FILE).read_text())
+        mmap_mode = "r" if mmap else None
+        codes = np.load(path / CODES_FILE, mmap_mode=mmap_mode)
+        scales = np.load(path / SCALES_FILE, mmap_mode=mmap_mode) if meta["code_dtype"] == "int8" else None
+        vectors = np.load(path / VECTORS_FILE, mmap_mode="r")
+        return cls(keys, codes, scales, vectors)
+
+    def approximate_similarities(self, query: np.ndarray) -> np.ndarray:
+        """
+        Estimate the cosine similarity of every row to a query from the codes.
+
+        Args:
+            query (np.ndarray): Normalized float32 query vector
+
+        Returns:
+            np.ndarray: Estimated similarity of each row
+        """
+        similarities = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), self.SCAN_CHUNK_SIZE):
+            chunk = slice(start, start + self.SCAN_CHUNK_SIZE)
+            similarities[chunk] = self.codes[chunk].astype(np.float32) @ query
+        if self.scales is not None:
+            similarities *= self.scales
+        return similarities
+
+    def search(
+        self,
+        query: np.ndarray,
+        rerank_count: int,
+        mask: Optional[np.ndarray] = None,
+        min_similarity: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows closest to a query, scanning the codes and reranking exactly.
+
+        Args:
+            query (np.ndarray): Normalized float32 query vector
+            rerank_count (int): Number of approximate candidates to rerank
+            mask (Optional[np.ndarray]): Rows eligible to be returned, or None for all
+            min_similarity (Optional[float]): Approximate similarity below which rows
+                                              are not considered; a small margin is
+                                              subtracted to absorb quantization error
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Up to `rerank_count` row numbers and their
+                                           exact cosine distances, closest first
+        """
+        similarities = self.approximate_similarities(query)
+        eligible = np.ones(len(similarities), dtype=bool) if mask is None else mask.copy()
+        if min_similarity is not None:
+            eligible &= similarities >= min_similarity - self.error_margin()
+        candidates = np.flatnonzero(eligible)
+
+        if candidates.size > rerank_count:
+            top = np.argpartition(-similarities[candidates], rerank_count - 1)[:rerank_count]
+            candidates = candidates[top]
+        # Read candidates in file order to keep memory-mapped reads sequential
+        candidates.sort()
+
+        distances = 1 - np.asarray(self.vectors[candidates]) @ query
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def error_margin(self) -> float:
+        """
+        Bound on the error of an approximate similarity, used to widen the
+        threshold so quantization never excludes a true match.
+
+        Returns:
+            float: Half the largest quantization step, or the float16 rounding bound
+        """
+        if self.scales is None:
+            return 1e-3
+        # Each component is off by at most scale / 2, and the query has unit length
+        return float(self.scales.max()) / 2 * np.sqrt(self.codes.shape[1])
@@ -5,82 +5,208 @@ This module provides database querying functionality for the fashion items datab
 It includes methods for vector similarity search and item retrieval.
 """
 
+import asyncio
 import json
-from typing import Dict, List, Any, Optional
+import logging
+from typing import Dict, List, Any, Optional, Sequence
 from supabase import Client
+from services.cache import LRUCache
+from services.resilience import Dependency, call_dependency
+from services.projection import RANKING_FIELDS, project, select_columns
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Minimum similarity score to include results
+MATCH_THRESHOLD: float = 0.3
+# Maximum number of results to return
+MATCH_COUNT: int = 10
+# Hard cap on the number of results applied by get_fashion_items
+MAX_MATCH_COUNT: int = 100
 
 class QueryService:
     """
     Service for querying the database for fashion items.
     
     This service provides methods to perform vector similarity searches and
-    retrieve specific items from the database.
+    retrieve specific items from the database. The Supabase client is
+    synchronous, so each request is run in a worker thread to keep the
+    event loop free while PostgREST responds. Retrieved items can be kept in
+    an in-process cache, which must be invalidated when an item is rewritten.
+    All queries are reads, so slow ones can be hedged.
     """
     
-    def __init__(self, supabase_client: Client):
+    def __init__(
+        self,
+        supabase_client: Client,
+        item_cache: Optional[LRUCache] = None,
+        dependency: Optional[Dependency] = None
+    ):
         """
         Initialize the query service.
         
         Args:
             supabase_client (Client): Initialized Supabase client instance
+            item_cache (Optional[LRUCache]): Cache of items keyed by parent ASIN,
+                                             or None to disable caching
+            dependency (Optional[Dependency]): Retries, hedging and circuit breaker
+                                               for Supabase calls, or None to call directly
         """
         self.supabase_client = supabase_client
+        self.item_cache = item_cache
+        self.dependency = dependency
         
-    def query_postgres(self, prompt_embedding: List[float], filter_expression: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    async def query_postgres(
+        self,
+        prompt_embedding: List[float],
+        filter_expression: Dict[str, Any],
+        match_count: int = MATCH_COUNT,
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
         """
         Perform a vector similarity search on fashion items.
         
         This method sends a request to the Supabase RPC function that performs
         vector similarity search using the provided embedding and optional filters.
+        When fields are given, only those columns (plus the ones needed for
+        ranking) are selected from the RPC's results, so PostgREST does not
+        serialize or send the rest.
         
         Args:
             prompt_embedding (List[float]): The embedding vector to search against
             filter_expression (Dict[str, Any]): Optional filters to apply to the search
                                                (e.g., category, brand, price range)
+            match_count (int): Maximum number of matches to return (capped at 100)
+            fields (Optional[Sequence[str]]): Result fields to return, or None for all
             
         Returns:
             Dict[str, List[Dict[str, Any]]]: Dictionary containing the matched items
                                             in the "response" key
         """
         # Call the Supabase RPC function with embedding and filters
-        response = (
-            self.supabase_client.rpc(
-                "get_fashion_items",
-                {
-                    "prompt_embedding": prompt_embedding,
-                    "match_threshold": 0.3,  # Minimum similarity score to include results
-                    "match_count": 10,       # Maximum number of results to return
-                } | filter_expression  # Merge the filter parameters
-            ).execute()
+        request = self.supabase_client.rpc(
+            "get_fashion_items",
+            {
+                "prompt_embedding": prompt_embedding,
+                "match_threshold": MATCH_THRESHOLD,
+                "match_count": match_count,
+            } | filter_expression  # Merge the filter parameters
         )
-        print(response)
+        if fields is not None:
+            request = request.select(*select_columns([*RANKING_FIELDS, *fields]))
+        response = await call_dependency(
+            self.dependency, "vector_search", lambda: asyncio.to_thread(request.execute), idempotent=True
+        )
+        # Debug records are sampled, so this costs nothing for most searches
+        logger.debug({"event": "vector_search", "rows": len(response.data), "filters": filter_expression})
         # Wrap the response data in a standardized format
         response = {
             "response": response.data
         }
         return response
     
-    def get_item(self, parent_asin: str) -> Dict[str, Any]:
+    async def get_item(
+        self,
+        parent_asin: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Retrieve a specific fashion item by its parent ASIN.
         
         Args:
             parent_asin (str): The parent ASIN (Amazon Standard Identification Number)
                               that uniquely identifies the product
+            fields (Optional[Sequence[str]]): Fields to return, or None for all
+            
+        Returns:
+            Optional[Dict[str, Any]]: The item data, or None if not found
+            
+        Raises:
+            Exception: If the database query fails
+        """
+        items = await self.get_items([parent_asin], fields)
+        return items.get(parent_asin)
+    
+    async def get_items(
+        self,
+        parent_asins: List[str],
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve several fashion items by their parent ASINs.
+        
+        Cached items are returned without querying the database, and the rest
+        are fetched together in a single query that selects only the requested
+        fields. The cache keeps each projection of an item under the item's
+        ASIN, so invalidating an item drops all of them, and a cached complete
+        item can serve any projection.
+        
+        Args:
+            parent_asins (List[str]): The parent ASINs of the products
+            fields (Optional[Sequence[str]]): Fields to return, or None for all
             
         Returns:
-            Dict[str, Any]: The complete item data if found, or an empty dict if not found
+            Dict[str, Dict[str, Any]]: The data of each item found, keyed by
+                                       parent ASIN
             
         Raises:
-            Exception: If the database query fails for reasons other than item not found
+            Exception: If the database query fails
+        """
+        projection_key = tuple(fields) if fields is not None else "*"
+        items: Dict[str, Dict[str, Any]] = {}
+        if self.item_cache is not None:
+            for parent_asin in parent_asins:
+                projections = self.item_cache.get(parent_asin) or {}
+                if projection_key in projections:
+                    items[parent_asin] = projections[projection_key]
+                elif "*" in projections:
+                    items[parent_asin] = project(projections["*"], fields)
+        
+        missing = list(dict.fromkeys(asin for asin in parent_asins if asin not in items))
+        if not missing:
+            return items
+        
+        # Query the database for all uncached items at once
+        for row in await self._fetch_items(missing, fields):
+            item = project(row, fields) if fields is not None else row
+            items[row["parent_asin"]] = item
+            if self.item_cache is not None:
+                projections = dict(self.item_cache.get(row["parent_asin"]) or {})
+                projections[projection_key] = item
+                self.item_cache.set(row["parent_asin"], projections)
+        return items
+    
+    async def _fetch_items(
+        self,
+        parent_asins: List[str],
+        fields: Optional[Sequence[str]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch items from the fashion_products table.
+        
+        Args:
+            parent_asins (List[str]): The parent ASINs of the products
+            fields (Optional[Sequence[str]]): Fields to select, or None for all columns
+            
+        Returns:
+            List[Dict[str, Any]]: The rows found, each including its parent ASIN
         """
-        # Query the database for the specific item by parent_asin
-        response = (
-            self.supabase_client.table("fashion_items")
-            .select("*")
-            .eq("parent_asin", parent_asin)
-            .single() 
-            .execute()
+        columns = select_columns(["parent_asin", *fields]) if fields is not None else ["*"]
+        request = self.supabase_client.table("fashion_products").select(*columns).in_("parent_asin", parent_asins)
+        response = await call_dependency(
+            self.dependency, "get_items", lambda: asyncio.to_thread(request.execute), idempotent=True
         )
+        return response.data
+    
+    def invalidate_items(self, parent_asins: List[str]) -> int:
+        """
+        Remove items from the item cache after they have been rewritten.
         
-        return response.data
\ No newline at end of file
+        Args:
+            parent_asins (List[str]): The parent ASINs of the changed products
+            
+        Returns:
+            int: Number of items that were cached
+        """
+        if self.item_cache is None:
+            return 0
+        return sum(self.item_cache.delete(parent_asin) for parent_asin in parent_asins)
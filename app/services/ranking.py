@@ -0,0 +1,134 @@
+"""
+Ranking Module
+
+This module scores search results by combining semantic similarity with
+rating quality and popularity. The factors are computed for all candidates at
+once with NumPy, so ranking stays cheap when hundreds of candidates are
+over-fetched from the vector search.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class RankingWeights:
+    """
+    Weights of the factors making up an item's score.
+
+    Attributes:
+        similarity (float): Weight for cosine similarity to the prompt
+        rating (float): Weight for the confidence-adjusted average rating
+        popularity (float): Weight for the log-scaled number of ratings
+        min_ratings (int): Number of ratings needed for full confidence in an
+                           item's average rating
+    """
+    similarity: float = 0.7
+    rating: float = 0.2
+    popularity: float = 0.1
+    min_ratings: int = 1
+
+    def with_overrides(self, overrides: Optional[Dict[str, Any]]) -> "RankingWeights":
+        """
+        Copy the weights, replacing the ones given in a request.
+
+        Args:
+            overrides (Optional[Dict[str, Any]]): Weights to replace; None values
+                                                  keep the current weight
+
+        Returns:
+            RankingWeights: The combined weights
+        """
+        if not overrides:
+            return self
+        return replace(self, **{key: value for key, value in overrides.items() if value is not None})
+
+
+DEFAULT_RANKING_WEIGHTS = RankingWeights()
+
+
+def _ranking_columns(items: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Collect the fields used for ranking into arrays in a single pass over the items.
+
+    Missing values count as 0.
+
+    Args:
+        items (List[Dict[str, Any]]): The items
+
+    Returns:
+        np.ndarray: Float64 arrays of cosine distances, average ratings and
+                    numbers of ratings
+    """
+    return np.array(
+        [(item.get("cosine_distance") or 0, item.get("average_rating") or 0, item.get("rating_number") or 0)
+         for item in items],
+        dtype=np.float64
+    ).T
+
+
+def score_items(items: List[Dict[str, Any]], weights: RankingWeights = DEFAULT_RANKING_WEIGHTS) -> np.ndarray:
+    """
+    Compute the ranking score of each item.
+
+    Args:
+        items (List[Dict[str, Any]]): Items with 'cosine_distance', 'average_rating'
+                                      (0-5) and 'rating_number' fields
+        weights (RankingWeights): Weights of the ranking factors
+
+    Returns:
+        np.ndarray: The score of each item, in the same order as `items`
+    """
+    cosine_distances, average_ratings, rating_numbers = _ranking_columns(items)
+
+    # Convert cosine distance to cosine similarity (1 is perfect match)
+    similarities = 1 - cosine_distances
+
+    # Normalize average ratings to 0-1 and penalize items with few ratings,
+    # reaching full confidence at min_ratings
+    confidence = np.minimum(rating_numbers / weights.min_ratings, 1)
+    rating_scores = average_ratings / 5.0 * confidence
+
+    # Normalize the number of ratings on a log scale to handle large variations
+    max_log_ratings = np.log1p(rating_numbers.max(initial=0))
+    popularity_scores = np.log1p(rating_numbers) / max_log_ratings if max_log_ratings > 0 else np.zeros(len(items))
+
+    return (
+        weights.similarity * similarities +
+        weights.rating * rating_scores +
+        weights.popularity * popularity_scores
+    )
+
+
+def rank_items(
+    items: List[Dict[str, Any]],
+    weights: RankingWeights = DEFAULT_RANKING_WEIGHTS,
+    top_k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Rank items by score, keeping only the best ones.
+
+    Args:
+        items (List[Dict[str, Any]]): Items with 'cosine_distance', 'average_rating'
+                                      and 'rating_number' fields
+        weights (RankingWeights): Weights of the ranking factors
+        top_k (Optional[int]): Number of items to return, or None for all
+
+    Returns:
+        List[Dict[str, Any]]: Copies of the best items with a 'score' field added,
+                              by descending score; ties keep their original order
+    """
+    if not items or (top_k is not None and top_k <= 0):
+        return []
+
+    scores = score_items(items, weights)
+    order = np.arange(len(items))
+    if top_k is not None and top_k < len(items):
+        # Select the best items without sorting every candidate
+        order = np.argpartition(-scores, top_k - 1)[:top_k]
+        order.sort()
+    order = order[np.argsort(-scores[order], kind="stable")]
+
+    return [{**items[i], "score": float(scores[i])} for i in order]
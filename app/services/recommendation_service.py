@@ -0,0 +1,238 @@
+"""
+Recommendation Service Module
+
+This module generates search recommendations in the background so that search
+results can be returned without waiting for the recommendation LLM. Each
+recommendation is identified by the prompt and the set of top items it
+describes, so repeated searches reuse a finished or in-progress recommendation
+instead of generating it again. Jobs wait in a bounded queue, so a burst of
+searches cannot pile up jobs without limit.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from services.cache import LRUCache, normalize_prompt
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Status of a recommendation
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+# Generates the recommendation text for a prompt and its ranked items
+RecommendationGenerator = Callable[[str, List[Dict[str, Any]]], Awaitable[str]]
+# A queued job: its recommendation ID, prompt, items and generator
+Job = Tuple[str, str, List[Dict[str, Any]], RecommendationGenerator]
+
+
+class RecommendationService:
+    """
+    Pool of background recommendation jobs with a cache of their results.
+
+    A fixed pool of `max_concurrency` workers generates recommendations, taking
+    jobs from a queue of at most `max_queue_size`; jobs submitted while the
+    queue is full are refused. The workers are started by the first `submit`,
+    since they need a running event loop. Finished recommendations are kept in
+    the result cache, and failed ones are retried by the next search that
+    needs them.
+    """
+
+    def __init__(self, result_cache: LRUCache, max_concurrency: int = 8, max_queue_size: int = 100) -> None:
+        """
+        Initialize the recommendation service.
+
+        Args:
+            result_cache (LRUCache): Cache of finished recommendations, keyed by
+                                     recommendation ID
+            max_concurrency (int): Number of recommendations generated at the same time
+            max_queue_size (int): Maximum number of jobs waiting for a worker, at least 1
+        """
+        self.result_cache = result_cache
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.rejected = 0
+        self._queue: Optional["asyncio.Queue[Job]"] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Queued and running jobs, keyed by recommendation ID, resolved when they finish
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def recommendation_id(prompt: str, items: List[Dict[str, Any]]) -> str:
+        """
+        Compute the ID of the recommendation for a prompt and its top items.
+
+        Args:
+            prompt (str): The user's search query
+            items (List[Dict[str, Any]]): The ranked items the recommendation describes
+
+        Returns:
+            str: An ID that is the same for equivalent prompts with the same items,
+                 whatever their order
+        """
+        key = [normalize_prompt(prompt), sorted(item["parent_asin"] for item in items)]
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:32]
+
+    def submit(
+        self,
+        prompt: str,
+        items: List[Dict[str, Any]],
+        generate: RecommendationGenerator
+    ) -> Optional[str]:
+        """
+        Queue a recommendation unless it is already known or in progress.
+
+        Args:
+            prompt (str): The user's search query
+            items (List[Dict[str, Any]]): The ranked items to recommend from
+            generate (RecommendationGenerator): Coroutine function producing the text
+
+        Returns:
+            Optional[str]: The recommendation ID, to be passed to `get` or `wait`,
+                           or None if the queue is full and the job was refused
+        """
+        recommendation_id = self.recommendation_id(prompt, items)
+        if recommendation_id in self._pending:
+            return recommendation_id
+        result = self.result_cache.get(recommendation_id)
+        if result is not None and result["status"] == DONE:
+            return recommendation_id
+
+        queue = self._start_workers()
+        try:
+            queue.put_nowait((recommendation_id, prompt, items, generate))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning({"event": "recommendation_queue_full", "queued": queue.qsize()})
+            return None
+        self._pending[recommendation_id] = asyncio.get_running_loop().create_future()
+        return recommendation_id
+
+    def _start_workers(self) -> "asyncio.Queue[Job]":
+        """
+        Start the queue and its workers on the running event loop, if not already started.
+
+        Returns:
+            asyncio.Queue[Job]: The job queue
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._loop = loop
+            # asyncio treats a size of 0 as unbounded
+            self._queue = asyncio.Queue(maxsize=max(self.max_queue_size, 1))
+            self._workers = [asyncio.create_task(self._work(self._queue)) for _ in range(self.max_concurrency)]
+        return self._queue
+
+    async def _work(self, queue: "asyncio.Queue[Job]") -> None:
+        """
+        Generate queued recommendations one at a time, forever.
+
+        Args:
+            queue (asyncio.Queue[Job]): The job queue
+        """
+        while True:
+            job = await queue.get()
+            try:
+                await self._run(*job)
+            finally:
+                queue.task_done()
+
+    async def _run(
+        self,
+        recommendation_id: str,
+        prompt: str,
+        items: List[Dict[str, Any]],
+        generate: RecommendationGenerator
+    ) -> None:
+        """
+        Generate a recommendation and record the outcome.
+
+        Args:
+            recommendation_id (str): ID of the recommendation
+            prompt (str): The user's search query
+            items (List[Dict[str, Any]]): The ranked items to recommend from
+            generate (RecommendationGenerator): Coroutine function producing the text
+        """
+        try:
+            recommendation = await generate(prompt, items)
+        except Exception:
+            logger.exception({"event": "recommendation_error", "recommendation_id": recommendation_id})
+            self.result_cache.set(recommendation_id, {"status": FAILED, "recommendation": None})
+        else:
+            self.result_cache.set(recommendation_id, {"status": DONE, "recommendation": recommendation})
+        finally:
+            finished = self._pending.pop(recommendation_id, None)
+            if finished is not None and not finished.done():
+                finished.set_result(None)
+
+    def get(self, recommendation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the state of a recommendation.
+
+        Args:
+            recommendation_id (str): ID returned by `submit`
+
+        Returns:
+            Optional[Dict[str, Any]]: None if the ID is unknown or has expired,
+                otherwise a dictionary containing:
+                - id: The recommendation ID
+                - status: "pending", "done" or "failed"
+                - recommendation: The text, or None unless the status is "done"
+        """
+        if recommendation_id in self._pending:
+            return {"id": recommendation_id, "status": PENDING, "recommendation": None}
+        result = self.result_cache.get(recommendation_id)
+        if result is None:
+            return None
+        return {"id": recommendation_id, **result}
+
+    def peek(self, recommendation_id: str) -> Optional[str]:
+        """
+        Return a recommendation's text if it is already finished.
+
+        Args:
+            recommendation_id (str): ID returned by `submit`
+
+        Returns:
+            Optional[str]: The text, or None if it is not ready
+        """
+        result = self.get(recommendation_id)
+        return result["recommendation"] if result is not None else None
+
+    async def wait(self, recommendation_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait up to `timeout` seconds for a pending recommendation, then look it up.
+
+        Args:
+            recommendation_id (str): ID returned by `submit`
+            timeout (float): Maximum number of seconds to wait
+
+        Returns:
+            Optional[Dict[str, Any]]: The same as `get`
+        """
+        finished = self._pending.get(recommendation_id)
+        if finished is not None and timeout > 0:
+            # asyncio.wait leaves the job running when the timeout expires
+            await asyncio.wait({finished}, timeout=timeout)
+        return self.get(recommendation_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the number of queued and running jobs and the result cache counters.
+
+        Returns:
+            Dict[str, Any]: Pending (queued or running) and queued job counts,
+                            jobs refused because the queue was full, and result
+                            cache statistics
+        """
+        return {
+            "pending": len(self._pending),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "rejected": self.rejected,
+            "results": self.result_cache.stats()
+        }
@@ -0,0 +1,388 @@
+"""
+Resilience Module
+
+This module wraps calls to external dependencies (OpenAI and Supabase) with
+retries, hedging and a circuit breaker:
+
+- Calls failing with a rate limit, server error or connection error are
+  retried with exponential backoff and full jitter.
+- Idempotent calls are hedged: if a call has not answered within the p95 of
+  its recent latencies, a duplicate is sent and whichever answers first wins.
+- After repeated failures a circuit breaker fails calls immediately until the
+  dependency has had time to recover, instead of queueing requests behind it.
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+import numpy as np
+import openai
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a dependency whose circuit breaker is open.
+    """
+
+    def __init__(self, dependency: str):
+        super().__init__(f"Circuit breaker for {dependency} is open")
+        self.dependency = dependency
+
+
+@dataclass(frozen=True)
+class ResiliencePolicy:
+    """
+    Settings of the retries, hedging and circuit breaker of a dependency.
+
+    Attributes:
+        max_retries (int): Retries after the first attempt of a call
+        backoff_base (float): Backoff before the first retry, in seconds; it
+                              doubles with each retry
+        backoff_max (float): Longest backoff between retries, in seconds
+        hedging (bool): Whether idempotent calls are hedged
+        hedge_percentile (float): Latency percentile after which a hedge is sent
+        hedge_min_samples (int): Calls observed before hedging starts
+        failure_threshold (int): Consecutive failed calls that open the breaker
+        reset_timeout (float): Seconds the breaker stays open before a trial call
+    """
+    max_retries: int = 2
+    backoff_base: float = 0.1
+    backoff_max: float = 2.0
+    hedging: bool = True
+    hedge_percentile: float = 95.0
+    hedge_min_samples: int = 20
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check whether a failed call is worth retrying.
+
+    Args:
+        error (BaseException): The error raised by the call
+
+    Returns:
+        bool: True for rate limits, server errors, timeouts and connection errors
+    """
+    if isinstance(error, (openai.APIConnectionError, httpx.TransportError, OSError, TimeoutError)):
+        return True
+    # Postgres connection failures, exhausted resources and server shutdowns
+    sqlstate = getattr(error, "sqlstate", None)
+    if isinstance(sqlstate, str) and sqlstate.startswith(("08", "53", "57P")):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+class LatencyTracker:
+    """
+    Rolling window of a call's recent latencies.
+    """
+
+    def __init__(self, window: int = 1000):
+        """
+        Initialize the tracker.
+
+        Args:
+            window (int): Number of recent latencies kept
+        """
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency: float) -> None:
+        self._latencies.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """
+        Compute a percentile of the recent latencies.
+
+        Args:
+            percentile (float): The percentile, from 0 to 100
+
+        Returns:
+            Optional[float]: The latency in seconds, or None if nothing was recorded
+        """
+        if not self._latencies:
+            return None
+        return float(np.percentile(self._latencies, percentile))
+
+
+class CircuitBreaker:
+    """
+    Breaker that opens after consecutive failures and lets a single trial
+    call through once the reset timeout has passed.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker
+            reset_timeout (float): Seconds to stay open before allowing a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go through, moving an expired open breaker to half-open.
+
+        Returns:
+            bool: True if the call may be made
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            # Let one trial call find out whether the dependency has recovered
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """
+        Give up the trial call of a half-open breaker without an outcome, as
+        when the call is cancelled, reopening the breaker so that a new trial
+        is allowed after the reset timeout.
+        """
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class Dependency:
+    """
+    Resilient caller for one external dependency.
+
+    Every call to the dependency goes through `call`, which shares the
+    dependency's circuit breaker, while hedging delays are derived from the
+    latencies of each named operation separately.
+    """
+
+    def __init__(self, name: str, policy: ResiliencePolicy = ResiliencePolicy()):
+        """
+        Initialize the dependency.
+
+        Args:
+            name (str): Name of the dependency, used in errors and stats
+            policy (ResiliencePolicy): Retry, hedging and breaker settings
+        """
+        self.name = name
+        self.policy = policy
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejections = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def call(
+        self,
+        operation: str,
+        make_call: Callable[[], Awaitable[Any]],
+        idempotent: bool = False
+    ) -> Any:
+        """
+        Make a call to the dependency with retries, hedging and the circuit breaker.
+
+        Args:
+            operation (str): Name of the operation, used to track its latencies
+            make_call (Callable[[], Awaitable[Any]]): Function starting one attempt of the call
+            idempotent (bool): Whether the call can safely be sent twice, enabling hedging
+
+        Returns:
+            Any: The result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            Exception: The call's error if it is not retryable or every retry failed
+        """
+        if not self.breaker.allow():
+            self.rejections += 1
+            raise CircuitOpenError(self.name)
+        # Only one call is let through a half-open breaker, and it holds the trial
+        is_trial = self.breaker.state == HALF_OPEN
+
+        self.calls += 1
+        tracker = self.latencies.setdefault(operation, LatencyTracker())
+        try:
+            for attempt in range(self.policy.max_retries + 1):
+                try:
+                    if idempotent and self.policy.hedging:
+                        result = await self._hedged_attempt(make_call, tracker)
+                    else:
+                        result = await self._timed_attempt(make_call, tracker)
+                except Exception as e:
+                    if not is_retryable(e):
+                        # The dependency answered, so it is up; the call itself was bad
+                        self.breaker.record_success()
+                        raise
+                    if attempt == self.policy.max_retries or not self.breaker.allow():
+                        self.failures += 1
+                        self.breaker.record_failure()
+                        raise
+                    is_trial = is_trial or self.breaker.state == HALF_OPEN
+                    self.retries += 1
+                    await asyncio.sleep(self.backoff(attempt))
+                else:
+                    self.breaker.record_success()
+                    return result
+        except BaseException:
+            # A cancelled trial records no outcome; without this the breaker
+            # would stay half-open and reject every later call
+            if is_trial:
+                self.breaker.release_trial()
+            raise
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Compute a jittered backoff before a retry.
+
+        Args:
+            attempt (int): Number of the attempt that failed, starting at 0
+
+        Returns:
+            float: Seconds to wait, drawn uniformly up to the exponential backoff
+        """
+        return random.uniform(0, min(self.policy.backoff_max, self.policy.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    async def _timed_attempt(make_call: Callable[[], Awaitable[Any]], tracker: LatencyTracker) -> Any:
+        """
+        Make one attempt, recording its latency.
+
+        Attempts that fail or are cancelled, such as the slower of two hedged
+        attempts, are recorded for as long as they ran, so that slow calls are
+        not left out of the hedging percentile.
+        """
+        start_time = time.perf_counter()
+        try:
+            return await make_call()
+        finally:
+            tracker.record(time.perf_counter() - start_time)
+
+    async def _hedged_attempt(self, make_call: Callable[[], Awaitable[Any]], tracker: LatencyTracker) -> Any:
+        """
+        Make one attempt, sending a duplicate if it is slower than usual.
+
+        Args:
+            make_call (Callable[[], Awaitable[Any]]): Function starting one attempt of the call
+            tracker (LatencyTracker): Recent latencies of the operation
+
+        Returns:
+            Any: The result of whichever attempt succeeds first
+        """
+        hedge_delay = (
+            tracker.percentile(self.policy.hedge_percentile)
+            if len(tracker) >= self.policy.hedge_min_samples else None
+        )
+        if hedge_delay is None:
+            return await self._timed_attempt(make_call, tracker)
+
+        primary = asyncio.ensure_future(self._timed_attempt(make_call, tracker))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._timed_attempt(make_call, tracker))
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Abandon the slower attempt
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the dependency's call counters, breaker state and latencies.
+
+        Returns:
+            Dict[str, Any]: Counters, breaker state and p50/p95 latency in
+                            milliseconds of each operation
+        """
+        return {
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rejections": self.rejections,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency_ms": {
+                operation: {
+                    "p50": round(tracker.percentile(50) * 1000, 1),
+                    "p95": round(tracker.percentile(95) * 1000, 1)
+                }
+                for operation, tracker in self.latencies.items()
+                if len(tracker)
+            }
+        }
+
+
+async def call_dependency(
+    dependency: Optional[Dependency],
+    operation: str,
+    make_call: Callable[[], Awaitable[Any]],
+    idempotent: bool = False
+) -> Any:
+    """
+    Make a call through a dependency's resilience layer, or directly without one.
+
+    Args:
+        dependency (Optional[Dependency]): The dependency, or None to call directly
+        operation (str): Name of the operation
+        make_call (Callable[[], Awaitable[Any]]): Function starting one attempt of the call
+        idempotent (bool): Whether the call can safely be sent twice
+
+    Returns:
+        Any: The call's result
+    """
+    if dependency is None:
+        return await make_call()
+    return await dependency.call(operation, make_call, idempotent)
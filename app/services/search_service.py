@@ -6,15 +6,46 @@ It combines embeddings, database queries, and LLM recommendations to deliver
 relevant fashion items based on natural language queries.
 """
 
-from openai import OpenAI
+from openai import AsyncOpenAI
+import asyncio
+import hashlib
+import time
+from functools import partial
 import json
-import traceback
-from typing import List, Dict, Tuple, Any, Optional
-import numpy as np
+import logging
+import uuid
+from typing import List, Dict, Tuple, Any, Hashable, Optional, AsyncIterator, Iterable, Sequence
 from pathlib import Path
+from services.cache import LRUCache, normalize_prompt
+from services.semantic_cache import SemanticCache
+from services.filter_parser import FilterParser, filter_tokens
+from services.ranking import DEFAULT_RANKING_WEIGHTS, RankingWeights, rank_items
+from services.projection import DEFAULT_SEARCH_FIELDS, project
+from services.recommendation_service import RecommendationService
+from services.deadline import DEFAULT_STAGE_BUDGETS, Deadline, StageBudgets
+from services.resilience import CircuitOpenError, Dependency, call_dependency
+from services.metrics import (
+    SEARCH_RESULTS, capture_stages, record_stage, record_token_usage, replay_stages, span, timed
+)
+from services.single_flight import SingleFlight
+from services.query_service import MATCH_COUNT, MAX_MATCH_COUNT
+
+logger: logging.Logger = logging.getLogger(__name__)
 
 # Constants
 SCHEMAS_DIR = Path(__file__).parent.parent / "schemas"
+FILTER_MODEL = "gpt-4.5-preview-2025-02-27"
+NOT_FASHION_WARNING = "Looks like you're searching for something outside of fashion! Try asking about clothing, accessories, or fashion items instead."
+FEW_RESULTS_WARNING = "Not many items were found. Try broadening your search!"
+BATCH_ERROR = "The search failed for this prompt."
+TIMEOUT_WARNING = "The search took too long, so no items could be found. Please try again!"
+STALE_WARNING = "The search took too long, so these are the results of a similar search."
+# Longest a replayed stream waits for a deferred recommendation, in seconds
+STREAM_RECOMMENDATION_TIMEOUT: float = 30.0
+# Stages of a search that run after filter extraction
+SEARCH_STAGES = ["embedding", "database", "recommendation"]
+# Similarity to a cached query accepted when the database is too slow
+DEGRADED_SIMILARITY_THRESHOLD: float = 0.9
 
 class SearchService:
     """
@@ -27,88 +58,1016 @@ class SearchService:
     
     def __init__(
         self, 
-        openai_client: OpenAI, 
+        openai_client: AsyncOpenAI, 
         embedding_service: Any, 
-        query_service: Any
+        query_service: Any,
+        filter_cache: Optional[LRUCache] = None,
+        response_cache: Optional[SemanticCache] = None,
+        use_filter_parser: bool = True,
+        cursor_cache: Optional[LRUCache] = None,
+        recommendation_service: Optional[RecommendationService] = None,
+        stage_budgets: StageBudgets = DEFAULT_STAGE_BUDGETS,
+        openai_dependency: Optional[Dependency] = None,
+        single_flight: Optional[SingleFlight] = None,
+        known_stores: Optional[Iterable[str]] = None
     ) -> None:
         """
         Initialize the search service.
         
         Args:
-            openai_client (OpenAI): Initialized OpenAI client instance
+            openai_client (AsyncOpenAI): Initialized async OpenAI client instance
             embedding_service: Service for generating text embeddings
             query_service: Service for querying the database
+            filter_cache (Optional[LRUCache]): Cache for filters extracted by the LLM,
+                                               or None to disable caching
+            response_cache (Optional[SemanticCache]): Cache of complete responses for
+                                                      near-duplicate queries, or None
+                                                      to disable caching
+            use_filter_parser (bool): Whether to try the rule-based filter parser
+                                      before asking the LLM to extract filters
+            cursor_cache (Optional[LRUCache]): Cache of the queries and ranked
+                                               candidates that later pages are
+                                               served from, or None to disable
+                                               pagination
+            recommendation_service (Optional[RecommendationService]): Pool that
+                generates recommendations in the background for `search`, or
+                None to generate them before responding
+            stage_budgets (StageBudgets): Shares of a search's deadline given to each stage
+            openai_dependency (Optional[Dependency]): Retries and circuit breaker for
+                                                      LLM calls, or None to call directly
+            single_flight (Optional[SingleFlight]): Coalesces identical concurrent
+                                                    searches, or None to run each one
+            known_stores (Optional[Iterable[str]]): Store names the filter parser
+                                                    may extract; prompts naming other
+                                                    stores are left to the LLM
         """
         self.openai_client = openai_client
         self.embedding_service = embedding_service
         self.query_service = query_service
+        self.filter_cache = filter_cache
+        self.response_cache = response_cache
+        self.cursor_cache = cursor_cache if cursor_cache is not None and cursor_cache.max_size > 0 else None
+        self.recommendation_service = recommendation_service
+        self.stage_budgets = stage_budgets
+        self.openai_dependency = openai_dependency
+        self.single_flight = single_flight
+        # Progress of the searches running under single flight, by key
+        self._search_progress: Dict[Hashable, Dict[str, Any]] = {}
+        
+        # Load the filter schema once; its hash versions the filter cache so
+        # that any change to the schema invalidates previously cached filters
+        filter_schema_bytes = (SCHEMAS_DIR / "filter_schema.json").read_bytes()
+        self.filter_schema = json.loads(filter_schema_bytes)
+        self.filter_schema_hash = hashlib.sha256(filter_schema_bytes).hexdigest()
+        self.filter_keys: List[str] = [
+            key for key in self.filter_schema["schema"]["properties"] if key != "is_related_to_fashion"
+        ]
+        self.filter_parser: Optional[FilterParser] = (
+            FilterParser(self.filter_schema, known_stores) if use_filter_parser else None
+        )
     
-    def search(self, prompt: str) -> Dict[str, Any]:
+    async def search(
+        self,
+        prompt: str,
+        ranking_weights: Optional[RankingWeights] = None,
+        fields: Optional[Sequence[str]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         """
         Perform a semantic search for fashion items based on a natural language prompt.
         
         This method:
-        1. Generates an embedding for the search prompt
-        2. Extracts filter criteria from the prompt using LLM
-        3. Queries the database for matching items
-        4. Ranks the results based on multiple factors
-        5. Generates a natural language recommendation
+        1. Extracts filter criteria from the prompt using LLM and generates an
+           embedding for the search prompt concurrently
+        2. Queries the database for matching items
+        3. Ranks the results based on multiple factors
+        4. Generates a natural language recommendation
+        
+        With a recommendation service, the recommendation is generated in the
+        background instead: the response carries its `recommendation_id`, and
+        the text only if it was already known for this prompt and these items.
+        
+        If a response cache is configured and a sufficiently similar query with
+        the same numbers, negations and store (see `filter_tokens`) was
+        answered recently, its response is returned instead, skipping the
+        database and both LLM calls. Requests with custom ranking weights or
+        fields bypass the response cache.
+        
+        With a deadline, each stage must finish by its share of the deadline
+        (see StageBudgets), and the search degrades instead of failing: late
+        or failed filters are ignored, a late recommendation is dropped, and
+        if the database is late a cached response for a less similar query is
+        served when there is one.
+        
+        With single flight, a search that arrives while an identical one (same
+        normalized prompt, ranking weights and fields) is in progress waits
+        for that search's response instead of repeating its OpenAI and
+        database calls, for at most its own deadline. If that response left
+        out stages because the search that produced it had an earlier
+        deadline, a waiter with time left runs the search itself.
         
         Args:
             prompt (str): The user's search query in natural language
+            ranking_weights (Optional[RankingWeights]): Weights for ranking the
+                                                        results, or None for the
+                                                        default weights
+            fields (Optional[Sequence[str]]): Fields of each item to return, or
+                                              None for the compact default fields
+            deadline (Optional[Deadline]): Time by which to respond, or None to
+                                           wait for every stage
             
         Returns:
             Dict[str, Any]: A dictionary containing:
-                - response: Ranked list of matching items
-                - recommendation: LLM-generated recommendation text
+                - response: First page of the ranked matching items
+                - recommendation: LLM-generated recommendation text, or None if
+                  it is still being generated
+                - recommendation_id: ID to fetch a deferred recommendation with,
+                  or None if recommendations are not deferred
                 - warnings: List of any warnings or suggestions
                 - filters: The extracted filter criteria
+                - cursor: Cursor for the next page (see `next_page`), or None
+                  if there are no more results
+                - skipped_stages: Stages ("filters", "embedding", "database",
+                  "recommendation") left out to respond in time, after an error,
+                  or because the recommendation queue is full
         """
+        fields = tuple(fields or DEFAULT_SEARCH_FIELDS)
+        deadline = deadline or Deadline()
+        if self.single_flight is None:
+            return await self._search(prompt, ranking_weights, fields, deadline)
         
-        # Extract filters and check if query is fashion-related
-        filter_expression, is_fashion_related = self._extract_filter_from_prompt(prompt)
-        print("filter_expression", filter_expression)
+        key = (normalize_prompt(prompt), ranking_weights, fields)
+        
+        async def work() -> Tuple[Dict[str, Any], Deadline, List[Tuple[str, float]]]:
+            # Joiners that run out of time can still report the filters
+            progress: Dict[str, Any] = {}
+            self._search_progress[key] = progress
+            try:
+                # Every waiter reports the shared search's stages in its Server-Timing
+                with capture_stages() as stages:
+                    response = await self._search(prompt, ranking_weights, fields, deadline, progress)
+                return response, deadline, stages
+            finally:
+                if self._search_progress.get(key) is progress:
+                    del self._search_progress[key]
+        
+        try:
+            response, search_deadline, stages = await self.single_flight.do(
+                key, work, join_timeout=deadline.time_left()
+            )
+        except asyncio.TimeoutError:
+            # The search in progress started earlier with a longer deadline
+            progress = self._search_progress.get(key, {})
+            if "filters" in progress:
+                return self._timed_out_response(list(SEARCH_STAGES), progress["filters"])
+            return self._timed_out_response(["filters", *SEARCH_STAGES])
+        replay_stages(stages)
+        
+        # A response degraded to meet a tighter deadline is not good enough
+        # for a waiter that can wait longer
+        if response["skipped_stages"] and search_deadline.expires_at is not None and (
+            deadline.expires_at is None or deadline.expires_at > search_deadline.expires_at
+        ):
+            return await self._search(prompt, ranking_weights, fields, deadline)
+        # Every waiter gets its own copy of the shared response
+        return {**response, "warnings": list(response["warnings"]), "skipped_stages": list(response["skipped_stages"])}
+    
+    async def _search(
+        self,
+        prompt: str,
+        ranking_weights: Optional[RankingWeights],
+        fields: Tuple[str, ...],
+        deadline: Deadline,
+        progress: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a search; see `search`.
+        
+        Args:
+            prompt (str): The user's search query in natural language
+            ranking_weights (Optional[RankingWeights]): Weights for ranking the results
+            fields (Tuple[str, ...]): Fields of each item to return
+            deadline (Deadline): Time by which to respond
+            progress (Optional[Dict[str, Any]]): Receives the extracted "filters"
+                                                 as soon as they are known
+            
+        Returns:
+            Dict[str, Any]: The search response
+        """
+        budgets = self.stage_budgets
+        skipped_stages: List[str] = []
+        filter_task, embedding_task = self._start_query(prompt)
+        try:
+            # Serve near-duplicate queries from the response cache
+            if self.response_cache is not None and self._uses_defaults(ranking_weights, fields):
+                if not await self._finish_stage(embedding_task, deadline.time_left(budgets.embedding)):
+                    # The filters may have finished even though the embedding did not
+                    finished_filters = self._finished_filters(filter_task)
+                    if finished_filters is not None:
+                        return self._timed_out_response(list(SEARCH_STAGES), finished_filters[0])
+                    return self._timed_out_response(["filters", *SEARCH_STAGES])
+                cached_response = await self._lookup_cached_response(prompt, embedding_task, ranking_weights, fields)
+                if cached_response is not None:
+                    return self._check_recommendation(self._check_cursor(cached_response))
+            
+            # Search without filters rather than failing if they are late or fail
+            if (
+                await self._finish_stage(filter_task, deadline.time_left(budgets.filters))
+                and filter_task.exception() is None
+            ):
+                filter_expression, is_fashion_related = filter_task.result()
+                if progress is not None:
+                    progress["filters"] = filter_expression
+            else:
+                if filter_task.done():
+                    logger.error({"event": "filter_error"}, exc_info=filter_task.exception())
+                filter_expression, is_fashion_related = self._no_filters(), True
+                skipped_stages.append("filters")
+            
+            # Handle non-fashion-related queries
+            if not is_fashion_related:
+                response = self._not_fashion_response(filter_expression)
+                self._store_cached_response(prompt, embedding_task, ranking_weights, fields, response)
+                return response
+            
+            # Without the embedding there is nothing to search with
+            if not await self._finish_stage(embedding_task, deadline.time_left(budgets.embedding)):
+                return self._timed_out_response([*skipped_stages, *SEARCH_STAGES], filter_expression)
+            query_embedding = embedding_task.result()
+        finally:
+            # Never leave an OpenAI request running if it is no longer needed
+            self._discard_task(filter_task)
+            self._discard_task(embedding_task)
+        
+        try:
+            ranked_response, cursor = await asyncio.wait_for(
+                self._find_items(query_embedding, filter_expression, ranking_weights, fields),
+                timeout=deadline.time_left(budgets.database)
+            )
+        except (asyncio.TimeoutError, CircuitOpenError):
+            # A similar cached search beats no results when the database is slow or down
+            return self._fallback_response(
+                prompt, query_embedding, ranking_weights, fields, skipped_stages, filter_expression
+            )
+        
+        # Generate a natural language recommendation, in the background if deferred
+        recommendation_id = None
+        llm_recommendation = None
+        if self.recommendation_service is not None:
+            recommendation_id = self.recommendation_service.submit(
+                prompt, ranked_response, self._generate_llm_recommendation
+            )
+            if recommendation_id is None:
+                # The job queue is full, so this search goes without a recommendation
+                skipped_stages.append("recommendation")
+            else:
+                llm_recommendation = self.recommendation_service.peek(recommendation_id)
+        else:
+            try:
+                llm_recommendation = await asyncio.wait_for(
+                    self._generate_llm_recommendation(prompt, ranked_response),
+                    timeout=deadline.time_left(budgets.recommendation)
+                )
+            except Exception as e:
+                # The products are still worth returning without the recommendation
+                if not isinstance(e, asyncio.TimeoutError):
+                    logger.exception({"event": "recommendation_error"})
+                skipped_stages.append("recommendation")
+            
+        # Return the complete response
+        response = {
+            "response": self._project_items(ranked_response, fields),
+            "recommendation": llm_recommendation,
+            "recommendation_id": recommendation_id,
+            "warnings": self._result_warnings(ranked_response),
+            "filters": filter_expression,
+            "cursor": cursor,
+            "skipped_stages": skipped_stages
+        }
+        # Degraded responses are not shared with later searches
+        if not skipped_stages:
+            self._store_cached_response(prompt, embedding_task, ranking_weights, fields, response)
+        return response
+    
+    async def search_stream(
+        self,
+        prompt: str,
+        ranking_weights: Optional[RankingWeights] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Perform a semantic search and yield each stage's output as soon as it is ready.
+        
+        Runs the same pipeline as `search`, but the extracted filters and the
+        ranked items are emitted before the recommendation is requested, and
+        the recommendation text is streamed from the model as it is generated.
+        
+        Events are dictionaries with an "event" key, emitted in this order:
+            - filters: {"filters": extracted filter criteria}
+            - items: {"response": first page of ranked items or None,
+              "warnings": [...], "cursor": cursor for the next page or None}
+            - recommendation_delta: {"delta": next chunk of recommendation text}
+              (repeated, omitted for non-fashion queries)
+            - done: {"recommendation": full recommendation text or None}
+        
+        Args:
+            prompt (str): The user's search query in natural language
+            ranking_weights (Optional[RankingWeights]): Weights for ranking the
+                                                        results, or None for the
+                                                        default weights
+            fields (Optional[Sequence[str]]): Fields of each item to return, or
+                                              None for the compact default fields
+            
+        Yields:
+            Dict[str, Any]: The next event of the search
+        """
+        fields = tuple(fields or DEFAULT_SEARCH_FIELDS)
+        filter_task, embedding_task = self._start_query(prompt)
+        try:
+            cached_response = await self._lookup_cached_response(prompt, embedding_task, ranking_weights, fields)
+            if cached_response is None:
+                filter_expression, query_embedding = await self._prepare_query(filter_task, embedding_task)
+        finally:
+            # Never leave an OpenAI request running if it is no longer needed
+            self._discard_task(filter_task)
+            self._discard_task(embedding_task)
+        
+        # Replay near-duplicate queries from the response cache
+        if cached_response is not None:
+            cached_response = self._check_cursor(cached_response)
+            yield {"event": "filters", "filters": cached_response["filters"]}
+            yield {
+                "event": "items",
+                "response": cached_response["response"],
+                "warnings": cached_response["warnings"],
+                "cursor": cached_response["cursor"]
+            }
+            llm_recommendation = cached_response["recommendation"]
+            recommendation_id = cached_response.get("recommendation_id")
+            if llm_recommendation is None and recommendation_id and self.recommendation_service is not None:
+                # The cached search deferred its recommendation; wait for the job
+                result = await self.recommendation_service.wait(recommendation_id, STREAM_RECOMMENDATION_TIMEOUT)
+                llm_recommendation = result["recommendation"] if result is not None else None
+            if llm_recommendation is not None:
+                yield {"event": "recommendation_delta", "delta": llm_recommendation}
+            yield {"event": "done", "recommendation": llm_recommendation}
+            return
+        
+        yield {"event": "filters", "filters": filter_expression}
         
         # Handle non-fashion-related queries
+        if query_embedding is None:
+            yield {"event": "items", "response": None, "warnings": [NOT_FASHION_WARNING], "cursor": None}
+            yield {"event": "done", "recommendation": None}
+            self._store_cached_response(
+                prompt, embedding_task, ranking_weights, fields, self._not_fashion_response(filter_expression)
+            )
+            return
+        
+        ranked_response, cursor = await self._find_items(query_embedding, filter_expression, ranking_weights, fields)
+        warnings = self._result_warnings(ranked_response)
+        items = self._project_items(ranked_response, fields)
+        yield {
+            "event": "items",
+            "response": items,
+            "warnings": warnings,
+            "cursor": cursor
+        }
+        
+        # Forward the recommendation text chunk by chunk
+        chunks = []
+        async for delta in self._stream_llm_recommendation(prompt, ranked_response):
+            chunks.append(delta)
+            yield {"event": "recommendation_delta", "delta": delta}
+        
+        llm_recommendation = "".join(chunks)
+        yield {"event": "done", "recommendation": llm_recommendation}
+        self._store_cached_response(prompt, embedding_task, ranking_weights, fields, {
+            "response": items,
+            "recommendation": llm_recommendation,
+            "recommendation_id": None,
+            "warnings": warnings,
+            "filters": filter_expression,
+            "cursor": cursor,
+            "skipped_stages": []
+        })
+    
+    async def search_batch(
+        self,
+        prompts: List[str],
+        include_recommendation: bool = False,
+        ranking_weights: Optional[RankingWeights] = None,
+        fields: Optional[Sequence[str]] = None,
+        max_concurrency: int = 8
+    ) -> List[Dict[str, Any]]:
+        """
+        Perform semantic searches for many prompts at once.
+        
+        All prompts are embedded with a single embeddings request. Filter
+        extraction, the database query and, optionally, the recommendation
+        then run for up to `max_concurrency` prompts at a time. If the
+        embeddings request fails, each prompt is embedded on its own, so a
+        prompt the API rejects only fails its own search.
+        
+        Args:
+            prompts (List[str]): The user's search queries in natural language
+            include_recommendation (bool): Whether to generate a recommendation for
+                                           each prompt
+            ranking_weights (Optional[RankingWeights]): Weights for ranking the
+                                                        results, or None for the
+                                                        default weights
+            fields (Optional[Sequence[str]]): Fields of each item to return, or
+                                              None for the compact default fields
+            max_concurrency (int): Maximum number of prompts processed concurrently
+            
+        Returns:
+            List[Dict[str, Any]]: One result per prompt, in input order. Each has
+                the prompt and either the same fields as `search` (with a None
+                recommendation if recommendations were not requested) or an
+                "error" message if the search for that prompt failed
+        """
+        fields = tuple(fields or DEFAULT_SEARCH_FIELDS)
+        embeddings: List[Optional[List[float]]]
+        try:
+            embeddings = await self.embedding_service.generate_prompt_embeddings(prompts)
+        except Exception:
+            logger.exception({"event": "batch_embedding_error", "prompts": len(prompts)})
+            embeddings = [None] * len(prompts)
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def search_one(prompt: str, embedding: Optional[List[float]]) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    if embedding is None:
+                        embedding = await self.embedding_service.generate_prompt_embedding(prompt)
+                    response = await self._search_embedded_prompt(
+                        prompt, embedding, include_recommendation, ranking_weights, fields
+                    )
+                except Exception:
+                    logger.exception({"event": "batch_search_error"})
+                    return {"prompt": prompt, "error": BATCH_ERROR}
+            return {"prompt": prompt, **response}
+        
+        return await asyncio.gather(*(
+            search_one(prompt, embedding) for prompt, embedding in zip(prompts, embeddings)
+        ))
+    
+    async def _search_embedded_prompt(
+        self,
+        prompt: str,
+        embedding: List[float],
+        include_recommendation: bool,
+        ranking_weights: Optional[RankingWeights],
+        fields: Tuple[str, ...]
+    ) -> Dict[str, Any]:
+        """
+        Run the search pipeline for a prompt whose embedding is already known.
+        
+        Args:
+            prompt (str): The user's search query in natural language
+            embedding (List[float]): Embedding of the prompt
+            include_recommendation (bool): Whether to generate a recommendation
+            ranking_weights (Optional[RankingWeights]): Weights for ranking the results
+            fields (Tuple[str, ...]): Fields of each item to return
+            
+        Returns:
+            Dict[str, Any]: The same fields as the response of `search`
+        """
+        use_response_cache = self.response_cache is not None and self._uses_defaults(ranking_weights, fields)
+        if use_response_cache:
+            cached_response = self.response_cache.lookup(embedding, key=filter_tokens(prompt))
+            if cached_response is not None:
+                if not include_recommendation:
+                    cached_response["recommendation"] = None
+                    cached_response["recommendation_id"] = None
+                    return self._check_cursor(cached_response)
+                return self._check_recommendation(self._check_cursor(cached_response))
+        
+        filter_expression, is_fashion_related = await self._extract_filter_from_prompt(prompt)
         if not is_fashion_related:
-            return {
-                "recommendation": None,
-                "warnings": ["Looks like you're searching for something outside of fashion! Try asking about clothing, accessories, or fashion items instead."],
-                "response": None,
-                "filters": filter_expression
-            }
+            response = self._not_fashion_response(filter_expression)
+            if use_response_cache:
+                self.response_cache.store(embedding, response, filter_tokens(prompt))
+            return response
+        
+        ranked_response, cursor = await self._find_items(embedding, filter_expression, ranking_weights, fields)
+        llm_recommendation = (
+            await self._generate_llm_recommendation(prompt, ranked_response) if include_recommendation else None
+        )
+        response = {
+            "response": self._project_items(ranked_response, fields),
+            "recommendation": llm_recommendation,
+            "recommendation_id": None,
+            "warnings": self._result_warnings(ranked_response),
+            "filters": filter_expression,
+            "cursor": cursor,
+            "skipped_stages": []
+        }
+        # Only complete responses are shared with later searches
+        if use_response_cache and include_recommendation:
+            self.response_cache.store(embedding, response, filter_tokens(prompt))
+        return response
+    
+    def _start_query(self, prompt: str) -> Tuple[asyncio.Task, asyncio.Task]:
+        """
+        Start filter extraction and prompt embedding at the same time.
+        
+        The embedding request does not depend on the extracted filters, so both
+        OpenAI calls run concurrently. Callers must discard both tasks once
+        they are done with them.
+        
+        Args:
+            prompt (str): The user's search query in natural language
+            
+        Returns:
+            Tuple[asyncio.Task, asyncio.Task]: The filter extraction and embedding tasks
+        """
+        filter_task = asyncio.create_task(timed("filters", self._extract_filter_from_prompt(prompt)))
+        embedding_task = asyncio.create_task(timed("embedding", self.embedding_service.generate_prompt_embedding(prompt)))
+        return filter_task, embedding_task
+    
+    async def _lookup_cached_response(
+        self,
+        prompt: str,
+        embedding_task: asyncio.Task,
+        ranking_weights: Optional[RankingWeights],
+        fields: Tuple[str, ...]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up the response to a near-duplicate query in the response cache.
+        
+        Only queries with the same filter tokens (see `filter_tokens`) match.
+        
+        Args:
+            prompt (str): The user's search query in natural language
+            embedding_task (asyncio.Task): Task generating the prompt embedding
+            ranking_weights (Optional[RankingWeights]): Weights requested for ranking
+            fields (Tuple[str, ...]): Fields requested for each item
+            
+        Returns:
+            Optional[Dict[str, Any]]: The cached response, or None on a miss, if no
+                                      response cache is configured, or if custom
+                                      ranking weights or fields were requested
+        """
+        if self.response_cache is None or not self._uses_defaults(ranking_weights, fields):
+            return None
+        return self.response_cache.lookup(await embedding_task, key=filter_tokens(prompt))
+    
+    def _store_cached_response(
+        self,
+        prompt: str,
+        embedding_task: asyncio.Task,
+        ranking_weights: Optional[RankingWeights],
+        fields: Tuple[str, ...],
+        response: Dict[str, Any]
+    ) -> None:
+        """
+        Add a completed response to the response cache.
+        
+        Responses ranked with custom weights or reduced to custom fields are
+        not cached, since cache entries are shared by every request for a
+        similar prompt.
+        
+        Args:
+            prompt (str): The user's search query in natural language
+            embedding_task (asyncio.Task): Task that generated the prompt embedding
+            ranking_weights (Optional[RankingWeights]): Weights used for ranking
+            fields (Tuple[str, ...]): Fields included for each item
+            response (Dict[str, Any]): The response to cache
+        """
+        if self.response_cache is None or not self._uses_defaults(ranking_weights, fields):
+            return
+        if not embedding_task.done() or embedding_task.cancelled():
+            return
+        if embedding_task.exception() is None:
+            self.response_cache.store(embedding_task.result(), response, filter_tokens(prompt))
+    
+    @staticmethod
+    def _uses_defaults(ranking_weights: Optional[RankingWeights], fields: Tuple[str, ...]) -> bool:
+        """
+        Check whether results are ranked with the default weights and reduced
+        to the default fields.
+        
+        Args:
+            ranking_weights (Optional[RankingWeights]): Weights requested for ranking
+            fields (Tuple[str, ...]): Fields requested for each item
+            
+        Returns:
+            bool: True if no weights or the default weights were requested, with
+                  the default fields
+        """
+        return (
+            (ranking_weights is None or ranking_weights == DEFAULT_RANKING_WEIGHTS)
+            and fields == DEFAULT_SEARCH_FIELDS
+        )
+    
+    async def _prepare_query(
+        self, 
+        filter_task: asyncio.Task, 
+        embedding_task: asyncio.Task
+    ) -> Tuple[Dict[str, Any], Optional[List[float]]]:
+        """
+        Wait for the extracted filter criteria and the prompt embedding.
+        
+        If the query turns out not to be fashion-related, the pending
+        embedding request is not waited for.
+        
+        Args:
+            filter_task (asyncio.Task): Task extracting filters from the prompt
+            embedding_task (asyncio.Task): Task generating the prompt embedding
             
-        # Generate embedding for the search prompt
-        query_embedding = self.embedding_service.generate_prompt_embedding(prompt)
+        Returns:
+            Tuple[Dict[str, Any], Optional[List[float]]]: A tuple containing:
+                - The extracted filter criteria
+                - The prompt embedding, or None if the query is not fashion-related
+        """
+        # Extract filters and check if query is fashion-related
+        filter_expression, is_fashion_related = await filter_task
+        logger.debug({"event": "filters_extracted", "filters": filter_expression})
+        
+        if not is_fashion_related:
+            return filter_expression, None
+            
+        # Wait for the embedding that was generated alongside the filters
+        query_embedding = await embedding_task
+        return filter_expression, query_embedding
+    
+    @staticmethod
+    async def _finish_stage(task: asyncio.Task, timeout: Optional[float]) -> bool:
+        """
+        Wait for a stage's task until its budget runs out.
+        
+        The task is left running; callers discard it once it is no longer needed.
+        
+        Args:
+            task (asyncio.Task): The stage's task
+            timeout (Optional[float]): Seconds to wait, or None to wait until it finishes
+            
+        Returns:
+            bool: True if the task finished, successfully or not, in time
+        """
+        if not task.done():
+            await asyncio.wait({task}, timeout=timeout)
+        return task.done()
+    
+    def _no_filters(self) -> Dict[str, Any]:
+        """
+        Build filter criteria that filter nothing.
+        
+        Every filter key of the schema is present, as in the LLM's output,
+        since get_fashion_items has no defaults for its filter arguments.
+        
+        Returns:
+            Dict[str, Any]: Each filter key set to None
+        """
+        return {key: None for key in self.filter_keys}
+    
+    @staticmethod
+    def _timed_out_response(
+        skipped_stages: List[str],
+        filter_expression: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the response returned when no items could be found in time.
+        
+        Args:
+            skipped_stages (List[str]): The stages that were left out
+            filter_expression (Optional[Dict[str, Any]]): The extracted filter criteria, if any
+            
+        Returns:
+            Dict[str, Any]: A response with no items and a warning for the user
+        """
+        return {
+            "recommendation": None,
+            "recommendation_id": None,
+            "warnings": [TIMEOUT_WARNING],
+            "response": [],
+            "filters": filter_expression or {},
+            "cursor": None,
+            "skipped_stages": skipped_stages
+        }
+    
+    def _fallback_response(
+        self,
+        prompt: str,
+        query_embedding: List[float],
+        ranking_weights: Optional[RankingWeights],
+        fields: Tuple[str, ...],
+        skipped_stages: List[str],
+        filter_expression: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Build the response returned when the database query runs out of time
+        or is refused by the database's open circuit breaker.
+        
+        The response cache is searched again with a lower similarity
+        threshold, since the results of a similar search are more useful than
+        none at all.
+        
+        Args:
+            prompt (str): The user's search query in natural language
+            query_embedding (List[float]): Embedding of the search prompt
+            ranking_weights (Optional[RankingWeights]): Weights requested for ranking
+            fields (Tuple[str, ...]): Fields requested for each item
+            skipped_stages (List[str]): The stages already left out
+            filter_expression (Dict[str, Any]): The extracted filter criteria
+            
+        Returns:
+            Dict[str, Any]: A similar search's cached response, or a response with no items
+        """
+        if self.response_cache is not None and self._uses_defaults(ranking_weights, fields):
+            cached_response = self.response_cache.lookup(
+                query_embedding, DEGRADED_SIMILARITY_THRESHOLD, key=filter_tokens(prompt)
+            )
+            if cached_response is not None:
+                cached_response = self._check_recommendation(self._check_cursor(cached_response))
+                cached_response["warnings"] = [*cached_response["warnings"], STALE_WARNING]
+                cached_response["skipped_stages"] = [*skipped_stages, "database"]
+                return cached_response
+        return self._timed_out_response([*skipped_stages, "database", "recommendation"], filter_expression)
+    
+    async def _find_items(
+        self, 
+        query_embedding: List[float], 
+        filter_expression: Dict[str, Any],
+        ranking_weights: Optional[RankingWeights] = None,
+        fields: Sequence[str] = DEFAULT_SEARCH_FIELDS
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Query the database for items matching the prompt and rank them.
+        
+        Only the requested fields and those needed for ranking are fetched.
+        When pagination is enabled, one candidate more than the first page is
+        fetched to learn whether there are more results; the extra candidate
+        is not ranked, so the first page is the same as without pagination.
+        If there are more, the query is kept in the cursor cache with the
+        first page, and the remaining candidates are only fetched once
+        `next_page` is called.
+        
+        Args:
+            query_embedding (List[float]): Embedding of the search prompt
+            filter_expression (Dict[str, Any]): Filter criteria to apply
+            ranking_weights (Optional[RankingWeights]): Weights for ranking the
+                                                        results, or None for the
+                                                        default weights
+            fields (Sequence[str]): Fields of each item to return
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: A tuple containing:
+                - The first page of ranked matching items, with all fetched
+                  fields (see `_project_items`)
+                - A cursor for the next page, or None if there are no more results
+        """
+        match_count = MATCH_COUNT + 1 if self.cursor_cache is not None else MATCH_COUNT
         
         # Query database for matching items    
-        unranked_results = self.query_service.query_postgres(query_embedding, filter_expression)
+        with span("database"):
+            unranked_results = await self.query_service.query_postgres(
+                query_embedding, filter_expression, match_count=match_count, fields=fields
+            )
+        candidates = unranked_results['response']
+        SEARCH_RESULTS.observe(min(len(candidates), MATCH_COUNT))
         
         # Rank the results based on multiple factors
-        ranked_response = self._rank_items(unranked_results['response'])            
+        with span("ranking"):
+            ranked_items = self._rank_items(candidates[:MATCH_COUNT], ranking_weights or DEFAULT_RANKING_WEIGHTS)
+        if len(candidates) <= MATCH_COUNT:
+            return ranked_items, None
+        
+        candidate_set_id = uuid.uuid4().hex
+        self.cursor_cache.set(candidate_set_id, {
+            "items": self._project_items(ranked_items, fields),
+            "served": [item["parent_asin"] for item in ranked_items],
+            "query": (query_embedding, filter_expression, ranking_weights, tuple(fields))
+        })
+        return ranked_items, self._make_cursor(candidate_set_id, MATCH_COUNT)
+    
+    async def _fetch_remaining_candidates(self, candidate_set: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fetch and rank the candidates of a search after its first page.
+        
+        The maximum number of candidates is fetched and ranked, skipping the
+        items already returned on the first page, which keeps its order.
+        
+        Args:
+            candidate_set (Dict[str, Any]): The search's entry in the cursor cache
+            
+        Returns:
+            Dict[str, Any]: The entry with every ranked candidate in "items"
+                            and no query left to run
+        """
+        query_embedding, filter_expression, ranking_weights, fields = candidate_set["query"]
+        with span("database"):
+            unranked_results = await self.query_service.query_postgres(
+                query_embedding, filter_expression, match_count=MAX_MATCH_COUNT, fields=fields
+            )
+        served = set(candidate_set["served"])
+        with span("ranking"):
+            ranked_items = self._rank_items(
+                [item for item in unranked_results['response'] if item["parent_asin"] not in served],
+                ranking_weights or DEFAULT_RANKING_WEIGHTS
+            )
+        return {
+            "items": candidate_set["items"] + self._project_items(ranked_items, fields),
+            "served": candidate_set["served"],
+            "query": None
+        }
+    
+    @staticmethod
+    def _project_items(items: List[Dict[str, Any]], fields: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Reduce ranked items to the fields requested for the response.
+        
+        Args:
+            items (List[Dict[str, Any]]): The ranked items
+            fields (Sequence[str]): The fields to keep
+            
+        Returns:
+            List[Dict[str, Any]]: The projected items
+        """
+        return [project(item, fields) for item in items]
+    
+    async def next_page(self, cursor: str, page_size: int = MATCH_COUNT) -> Optional[Dict[str, Any]]:
+        """
+        Return the next page of a previous search's ranked results.
+        
+        The first call for a search fetches and ranks its remaining
+        candidates once, reusing the cached prompt embedding and filters;
+        later pages are served from the cursor cache, without any OpenAI or
+        database calls.
+        
+        Args:
+            cursor (str): Cursor returned by `search`, `search_stream` or a
+                          previous call to this method
+            page_size (int): Number of items to return
+            
+        Returns:
+            Optional[Dict[str, Any]]: None if the cursor is invalid or has expired,
+                otherwise a dictionary containing:
+                - response: The next page of ranked items
+                - cursor: Cursor for the following page, or None if this is the last page
+        """
+        position = self._parse_cursor(cursor)
+        if position is None or self.cursor_cache is None:
+            return None
+        candidate_set_id, offset = position
+        candidate_set = self.cursor_cache.get(candidate_set_id)
+        if candidate_set is None:
+            return None
+        if candidate_set["query"] is not None:
+            candidate_set = await self._fetch_remaining_candidates(candidate_set)
+            self.cursor_cache.set(candidate_set_id, candidate_set)
+        
+        ranked_items = candidate_set["items"]
+        end = offset + page_size
+        return {
+            "response": ranked_items[offset:end],
+            "cursor": self._make_cursor(candidate_set_id, end) if end < len(ranked_items) else None
+        }
+    
+    def _check_recommendation(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fill in the deferred recommendation of a cached response once it is ready.
         
-        # Generate a natural language recommendation
-        llm_recommendation = self._generate_llm_recommendation(prompt, ranked_response)
+        Args:
+            response (Dict[str, Any]): A response from the response cache
+            
+        Returns:
+            Dict[str, Any]: The response, with the recommendation text if it has
+                            been generated since the response was cached
+        """
+        recommendation_id = response.get("recommendation_id")
+        if response["recommendation"] is None and recommendation_id and self.recommendation_service is not None:
+            response["recommendation"] = self.recommendation_service.peek(recommendation_id)
+        return response
+    
+    def _check_cursor(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Drop the cursor from a cached response if its candidates have expired.
         
+        Args:
+            response (Dict[str, Any]): A response from the response cache
+            
+        Returns:
+            Dict[str, Any]: The response, with a cursor only if it can still be used
+        """
+        position = self._parse_cursor(response.get("cursor"))
+        if position is not None and (self.cursor_cache is None or self.cursor_cache.get(position[0]) is None):
+            response["cursor"] = None
+        return response
+    
+    @staticmethod
+    def _make_cursor(candidate_set_id: str, offset: int) -> str:
+        """
+        Build a cursor pointing at a position in a cached candidate list.
+        
+        Args:
+            candidate_set_id (str): Key of the candidate list in the cursor cache
+            offset (int): Index of the first item of the page
+            
+        Returns:
+            str: The cursor
+        """
+        return f"{candidate_set_id}.{offset}"
+    
+    @staticmethod
+    def _parse_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+        """
+        Split a cursor into its candidate list key and offset.
+        
+        Args:
+            cursor (Optional[str]): The cursor
+            
+        Returns:
+            Optional[Tuple[str, int]]: The candidate list key and offset, or None
+                                       if the cursor is malformed
+        """
+        candidate_set_id, _, offset = (cursor or "").partition(".")
+        if not candidate_set_id or not offset.isdigit():
+            return None
+        return candidate_set_id, int(offset)
+    
+    @staticmethod
+    def _not_fashion_response(filter_expression: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the response returned for queries unrelated to fashion.
+        
+        Args:
+            filter_expression (Dict[str, Any]): The extracted filter criteria
+            
+        Returns:
+            Dict[str, Any]: A response with no items and a warning for the user
+        """
+        return {
+            "recommendation": None,
+            "recommendation_id": None,
+            "warnings": [NOT_FASHION_WARNING],
+            "response": None,
+            "filters": filter_expression,
+            "cursor": None,
+            "skipped_stages": []
+        }
+    
+    @staticmethod
+    def _result_warnings(ranked_response: List[Dict[str, Any]]) -> List[str]:
+        """
+        Build the warnings shown alongside a set of search results.
+        
+        Args:
+            ranked_response (List[Dict[str, Any]]): The ranked search results
+            
+        Returns:
+            List[str]: Warnings or suggestions for the user
+        """
         # Check if enough results were found
         warnings = []
         if len(ranked_response) < 5:
-            warnings.append("Not many items were found. Try broadening your search!")
+            warnings.append(FEW_RESULTS_WARNING)
+        return warnings
+    
+    @staticmethod
+    def _finished_filters(filter_task: asyncio.Task) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Read the result of filter extraction without waiting for it.
+        
+        Args:
+            filter_task (asyncio.Task): The filter extraction task
             
-        # Return the complete response
-        return {
-            "response": ranked_response,
-            "recommendation": llm_recommendation,
-            "warnings": warnings,
-            "filters": filter_expression
-        }
+        Returns:
+            Optional[Tuple[Dict[str, Any], bool]]: The filters and whether the
+                prompt is fashion-related, or None if extraction has not
+                finished or failed
+        """
+        if filter_task.done() and not filter_task.cancelled() and filter_task.exception() is None:
+            return filter_task.result()
+        return None
+    
+    @staticmethod
+    def _discard_task(task: asyncio.Task) -> None:
+        """
+        Cancel a task that is no longer needed.
+        
+        If the task already finished, its exception (if any) is retrieved so
+        that asyncio does not report it as never retrieved.
+        
+        Args:
+            task (asyncio.Task): The task to discard
+        """
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
     
-    def _extract_filter_from_prompt(self, prompt: str) -> Tuple[Dict[str, Any], bool]:
+    async def _extract_filter_from_prompt(self, prompt: str) -> Tuple[Dict[str, Any], bool]:
         """
         Extract filter criteria from the user's prompt using LLM.
         
         This method uses OpenAI's API to analyze the prompt and extract structured
         filter parameters as well as determine if the query is fashion-related.
+        Simple prompts are handled by the rule-based filter parser without
+        calling the LLM. LLM results are cached by normalized prompt, filter
+        schema hash and model, so repeated queries skip the LLM entirely.
         
         Args:
             prompt (str): The user's search query
@@ -118,12 +1077,24 @@ class SearchService:
                 - A dictionary of filter parameters to apply to the database query
                 - A boolean indicating whether the query is fashion-related
         """
-        # Load the filter schema
-        filter_schema = json.load(open(SCHEMAS_DIR / "filter_schema.json"))
+        # Parse simple prompts without the LLM
+        if self.filter_parser is not None:
+            parsed_filters = self.filter_parser.parse(prompt)
+            if parsed_filters is not None:
+                return parsed_filters
+        
+        # Serve repeated prompts from the cache
+        cache_key = (normalize_prompt(prompt), self.filter_schema_hash, FILTER_MODEL)
+        if self.filter_cache is not None:
+            cached_filters = self.filter_cache.get(cache_key)
+            if cached_filters is not None:
+                filter_expression, is_fashion_related = cached_filters
+                return dict(filter_expression), is_fashion_related
         
         # Query the LLM to extract filters
-        response = self.openai_client.responses.create(
-            model = "gpt-4.5-preview-2025-02-27",
+        response = await call_dependency(self.openai_dependency, "filters", partial(
+            self.openai_client.responses.create,
+            model = FILTER_MODEL,
             input = [
                 {
                     "role": "system",
@@ -137,24 +1108,27 @@ class SearchService:
                 }
             ],
             text = {
-                "format": filter_schema
+                "format": self.filter_schema
             }
-        )
+        ))
+        
+        record_token_usage("filters", response.usage)
         
         # Parse the response and extract fashion-relevance flag
         filter_expression = json.loads(response.output_text)
         is_fashion_related = filter_expression['is_related_to_fashion']
         filter_expression.pop('is_related_to_fashion')
         
+        if self.filter_cache is not None:
+            self.filter_cache.set(cache_key, (dict(filter_expression), is_fashion_related))
+        
         return filter_expression, is_fashion_related
     
     def _rank_items(
         self,
         items: List[Dict[str, Any]],
-        similarity_weight: float = 0.7,
-        rating_weight: float = 0.2,
-        popularity_weight: float = 0.1,
-        min_ratings: int = 1
+        ranking_weights: RankingWeights = DEFAULT_RANKING_WEIGHTS,
+        top_k: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Rank items based on provided cosine similarity, average rating, and number of ratings.
@@ -164,59 +1138,25 @@ class SearchService:
         - Average rating (how well-reviewed the item is)
         - Popularity (how many reviews the item has)
         
+        Scores are computed for all items at once; see services.ranking.
+        
         Args:
             items: List of dictionaries containing item data.
                 Each dict should have: 
                 - 'cosine_distance': pre-calculated distance (lower is better)
                 - 'average_rating': average rating (0-5)
                 - 'rating_number': number of ratings
-            similarity_weight: Weight for cosine similarity in final score
-            rating_weight: Weight for average rating in final score
-            popularity_weight: Weight for number of ratings in final score
-            min_ratings: Minimum number of ratings for full confidence
+            ranking_weights: Weights of the similarity, rating and popularity
+                factors, and the number of ratings needed for full confidence
+            top_k: Number of items to return, or None to return all of them
         
         Returns:
             List of dictionaries sorted by score in descending order with
             a 'score' field added to each item
         """
-        # Find the maximum number of ratings for normalization
-        max_ratings = max(item['rating_number'] for item in items) if items else 1
-        ranked_items = []
-        
-        for item in items:
-            # Convert cosine distance to cosine similarity (1 is perfect match)
-            similarity = 1 - item['cosine_distance']
-            
-            # Normalize average rating to 0-1 scale (assuming ratings are 0-5)
-            average_rating_normalized = item['average_rating'] / 5.0
-            
-            # Calculate a confidence factor based on number of ratings
-            # (caps at 1.0 when reaching min_ratings threshold)
-            confidence = min(item['rating_number'] / min_ratings, 1)
-            
-            # Adjust rating score based on confidence
-            # (items with few ratings are penalized)
-            rating_score = average_rating_normalized * confidence
-            
-            # Normalize number of ratings on log scale to handle large variations
-            popularity_score = np.log1p(item['rating_number']) / np.log1p(max_ratings)
-            
-            # Calculate final score as weighted sum of the three factors
-            final_score = (
-                similarity_weight * similarity +
-                rating_weight * rating_score +
-                popularity_weight * popularity_score
-            )
-            
-            # Add the score to the item dictionary
-            item_with_score = item.copy()  # Create a copy to avoid modifying original
-            item_with_score['score'] = final_score
-            ranked_items.append(item_with_score)
-        
-        # Sort by score in descending order (highest scores first)
-        return sorted(ranked_items, key=lambda x: x['score'], reverse=True)
+        return rank_items(items, ranking_weights, top_k)
     
-    def _generate_llm_recommendation(
+    async def _generate_llm_recommendation(
         self, 
         prompt: str, 
         item_results: List[Dict[str, Any]]
@@ -234,15 +1174,7 @@ class SearchService:
         Returns:
             str: A natural language recommendation (max 2 sentences)
         """
-        # Extract item titles for the system prompt
-        item_titles = [item['title'] for item in item_results]
-        
-        # Create system prompt with guidance for the LLM
-        system_prompt = f"You are a helpful assistant that provides recommendations to a user \
-        based on their query. Use the provided original user query, and the titles and descriptions of the \
-        recommended items to provide a recommendation. This recommendation should be no more \
-        than 2 sentences. If the query is not related to fashion, tell the user that the site is for \
-        searching for fashion items. The titles of the recommended items are: {item_titles}"      
+        system_prompt = self._recommendation_instructions(item_results)
 
         # Format the user input
         input_content = [
@@ -256,22 +1188,92 @@ class SearchService:
         recommendation_schema = json.load(open(SCHEMAS_DIR / "recommendation_schema.json"))
         
         # Query the LLM for a recommendation
-        response = self.openai_client.responses.create(
+        with span("recommendation"):
+            response = await call_dependency(self.openai_dependency, "recommendation", partial(
+                self.openai_client.responses.create,
+                model="gpt-4o-mini",
+                instructions = system_prompt,
+                input=[
+                    {
+                        "role": "user",
+                        "content": input_content,
+                    }
+                ],
+                text = {
+                    "format": recommendation_schema
+                }
+            ))
+        record_token_usage("recommendation", response.usage)
+        
+        # Parse the response and extract the recommendation text
+        response_data = json.loads(response.output_text)
+        result = response_data['response']
+        
+        return result
+    
+    async def _stream_llm_recommendation(
+        self, 
+        prompt: str, 
+        item_results: List[Dict[str, Any]]
+    ) -> AsyncIterator[str]:
+        """
+        Stream a natural language recommendation as the LLM generates it.
+        
+        Uses the same instructions as `_generate_llm_recommendation`, but asks
+        for plain text instead of the JSON recommendation schema so that each
+        delta can be shown to the user as soon as it arrives.
+        
+        Args:
+            prompt (str): The original user query
+            item_results (List[Dict[str, Any]]): The ranked search results
+            
+        Yields:
+            str: The next chunk of the recommendation text
+        """
+        start_time = time.perf_counter()
+        stream = await call_dependency(self.openai_dependency, "recommendation_stream", partial(
+            self.openai_client.responses.create,
             model="gpt-4o-mini",
-            instructions = system_prompt,
+            instructions=self._recommendation_instructions(item_results),
             input=[
                 {
                     "role": "user",
-                    "content": input_content,
+                    "content": [
+                        {
+                            "type": "input_text",
+                            "text": prompt
+                        }
+                    ],
                 }
             ],
-            text = {
-                "format": recommendation_schema
-            }
-        )
+            stream=True
+        ))
         
-        # Parse the response and extract the recommendation text
-        response_data = json.loads(response.output_text)
-        result = response_data['response']
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                yield event.delta
+            elif event.type == "response.completed":
+                record_token_usage("recommendation_stream", event.response.usage)
+        # Timed by hand, since a span cannot be held open across yields
+        record_stage("recommendation", time.perf_counter() - start_time)
+    
+    @staticmethod
+    def _recommendation_instructions(item_results: List[Dict[str, Any]]) -> str:
+        """
+        Build the system prompt used to generate a recommendation.
         
-        return result
+        Args:
+            item_results (List[Dict[str, Any]]): The ranked search results
+            
+        Returns:
+            str: Instructions for the recommendation LLM
+        """
+        # Extract item titles for the system prompt
+        item_titles = [item['title'] for item in item_results]
+        
+        # Create system prompt with guidance for the LLM
+        return f"You are a helpful assistant that provides recommendations to a user \
+        based on their query. Use the provided original user query, and the titles and descriptions of the \
+        recommended items to provide a recommendation. This recommendation should be no more \
+        than 2 sentences. If the query is not related to fashion, tell the user that the site is for \
+        searching for fashion items. The titles of the recommended items are: {item_titles}"
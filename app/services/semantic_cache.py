@@ -0,0 +1,254 @@
+"""
+Semantic Cache Module
+
+This module provides a response cache that matches queries by meaning rather
+than exact text. Recent query embeddings are kept in a small in-memory vector
+index, and a new query is served from the cache when its embedding is close
+enough to one that was already answered and its key is equal.
+"""
+
+import pickle
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Cache of search responses keyed by query embedding similarity.
+
+    Embeddings are normalized and stored as rows of a preallocated float32
+    matrix, so a lookup is a single matrix-vector product over the cached
+    queries. Entries expire after a TTL, and when the cache is full the least
+    recently used entry is evicted.
+
+    Each entry also has a key, such as the words of the query that decide its
+    filters, and only matches queries with an equal key: "dresses under $30"
+    and "dresses under $80" embed almost identically but must not share
+    results. Responses are stored pickled, so every hit is a deep copy that
+    callers may modify.
+    """
+
+    # Width of the buckets used to report the similarity of cache hits
+    SIMILARITY_BUCKET_WIDTH: float = 0.01
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.97
+    ):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            max_size (int): Maximum number of responses to keep
+            ttl_seconds (float): Lifetime of each cached response in seconds
+            similarity_threshold (float): Minimum cosine similarity between a query
+                                          and a cached query for a cache hit
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._hit_similarities: Dict[float, int] = {}
+        self._hit_similarity_sum = 0.0
+        self._lock = threading.Lock()
+
+        # The embedding matrix is allocated on first insert, once the
+        # dimensionality of the embedding model is known
+        self._embeddings: Optional[np.ndarray] = None
+        self._responses: List[Optional[bytes]] = [None] * max_size
+        self._keys: List[Hashable] = [None] * max_size
+        # Hashes of the keys, so that entries with other keys are masked in one step
+        self._key_hashes = np.zeros(max_size, dtype=np.int64)
+        self._occupied = np.zeros(max_size, dtype=bool)
+        self._expires_at = np.zeros(max_size)
+        self._last_used = np.zeros(max_size)
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """
+        Convert an embedding to a unit-length float32 vector.
+
+        Args:
+            embedding (List[float]): The embedding vector
+
+        Returns:
+            np.ndarray: The normalized vector
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(
+        self,
+        embedding: List[float],
+        similarity_threshold: Optional[float] = None,
+        key: Hashable = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a query similar to the given one.
+
+        Args:
+            embedding (List[float]): Embedding of the new query
+            similarity_threshold (Optional[float]): Minimum similarity for a hit,
+                                                    or None for the cache's threshold
+            key (Hashable): Key of the new query; only entries stored with an
+                            equal key can match
+
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the cached response for the most
+                                      similar live query, or None if no cached
+                                      query reaches the similarity threshold
+        """
+        if self.max_size <= 0:
+            return None
+
+        query = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            match = self._best_match(
+                query, key, now, self.similarity_threshold if similarity_threshold is None else similarity_threshold
+            )
+            if match is None:
+                self.misses += 1
+                return None
+
+            slot, similarity = match
+            self._last_used[slot] = now
+            self.hits += 1
+            self._hit_similarity_sum += similarity
+            bucket = round(
+                np.floor(similarity / self.SIMILARITY_BUCKET_WIDTH) * self.SIMILARITY_BUCKET_WIDTH, 2
+            )
+            self._hit_similarities[bucket] = self._hit_similarities.get(bucket, 0) + 1
+            return pickle.loads(self._responses[slot])
+
+    def _best_match(
+        self,
+        query: np.ndarray,
+        key: Hashable,
+        now: float,
+        similarity_threshold: float
+    ) -> Optional[Tuple[int, float]]:
+        """
+        Find the live cached query with the same key most similar to the given one.
+
+        Expired entries found along the way are released.
+
+        Args:
+            query (np.ndarray): Normalized embedding of the new query
+            key (Hashable): Key of the new query
+            now (float): Current monotonic time
+            similarity_threshold (float): Minimum similarity of a match
+
+        Returns:
+            Optional[Tuple[int, float]]: The slot and similarity of the best match,
+                                         or None if it is below the threshold
+        """
+        if self._embeddings is None or self._embeddings.shape[1] != query.shape[0]:
+            return None
+
+        self._release_expired(now)
+        candidates = self._occupied & (self._key_hashes == hash(key))
+        if not candidates.any():
+            return None
+
+        similarities = self._embeddings @ query
+        similarities[~candidates] = -np.inf
+        slot = int(np.argmax(similarities))
+        # Clamp float32 rounding so identical queries report a similarity of 1
+        similarity = min(float(similarities[slot]), 1.0)
+        # Different keys with equal hashes are treated as a miss
+        if similarity < similarity_threshold or self._keys[slot] != key:
+            return None
+        return slot, similarity
+
+    def _release_expired(self, now: float) -> None:
+        """
+        Free the slots of entries whose TTL has passed.
+
+        Args:
+            now (float): Current monotonic time
+        """
+        expired = self._occupied & (self._expires_at <= now)
+        for slot in np.flatnonzero(expired):
+            self._responses[slot] = None
+            self._keys[slot] = None
+        self._occupied &= ~expired
+        self.expirations += int(expired.sum())
+
+    def store(self, embedding: List[float], response: Dict[str, Any], key: Hashable = None) -> None:
+        """
+        Cache the response to a query.
+
+        Args:
+            embedding (List[float]): Embedding of the query
+            response (Dict[str, Any]): The search response to cache
+            key (Hashable): Key of the query, which later queries must equal to match
+        """
+        if self.max_size <= 0:
+            return
+
+        vector = self._normalize(embedding)
+        # Pickled outside the lock; later changes to the response do not reach the cache
+        frozen_response = pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.monotonic()
+
+        with self._lock:
+            if self._embeddings is None or self._embeddings.shape[1] != vector.shape[0]:
+                self._embeddings = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+                self._responses = [None] * self.max_size
+                self._keys = [None] * self.max_size
+                self._occupied[:] = False
+
+            # Reuse a free or expired slot before evicting a live entry
+            self._release_expired(now)
+            free_slots = np.flatnonzero(~self._occupied)
+            if free_slots.size:
+                slot = int(free_slots[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+
+            self._embeddings[slot] = vector
+            self._responses[slot] = frozen_response
+            self._keys[slot] = key
+            self._key_hashes[slot] = hash(key)
+            self._occupied[slot] = True
+            self._expires_at[slot] = now + self.ttl_seconds
+            self._last_used[slot] = now
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the cache's hit/miss counters and how close the matched entries were.
+
+        Returns:
+            Dict[str, Any]: Hits, misses, hit rate, evictions, expirations, the
+                            number of live entries, the mean similarity of hits,
+                            and a histogram of hit similarities keyed by the
+                            lower bound of each bucket
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": int(np.count_nonzero(self._occupied & (self._expires_at > time.monotonic()))),
+                "max_size": self.max_size,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "mean_hit_similarity": self._hit_similarity_sum / self.hits if self.hits else None,
+                "hit_similarity_histogram": {
+                    f"{bucket:.2f}": count for bucket, count in sorted(self._hit_similarities.items())
+                }
+            }
@@ -0,0 +1,98 @@
+"""
+Serialization Module
+
+This module renders API responses with orjson instead of the standard library
+encoder, and offers MessagePack for internal callers that ask for it with an
+`Accept: application/msgpack` header. MessagePack support is optional and only
+enabled when the msgpack package is installed.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Serialize NumPy scalars and arrays natively, and allow non-string keys
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps_json(content: Any) -> bytes:
+    """
+    Encode content as compact UTF-8 JSON.
+
+    Args:
+        content (Any): The content to encode
+
+    Returns:
+        bytes: The JSON document
+    """
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgpackResponse(Response):
+    """
+    MessagePack response, used when the client accepts it and msgpack is installed.
+    """
+
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def accepts_msgpack(request: Request) -> bool:
+    """
+    Check whether a request asks for a MessagePack response.
+
+    Args:
+        request (Request): The incoming request
+
+    Returns:
+        bool: True if the Accept header lists MessagePack and msgpack is installed
+    """
+    if msgpack is None:
+        return False
+    accept = request.headers.get("accept", "")
+    return any(
+        media_range.split(";")[0].strip() in (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+        for media_range in accept.split(",")
+    )
+
+
+def negotiated_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    """
+    Render a response in the format the client asked for.
+
+    Returning a Response from an endpoint also skips FastAPI's
+    `jsonable_encoder` pass, which dominates the cost of large result pages.
+
+    Args:
+        request (Request): The incoming request
+        content (Any): JSON-compatible content
+        status_code (int): HTTP status code of the response
+
+    Returns:
+        Response: A MessagePack response if accepted, otherwise an orjson response
+    """
+    response_class = MsgpackResponse if accepts_msgpack(request) else ORJSONResponse
+    response = response_class(content, status_code=status_code)
+    # Caches must not serve one format to a client that asked for the other
+    response.headers.append("Vary", "Accept")
+    return response
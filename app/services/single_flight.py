@@ -0,0 +1,119 @@
+"""
+Single Flight Module
+
+This module coalesces identical concurrent calls. The first call for a key
+starts the work and later calls for the same key, made before it finishes,
+wait for the same result instead of repeating it. A burst of identical
+searches therefore makes a single set of OpenAI and database calls.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """
+    Work in progress for one key and the number of callers waiting for it.
+    """
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Group of in-flight calls, keyed by what makes two calls identical.
+
+    The work runs in its own task, so a caller that is cancelled (for example
+    because its client disconnected) stops waiting without cancelling the
+    work for the other callers; the work is only cancelled once every caller
+    has gone. Errors raised by the work are raised to every caller. Nothing
+    is kept once the work finishes, so later calls start it again.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        work: Callable[[], Awaitable[T]],
+        join_timeout: Optional[float] = None
+    ) -> T:
+        """
+        Run the work for a key, or wait for the run already in progress.
+
+        Args:
+            key (Hashable): Identifies calls that have the same result
+            work (Callable[[], Awaitable[T]]): Coroutine function doing the work
+            join_timeout (Optional[float]): Longest time to wait for a run that
+                                            was already in progress, or None to
+                                            wait until it finishes; the caller
+                                            that starts the work always waits
+
+        Returns:
+            T: The result of the work, shared by every caller of the same run
+
+        Raises:
+            asyncio.TimeoutError: If a joined run did not finish within `join_timeout`
+            Exception: Whatever the work raised
+            asyncio.CancelledError: If this caller is cancelled, or the work was
+                                    cancelled by something other than its callers
+        """
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if joined:
+            self.coalesced += 1
+        else:
+            flight = _Flight(asyncio.create_task(work()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+            self.executions += 1
+
+        flight.waiters += 1
+        try:
+            if joined:
+                return await asyncio.wait_for(asyncio.shield(flight.task), join_timeout)
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody wants the result any more; later calls start afresh
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def _finish(self, key: Hashable, flight: _Flight) -> None:
+        """
+        Forget a finished run, so that the next call for its key starts a new one.
+
+        Args:
+            key (Hashable): The run's key
+            flight (_Flight): The finished run
+        """
+        self._forget(key, flight)
+        # Mark the error as retrieved, since it is re-raised to the callers
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report how many calls were coalesced.
+
+        Returns:
+            Dict[str, Any]: Runs started, calls that joined a run in progress,
+                            and runs currently in flight
+        """
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights)
+        }
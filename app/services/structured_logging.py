@@ -0,0 +1,166 @@
+"""
+Structured Logging Module
+
+This module moves log output off the request path. Loggers hand records to
+a `QueueHandler`, which only tags each record with the current request ID
+before queueing it; a `QueueListener` thread formats the records as compact
+JSON lines and writes them to the log file and the console. Debug records
+can be sampled, so high-volume debug events cost nothing when dropped.
+
+`RequestIdMiddleware` assigns every request an ID (or keeps the caller's
+X-Request-ID), which is attached to every record logged while handling it,
+including from tasks the request starts, and returned in the response.
+"""
+
+import atexit
+import copy
+import logging
+import queue
+import random
+import re
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.serialization import ORJSON_OPTIONS
+
+# ID of the request being handled, inherited by the tasks it starts
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Caller-supplied request IDs are kept only if they are short and printable
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as single-line JSON objects.
+
+    Records whose message is a dictionary, as logged throughout the API, are
+    merged into the object; other messages go in its "message" field.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "location": f"{record.module}:{record.lineno}"
+        }
+        if isinstance(record.msg, dict):
+            entry.update(record.msg)
+        else:
+            entry["message"] = record.getMessage()
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        # Values orjson cannot encode, such as exceptions, are logged as strings
+        return orjson.dumps(entry, default=str, option=ORJSON_OPTIONS).decode()
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keep a random fraction of debug records and every record above debug.
+    """
+
+    def __init__(self, sample_rate: float) -> None:
+        """
+        Initialize the filter.
+
+        Args:
+            sample_rate (float): Fraction of debug records kept, from 0 to 1
+        """
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.sample_rate
+
+
+class RequestQueueHandler(QueueHandler):
+    """
+    Queue handler that defers formatting to the listener thread.
+
+    The standard handler formats each record before queueing it; this one
+    only copies the record and attaches the current request ID.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.request_id = request_id_var.get()
+        return record
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    log_path: Optional[str] = "logs/app.log",
+    debug_sample_rate: float = 1.0
+) -> QueueListener:
+    """
+    Route all logging through a queue to a background writer.
+
+    Args:
+        level (int): Minimum level of logged records
+        log_path (Optional[str]): File the records are appended to, or None to
+                                  log to the console only
+        debug_sample_rate (float): Fraction of debug records kept
+
+    Returns:
+        QueueListener: The started listener, which is stopped (flushing any
+                       queued records) when the process exits
+    """
+    formatter = JSONFormatter()
+    handlers: list = [logging.StreamHandler()]
+    if log_path:
+        Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+        handlers.append(logging.FileHandler(log_path))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = RequestQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class RequestIdMiddleware:
+    """
+    Give each request an ID for its log records and X-Request-ID response header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id", "")
+        if not REQUEST_ID_PATTERN.match(request_id):
+            request_id = uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
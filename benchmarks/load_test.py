@@ -0,0 +1,284 @@
+"""
+Load Test
+
+This script load tests the whole API offline. It starts the OpenAI and
+Supabase stand-ins from stub_servers.py and the API itself, configured to
+call the stand-ins, then sends searches at a fixed rate and reports the
+throughput, the p50/p95/p99 latency, and the latency of each search stage,
+read from the Server-Timing header of the responses.
+
+Requests are sent at the target rate whether or not earlier ones have
+finished, as independent users would send them, so a saturated API shows up
+as growing latency rather than a lower request rate. Requests sent during
+the warm-up are excluded from the report.
+
+Stand-in latencies are set with the --*-latency options as MEDIAN_MS[:SIGMA],
+and the API is configured with --app-env, for example:
+
+    python benchmarks/load_test.py --qps 50 --app-env RESPONSE_CACHE_SIZE=0
+"""
+
+import sys
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCHMARKS_DIR.parent / "app"
+
+PROMPTS = [
+    "red summer dress",
+    "warm winter coat under $100",
+    "black leather boots",
+    "comfortable running sneakers",
+    "cozy oversized hoodie",
+    "high waisted jeans under $50",
+    "wool sweater for the office",
+    "white cotton t-shirt",
+    "pleated midi skirt",
+    "waterproof rain jacket"
+]
+
+
+async def wait_until_ready(client: httpx.AsyncClient, url: str, process: subprocess.Popen, timeout: float) -> None:
+    """
+    Poll a server until it answers, failing early if its process exits.
+
+    Args:
+        client (httpx.AsyncClient): HTTP client
+        url (str): URL answered once the server is up
+        process (subprocess.Popen): The server's process
+        timeout (float): Longest time to wait, in seconds
+
+    Raises:
+        RuntimeError: If the process exits or the server does not answer in time
+    """
+    give_up_at = time.monotonic() + timeout
+    while time.monotonic() < give_up_at:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with status {process.returncode}")
+        try:
+            await client.get(url)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not answer within {timeout:.0f}s")
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """
+    Parse a Server-Timing header.
+
+    Args:
+        header (str): The header, such as "filters;dur=1.2, total;dur=3.4"
+
+    Returns:
+        Dict[str, float]: Duration of each stage in milliseconds
+    """
+    durations = {}
+    for entry in header.split(","):
+        name, _, parameters = entry.strip().partition(";")
+        for parameter in parameters.split(";"):
+            key, _, value = parameter.partition("=")
+            if key.strip() == "dur":
+                durations[name] = float(value)
+    return durations
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    app_url: str,
+    qps: float,
+    duration: float,
+    warmup: float,
+    unique_prompts: bool,
+    timeout_ms: Optional[int]
+) -> Dict[str, Any]:
+    """
+    Send searches at a fixed rate and collect their outcomes.
+
+    Args:
+        client (httpx.AsyncClient): HTTP client
+        app_url (str): Base URL of the API
+        qps (float): Searches sent per second
+        duration (float): Seconds of measured load, after the warm-up
+        warmup (float): Seconds of load sent before measuring
+        unique_prompts (bool): Whether to make every prompt distinct, defeating
+                               the caches and the coalescing of identical searches
+        timeout_ms (Optional[int]): Deadline sent in the X-Timeout-Ms header
+
+    Returns:
+        Dict[str, Any]: Requests sent, latencies and stage durations of the
+                        successful ones, and the number of each error
+    """
+    results: Dict[str, Any] = {
+        "sent": 0,
+        "latencies": [],
+        "stages": defaultdict(list),
+        "skipped_stages": 0,
+        "errors": defaultdict(int)
+    }
+    headers = {"X-Timeout-Ms": str(timeout_ms)} if timeout_ms else {}
+
+    async def search(prompt: str, measured: bool) -> None:
+        start_time = time.perf_counter()
+        try:
+            response = await client.post(f"{app_url}/search", json={"prompt": prompt}, headers=headers)
+        except httpx.HTTPError as e:
+            if measured:
+                results["errors"][type(e).__name__] += 1
+            return
+        latency = (time.perf_counter() - start_time) * 1000
+        if not measured:
+            return
+        if response.status_code != 200:
+            results["errors"][f"HTTP {response.status_code}"] += 1
+            return
+        results["latencies"].append(latency)
+        for stage, milliseconds in parse_server_timing(response.headers.get("server-timing", "")).items():
+            results["stages"][stage].append(milliseconds)
+        if response.json().get("skipped_stages"):
+            results["skipped_stages"] += 1
+
+    tasks = []
+    started_at = time.perf_counter()
+    for sequence_number in itertools.count():
+        # Schedule against the start time, so slow sends do not lower the rate
+        send_at = started_at + sequence_number / qps
+        if send_at - started_at >= warmup + duration:
+            break
+        await asyncio.sleep(max(send_at - time.perf_counter(), 0))
+        prompt = PROMPTS[sequence_number % len(PROMPTS)]
+        if unique_prompts:
+            prompt = f"{prompt} {sequence_number}"
+        measured = send_at - started_at >= warmup
+        results["sent"] += measured
+        tasks.append(asyncio.create_task(search(prompt, measured)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def print_report(results: Dict[str, Any], duration: float) -> None:
+    """
+    Print the throughput, latency percentiles and stage breakdown of a run.
+
+    Args:
+        results (Dict[str, Any]): Outcomes collected by run_load
+        duration (float): Seconds of measured load
+    """
+    latencies = results["latencies"]
+    errors = sum(results["errors"].values())
+    print(f"\nSent {results['sent']} searches over {duration:.0f}s")
+    print(f"Completed {len(latencies)} ({len(latencies) / duration:.1f}/s), "
+          f"{results['skipped_stages']} with skipped stages, {errors} errors")
+    for error, count in sorted(results["errors"].items()):
+        print(f"  {error}: {count}")
+    if not latencies:
+        return
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"\nLatency: p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms, max {max(latencies):.1f} ms")
+
+    print(f"\n{'stage':<16} {'count':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for stage, durations in results["stages"].items():
+        stage_p50, stage_p95 = np.percentile(durations, [50, 95])
+        print(f"{stage:<16} {len(durations):>7} {stage_p50:>8.1f} {stage_p95:>8.1f}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Load test the API against local OpenAI and Supabase stand-ins')
+    parser.add_argument('--qps', type=float, default=20, help='Searches sent per second (default: 20)')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of measured load (default: 30)')
+    parser.add_argument('--warmup', type=float, default=5, help='Seconds of unmeasured load first (default: 5)')
+    parser.add_argument('--unique-prompts', action='store_true',
+                        help='Make every prompt distinct, so that no search is served from a cache')
+    parser.add_argument('--timeout-ms', type=int, default=None, help='Deadline sent with every search (default: none)')
+    parser.add_argument('--app-port', type=int, default=8800, help='Port of the API (default: 8800)')
+    parser.add_argument('--stub-port', type=int, default=8900, help='Port of the stand-ins (default: 8900)')
+    parser.add_argument('--workers', type=int, default=1, help='Uvicorn workers serving the API (default: 1)')
+    parser.add_argument('--app-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Environment variable of the API, may be repeated')
+    parser.add_argument('--filter-latency', type=str, default='400:0.4',
+                        help='Latency of filter extraction, as MEDIAN_MS[:SIGMA] (default: 400:0.4)')
+    parser.add_argument('--recommendation-latency', type=str, default='900:0.4',
+                        help='Latency of recommendations, as MEDIAN_MS[:SIGMA] (default: 900:0.4)')
+    parser.add_argument('--embedding-latency', type=str, default='150:0.5',
+                        help='Latency of embeddings, as MEDIAN_MS[:SIGMA] (default: 150:0.5)')
+    parser.add_argument('--supabase-latency', type=str, default='80:0.5',
+                        help='Latency of Supabase queries, as MEDIAN_MS[:SIGMA] (default: 80:0.5)')
+    parser.add_argument('--synthetic-count', type=int, default=20000,
+                        help='Synthetic products served if the sample dataset is missing (default: 20000)')
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> None:
+    """
+    Start the servers, run the load test and stop the servers.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+    """
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = f"http://127.0.0.1:{args.app_port}"
+    app_env = os.environ | {
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "SUPABASE_URL": stub_url,
+        "SUPABASE_KEY": "stub",
+        "QUERY_BACKEND": "supabase",
+        "LOG_LEVEL": "WARNING",
+        "LOG_PATH": ""
+    } | dict(setting.split("=", 1) for setting in args.app_env)
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, str(BENCHMARKS_DIR / "stub_servers.py"),
+            "--port", str(args.stub_port),
+            "--synthetic-count", str(args.synthetic_count),
+            "--filter-latency", args.filter_latency,
+            "--recommendation-latency", args.recommendation_latency,
+            "--embedding-latency", args.embedding_latency,
+            "--supabase-latency", args.supabase_latency
+        ]))
+        processes.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--port", str(args.app_port),
+            "--workers", str(args.workers),
+            "--log-level", "warning",
+            "--no-access-log"
+        ], cwd=APP_DIR, env=app_env))
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+            await wait_until_ready(client, f"{stub_url}/health", processes[0], timeout=120)
+            await wait_until_ready(client, f"{app_url}/", processes[1], timeout=60)
+            print(f"Sending {args.qps:g} searches/s for {args.warmup:g}s of warm-up and {args.duration:g}s measured")
+            results = await run_load(
+                client, app_url, args.qps, args.duration, args.warmup, args.unique_prompts, args.timeout_ms
+            )
+        print_report(results, args.duration)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_arguments()))
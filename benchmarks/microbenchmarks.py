@@ -0,0 +1,260 @@
+"""
+Microbenchmarks
+
+This script measures the CPU-bound functions of the search and ingestion
+paths on synthetic catalogs of increasing size:
+
+- `rank_items`: scoring and sorting search results (behind
+  `SearchService._rank_items`), for all items and for the top 10
+- `construct_product_sentence`: building the text embedded for each product
+- `build_upsert_payload`: building the upsert parameters of each product,
+  including the conversion of "None" strings to null
+
+For each function and catalog size it records the best and median time per
+call, and the peak memory allocated during a call as traced by tracemalloc.
+Results are saved as JSON named after the current git commit, and a previous
+result file can be passed to --compare to print the change of every number:
+
+    python benchmarks/microbenchmarks.py --compare benchmarks/results/<commit>.json
+"""
+
+import sys
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# The benchmarked functions are shared with the app and the ingestion scripts
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT_DIR / "app"))
+sys.path.append(str(ROOT_DIR / "scripts"))
+from services.ranking import rank_items
+from utils import build_upsert_payload, construct_product_sentence
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+FEATURES = ["Machine Wash", "Imported", "100% Cotton", "Pull On closure", "Relaxed fit", "Button closure"]
+WORDS = "soft lightweight fabric with a classic fit for everyday wear and easy layering".split()
+
+
+def synthetic_products(count: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    Generate products in the format of the ingested dataset.
+
+    About a fifth of the optional fields hold the string "None", as missing
+    values do in the dataset.
+
+    Args:
+        count (int): Number of products
+        seed (int): Random seed
+
+    Returns:
+        List[Dict[str, Any]]: The products, each with a 'cosine_distance' as
+                              if returned by a search
+    """
+    rng = np.random.default_rng(seed)
+    distances = rng.uniform(0, 0.7, count)
+    ratings = rng.uniform(1, 5, count).round(1)
+    rating_numbers = rng.integers(0, 20000, count)
+    prices = rng.uniform(5, 200, count).round(2)
+    missing = rng.random((count, 3)) < 0.2
+    feature_counts = rng.integers(0, len(FEATURES), count)
+    description_lengths = rng.integers(0, 40, count)
+    return [
+        {
+            "parent_asin": f"B0{i:08d}",
+            "main_category": "AMAZON FASHION",
+            "title": f"Women's Everyday Garment {i}",
+            "average_rating": float(ratings[i]),
+            "rating_number": int(rating_numbers[i]),
+            "features": FEATURES[:feature_counts[i]],
+            "description": [" ".join(WORDS[:description_lengths[i] % len(WORDS)])] if description_lengths[i] else [],
+            "price": "None" if missing[i, 0] else float(prices[i]),
+            "images": {"thumb": [f"https://m.media-amazon.com/images/I/{i}._AC_US40_.jpg"]},
+            "videos": "None" if missing[i, 1] else [],
+            "store": "None" if missing[i, 2] else "Amazon Essentials",
+            "categories": [],
+            "details": {},
+            "bought_together": "None",
+            "cosine_distance": float(distances[i])
+        }
+        for i in range(count)
+    ]
+
+
+def benchmark_functions(products: List[Dict[str, Any]], embedding: List[float]) -> Dict[str, Callable[[], Any]]:
+    """
+    Build the benchmarked calls over a catalog.
+
+    Args:
+        products (List[Dict[str, Any]]): The catalog
+        embedding (List[float]): Embedding passed with every upserted product
+
+    Returns:
+        Dict[str, Callable[[], Any]]: Each benchmark's name and a function
+                                      running it once over the whole catalog
+    """
+    return {
+        "rank_items": lambda: rank_items(products),
+        "rank_items_top_10": lambda: rank_items(products, top_k=10),
+        "construct_product_sentence": lambda: [construct_product_sentence(product) for product in products],
+        "build_upsert_payload": lambda: [build_upsert_payload(product, embedding) for product in products]
+    }
+
+
+def measure(function: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    """
+    Time a function and trace its peak memory allocation.
+
+    Each of the `repeat` timings calls the function enough times to take at
+    least `min_time`, so fast calls are not dominated by timer resolution.
+
+    Args:
+        function (Callable[[], Any]): The benchmarked call
+        repeat (int): Number of timings
+        min_time (float): Shortest duration of a timing, in seconds
+
+    Returns:
+        Dict[str, float]: Best and median seconds per call, and peak bytes
+                          allocated during a call
+    """
+    start_time = time.perf_counter()
+    function()
+    single_call = time.perf_counter() - start_time
+    number = max(1, int(min_time / single_call) if single_call > 0 else 1)
+
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start_time) / number)
+
+    # Traced separately, since tracing slows allocations down
+    tracemalloc.start()
+    function()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds_min": min(timings),
+        "seconds_median": statistics.median(timings),
+        "peak_bytes": peak_bytes
+    }
+
+
+def git_commit() -> Dict[str, Any]:
+    """
+    Identify the checked-out commit.
+
+    Returns:
+        Dict[str, Any]: The short commit hash, or "unknown" outside a git
+                        checkout, and whether the working tree has changes
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": False}
+    return {"commit": commit, "dirty": dirty}
+
+
+def print_results(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Any]]) -> None:
+    """
+    Print the results, with the change from a baseline run if one is given.
+
+    Args:
+        results (List[Dict[str, Any]]): Measurements of this run
+        baseline (Optional[Dict[str, Any]]): A previously saved result file
+    """
+    previous = {
+        (result["benchmark"], result["size"]): result for result in (baseline or {}).get("results", [])
+    }
+    header = f"{'benchmark':<28} {'size':>7} {'best ms':>10} {'median ms':>10} {'ns/item':>9} {'peak KiB':>10}"
+    if baseline:
+        header += f" {'time':>8} {'memory':>8}"
+    print(header)
+    for result in results:
+        line = (
+            f"{result['benchmark']:<28} {result['size']:>7} "
+            f"{result['seconds_min'] * 1000:>10.3f} {result['seconds_median'] * 1000:>10.3f} "
+            f"{result['seconds_min'] / result['size'] * 1e9:>9.0f} {result['peak_bytes'] / 1024:>10.1f}"
+        )
+        before = previous.get((result["benchmark"], result["size"]))
+        if before:
+            line += f" {result['seconds_min'] / before['seconds_min'] - 1:>+8.1%}"
+            line += f" {result['peak_bytes'] / max(before['peak_bytes'], 1) - 1:>+8.1%}"
+        print(line)
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Benchmark ranking, sentence construction and upsert payloads')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f'Catalog sizes (default: {" ".join(map(str, DEFAULT_SIZES))})')
+    parser.add_argument('--benchmarks', type=str, nargs='+', default=None,
+                        help='Benchmarks to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Timings of each benchmark (default: 5)')
+    parser.add_argument('--min-time', type=float, default=0.1,
+                        help='Shortest duration of a timing in seconds (default: 0.1)')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Result file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', type=Path, default=None, help='Result file of a previous run to compare with')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    return parser.parse_args()
+
+
+def main(args: argparse.Namespace) -> None:
+    """
+    Run the benchmarks, then save and print the results.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+    """
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    embedding = np.random.default_rng(args.seed).normal(size=1536).tolist()
+
+    results = []
+    for size in args.sizes:
+        functions = benchmark_functions(synthetic_products(size, args.seed), embedding)
+        for name, function in functions.items():
+            if args.benchmarks and name not in args.benchmarks:
+                continue
+            results.append({"benchmark": name, "size": size, **measure(function, args.repeat, args.min_time)})
+
+    revision = git_commit()
+    output_path = args.output or ROOT_DIR / "benchmarks" / "results" / f"{revision['commit']}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps({
+        **revision,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results
+    }, indent=2))
+
+    print_results(results, baseline)
+    if baseline:
+        print(f"\nChanges are relative to {baseline['commit']}{' (with local changes)' if baseline['dirty'] else ''}")
+    print(f"\nSaved results to {output_path}")
+
+
+if __name__ == "__main__":
+    main(parse_arguments())
@@ -0,0 +1,139 @@
+"""
+Quantized Embedding Store Benchmark
+
+This script compares exact float32 search against the quantized embedding
+store, reporting the resident memory of each, the latency of a top-10 search
+and the recall@10 of the quantized store against exact search.
+
+Embeddings are read from an embedded dataset on disk when --input-path is
+given, and otherwise generated as clustered synthetic vectors.
+"""
+
+import sys
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# The embedding store is shared with the app's services
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+from services.quantized_store import CODE_DTYPES, QuantizedEmbeddingStore
+
+# Number of results compared for recall
+TOP_K = 10
+
+
+def synthetic_embeddings(count: int, dim: int, seed: int) -> np.ndarray:
+    """
+    Generate clustered unit-length vectors resembling product embeddings.
+
+    Args:
+        count (int): Number of vectors
+        dim (int): Dimensionality of each vector
+        seed (int): Random seed
+
+    Returns:
+        np.ndarray: Float32 matrix with one vector per row
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(count // 100, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def time_searches(search: Callable[[np.ndarray], np.ndarray], queries: np.ndarray) -> Dict[str, float]:
+    """
+    Run a search for every query and summarize the latencies.
+
+    Args:
+        search (Callable[[np.ndarray], np.ndarray]): Function returning the top rows for a query
+        queries (np.ndarray): Query vectors
+
+    Returns:
+        Dict[str, float]: p50 and p95 latency in milliseconds
+    """
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"p50": float(np.percentile(latencies, 50)), "p95": float(np.percentile(latencies, 95))}
+
+
+def recall_at_k(expected: List[np.ndarray], actual: List[np.ndarray]) -> float:
+    """
+    Compute the mean fraction of the exact top-k results that were returned.
+
+    Args:
+        expected (List[np.ndarray]): Exact top rows for each query
+        actual (List[np.ndarray]): Approximate top rows for each query
+
+    Returns:
+        float: Mean recall
+    """
+    return float(np.mean([len(set(e) & set(a)) / len(e) for e, a in zip(expected, actual)]))
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the quantized embedding store')
+    parser.add_argument('--input-path', type=str, default=None,
+                        help='Path to an embedded dataset on disk (default: synthetic embeddings)')
+    parser.add_argument('--count', type=int, default=50000, help='Number of synthetic embeddings (default: 50000)')
+    parser.add_argument('--dim', type=int, default=1536, help='Dimensionality of synthetic embeddings (default: 1536)')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries (default: 200)')
+    parser.add_argument('--rerank', type=int, default=200, help='Candidates reranked exactly (default: 200)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    if args.input_path:
+        from datasets import load_from_disk
+        vectors = np.asarray(load_from_disk(args.input_path).with_format("numpy")["embedding"], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        vectors = synthetic_embeddings(args.count, args.dim, args.seed)
+    keys = [str(i) for i in range(len(vectors))]
+
+    # Queries are perturbed catalog vectors, like prompts close to real products
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = queries + 0.5 * rng.normal(size=queries.shape).astype(np.float32) / np.sqrt(vectors.shape[1])
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    def exact_search(query: np.ndarray) -> np.ndarray:
+        similarities = vectors @ query
+        top = np.argpartition(-similarities, TOP_K - 1)[:TOP_K]
+        return top[np.argsort(-similarities[top])]
+
+    expected = [exact_search(query) for query in queries]
+    print(f"{len(vectors)} embeddings of dimension {vectors.shape[1]}, {len(queries)} queries\n")
+    print(f"{'store':<10} {'resident MiB':>13} {'p50 ms':>8} {'p95 ms':>8} {'recall@10':>10}")
+
+    latency = time_searches(exact_search, queries)
+    print(f"{'float32':<10} {vectors.nbytes / 2**20:>13.1f} {latency['p50']:>8.2f} {latency['p95']:>8.2f} {1.0:>10.4f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for code_dtype in CODE_DTYPES:
+            store = QuantizedEmbeddingStore.build(keys, vectors, Path(directory) / code_dtype, code_dtype)
+
+            def quantized_search(query: np.ndarray) -> np.ndarray:
+                return store.search(query, args.rerank)[0][:TOP_K]
+
+            actual = [quantized_search(query) for query in queries]
+            latency = time_searches(quantized_search, queries)
+            print(
+                f"{code_dtype:<10} {store.resident_bytes / 2**20:>13.1f} {latency['p50']:>8.2f} "
+                f"{latency['p95']:>8.2f} {recall_at_k(expected, actual):>10.4f}"
+            )
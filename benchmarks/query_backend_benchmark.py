@@ -0,0 +1,143 @@
+"""
+Query Backend Benchmark
+
+This script runs the same vector searches through the Supabase RPC
+(supabase-py and PostgREST) and through a direct asyncpg connection pool,
+checks that both backends return the same rows, and reports the p50/p95
+latency of each.
+
+Query embeddings are the stored embeddings of randomly chosen products with
+a little noise added, so every search has matches. Connection settings are
+read from the .env file: SUPABASE_URL and SUPABASE_KEY for the RPC and
+POSTGRES_DSN for asyncpg.
+"""
+
+import sys
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+import numpy as np
+from dotenv import load_dotenv
+from supabase import create_client
+
+# The query services are shared with the app's services
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+from services.query_service import QueryService
+from services.postgres_query_service import DEFAULT_EF_SEARCH, PostgresQueryService
+
+load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
+# Filters applied to every other search, to cover the filtered plan too
+SAMPLE_FILTERS: Dict[str, Any] = {"max_price": 50, "min_avg_rating": 4}
+
+
+async def time_searches(
+    search: Callable[[List[float], Dict[str, Any]], Awaitable[List[Dict[str, Any]]]],
+    queries: List[List[float]],
+    repeat: int
+) -> Dict[str, Any]:
+    """
+    Run every query through a backend and summarize the latencies.
+
+    Args:
+        search (Callable[[List[float], Dict[str, Any]], Awaitable[List[Dict[str, Any]]]]):
+            Function returning the rows of a search
+        queries (List[List[float]]): Query embeddings
+        repeat (int): Number of times each query is run
+
+    Returns:
+        Dict[str, Any]: p50 and p95 latency in milliseconds, and the rows of
+                        the last run of each query
+    """
+    latencies = []
+    results = []
+    for i, query in enumerate(queries):
+        filters = SAMPLE_FILTERS if i % 2 else {}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = await search(query, filters)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results.append(rows)
+    return {
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "results": results
+    }
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the Supabase RPC against a direct asyncpg pool')
+    parser.add_argument('--queries', type=int, default=50, help='Number of query embeddings (default: 50)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each query per backend (default: 5)')
+    parser.add_argument('--noise', type=float, default=0.02, help='Noise added to each query embedding (default: 0.02)')
+    parser.add_argument('--ef-search', type=int, default=DEFAULT_EF_SEARCH,
+                        help=f'HNSW candidate list size of the asyncpg connections (default: {DEFAULT_EF_SEARCH})')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> None:
+    """
+    Run the benchmark.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+    """
+    rng = np.random.default_rng(args.seed)
+    supabase_service = QueryService(create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")))
+    postgres_service = PostgresQueryService(os.getenv("POSTGRES_DSN"), ef_search=args.ef_search)
+
+    pool = await postgres_service.pool()
+    rows = await pool.fetch(
+        "SELECT embedding FROM fashion_product_embeddings ORDER BY random() LIMIT $1", args.queries
+    )
+    queries = []
+    for row in rows:
+        vector = np.asarray(row["embedding"]) + rng.normal(scale=args.noise, size=len(row["embedding"]))
+        queries.append((vector / np.linalg.norm(vector)).tolist())
+
+    backends = {
+        "supabase rpc": supabase_service,
+        "asyncpg": postgres_service
+    }
+    summaries = {}
+    for name, service in backends.items():
+        async def search(query: List[float], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+            return (await service.query_postgres(query, filters))["response"]
+        # Warm up connections and prepared statements before timing
+        await search(queries[0], {})
+        summaries[name] = await time_searches(search, queries, args.repeat)
+    await postgres_service.close()
+
+    print(f"{'backend':<14} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, summary in summaries.items():
+        print(f"{name:<14} {summary['p50']:>8.1f} {summary['p95']:>8.1f}")
+
+    mismatches = [
+        i for i, (rpc_rows, asyncpg_rows) in enumerate(zip(
+            summaries["supabase rpc"]["results"], summaries["asyncpg"]["results"]
+        ))
+        if [row["parent_asin"] for row in rpc_rows] != [row["parent_asin"] for row in asyncpg_rows]
+        or not all(
+            np.isclose(a["cosine_distance"], b["cosine_distance"])
+            and {k: v for k, v in a.items() if k != "cosine_distance"} == {k: v for k, v in b.items() if k != "cosine_distance"}
+            for a, b in zip(rpc_rows, asyncpg_rows)
+        )
+    ]
+    print(f"\n{len(queries) - len(mismatches)} of {len(queries)} queries returned identical rows")
+    if mismatches:
+        print(f"Mismatched queries: {mismatches}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_arguments()))
@@ -0,0 +1,134 @@
+"""
+Serialization Benchmark
+
+This script compares the cost of rendering a search result page the way
+FastAPI does by default (`jsonable_encoder` followed by the standard library
+JSON encoder) against the API's orjson and MessagePack responses, and reports
+the size of each body before and after gzip and Brotli compression.
+
+Result pages are synthetic, with the nested image URLs and fields returned by
+the get_fashion_items RPC, either with every field or with the compact
+default projection.
+"""
+
+import sys
+import argparse
+import gzip
+import json
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+# The serializers are shared with the app's services
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+from services.serialization import dumps_json, msgpack
+from services.compression import brotli
+from services.projection import DEFAULT_SEARCH_FIELDS, project
+
+
+def result_item(rng: random.Random, index: int) -> Dict[str, Any]:
+    """
+    Build a search result resembling a row of the get_fashion_items RPC.
+
+    Args:
+        rng (random.Random): Random number generator
+        index (int): Position of the item, used to vary its identifiers
+
+    Returns:
+        Dict[str, Any]: The item, with a ranking score
+    """
+    image_count = rng.randint(3, 8)
+    image_ids = [f"{rng.getrandbits(64):016x}" for _ in range(image_count)]
+    return {
+        "parent_asin": f"B0{index:08d}",
+        "title": f"Women's Casual Long Sleeve Knit Sweater Pullover Top {index}",
+        "images": {
+            size: [f"https://m.media-amazon.com/images/I/{image_id}._AC_{suffix}_.jpg" for image_id in image_ids]
+            for size, suffix in (("thumb", "US40"), ("large", "SX466"), ("hi_res", "SL1500"))
+        } | {"variant": ["MAIN"] + [f"PT0{i}" for i in range(1, image_count)]},
+        "average_rating": round(rng.uniform(1, 5), 1),
+        "rating_number": rng.randint(0, 20000),
+        "price": round(rng.uniform(5, 200), 2) if rng.random() > 0.2 else None,
+        "store": rng.choice(["Amazon Essentials", "Levi's", "Hanes", "Generic"]),
+        "cosine_distance": rng.uniform(0.3, 0.7),
+        "discontinued_item": rng.random() < 0.05,
+        "score": rng.random()
+    }
+
+
+def time_call(function: Callable[[], Any], repeat: int) -> float:
+    """
+    Measure the median duration of a function call.
+
+    Args:
+        function (Callable[[], Any]): The function to call
+        repeat (int): Number of calls
+
+    Returns:
+        float: Median duration in microseconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1e6)
+    return float(np.median(durations))
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Benchmark response serialization and compression')
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[10, 100],
+                        help='Numbers of items per result page (default: 10 100)')
+    parser.add_argument('--repeat', type=int, default=500, help='Calls timed per measurement (default: 500)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    rng = random.Random(args.seed)
+
+    serializers: Dict[str, Callable[[Any], bytes]] = {
+        "stdlib json": lambda content: json.dumps(jsonable_encoder(content)).encode(),
+        "orjson": dumps_json
+    }
+    if msgpack is not None:
+        serializers["msgpack"] = lambda content: msgpack.packb(content, use_bin_type=True)
+    else:
+        print("msgpack is not installed, skipping MessagePack\n")
+    if brotli is None:
+        print("brotli is not installed, skipping Brotli\n")
+
+    print(f"{'page':<14} {'serializer':<12} {'encode us':>10} {'bytes':>9} {'gzip':>8} {'gzip us':>9} {'br':>8} {'br us':>8}")
+    for page_size in args.page_sizes:
+        items: List[Dict[str, Any]] = [result_item(rng, i) for i in range(page_size)]
+        pages = {
+            f"{page_size} full": items,
+            f"{page_size} compact": [project(item, DEFAULT_SEARCH_FIELDS) for item in items]
+        }
+        for page_name, page in pages.items():
+            content = {"response": page, "recommendation": "Try these sweaters.", "warnings": [], "filters": {}, "cursor": None}
+            for name, serialize in serializers.items():
+                body = serialize(content)
+                encode_us = time_call(lambda: serialize(content), args.repeat)
+                gzipped = gzip.compress(body, compresslevel=6)
+                gzip_us = time_call(lambda: gzip.compress(body, compresslevel=6), args.repeat)
+                if brotli is not None:
+                    brotli_size = str(len(brotli.compress(body, quality=4)))
+                    brotli_us = f"{time_call(lambda: brotli.compress(body, quality=4), args.repeat):.0f}"
+                else:
+                    brotli_size = brotli_us = "-"
+                print(
+                    f"{page_name:<14} {name:<12} {encode_us:>10.0f} {len(body):>9} {len(gzipped):>8} "
+                    f"{gzip_us:>9.0f} {brotli_size:>8} {brotli_us:>8}"
+                )
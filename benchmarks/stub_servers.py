@@ -0,0 +1,409 @@
+"""
+OpenAI and Supabase Stand-ins
+
+This script serves local stand-ins for the endpoints the API calls, so that
+it can be load tested offline without spending on OpenAI or loading the
+hosted Supabase project:
+
+- `POST /v1/responses`: filter extraction and recommendations, answered with
+  canned JSON, or as a stream of text deltas when `stream` is set
+- `POST /v1/embeddings`: embeddings of prompts, each close to the embedding
+  of one catalog item so that every search has matches
+- `POST /rest/v1/rpc/get_fashion_items`: vector search over the catalog,
+  with the RPC's threshold, filters and ordering, and PostgREST's `select`;
+  like PostgREST, it answers 404 unless every argument of the function is given
+- `GET /rest/v1/fashion_products`: item lookups by `parent_asin=in.(...)`
+
+The catalog is the embedded dataset at --catalog-path when it exists (which
+requires the `datasets` package), and otherwise synthetic products with
+clustered embeddings. Every endpoint waits for a latency drawn from a
+log-normal distribution before answering.
+
+Point the API at the stand-ins with OPENAI_BASE_URL=http://HOST:PORT/v1 and
+SUPABASE_URL=http://HOST:PORT; any API keys are accepted.
+"""
+
+import sys
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# The local query service mirrors the get_fashion_items RPC
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+from services.local_query_service import LocalQueryService
+from services.query_service import MATCH_THRESHOLD
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent.parent / "scripts" / "data" / "amazon_fashion_sample"
+EMBEDDING_DIM = 1536
+STORES = ["Amazon Essentials", "Levi's", "Hanes", "Calvin Klein", "Columbia", "Generic"]
+GARMENTS = ["Sweater", "Dress", "Jeans", "Jacket", "T-Shirt", "Sneakers", "Coat", "Skirt", "Hoodie", "Boots"]
+COLORS = ["Black", "Red", "Navy", "White", "Green", "Beige", "Pink", "Grey"]
+# Arguments of get_fashion_items, none of which has a default
+RPC_ARGUMENTS = [
+    "prompt_embedding", "match_threshold", "match_count", "min_price", "max_price", "min_avg_rating",
+    "max_avg_rating", "min_rating_count", "max_rating_count", "store_name", "discontinued"
+]
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """
+    Log-normal latency of a stand-in endpoint.
+
+    Attributes:
+        median_ms (float): Median latency in milliseconds
+        sigma (float): Standard deviation of the latency's logarithm; 0 makes
+                       the latency constant, and larger values lengthen the tail
+    """
+    median_ms: float
+    sigma: float = 0.5
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Parse a distribution written as MEDIAN_MS or MEDIAN_MS:SIGMA.
+
+        Args:
+            spec (str): The distribution
+
+        Returns:
+            LatencyDistribution: The parsed distribution
+        """
+        median_ms, _, sigma = spec.partition(":")
+        return cls(float(median_ms), float(sigma) if sigma else 0.5)
+
+    def sample(self, rng: np.random.Generator) -> float:
+        """
+        Draw a latency.
+
+        Args:
+            rng (np.random.Generator): Random number generator
+
+        Returns:
+            float: The latency in seconds
+        """
+        return self.median_ms * float(np.exp(rng.normal(0, self.sigma))) / 1000 if self.median_ms > 0 else 0.0
+
+
+def synthetic_catalog(count: int, seed: int) -> LocalQueryService:
+    """
+    Generate products with clustered embeddings, in the database's format.
+
+    Args:
+        count (int): Number of products
+        seed (int): Random seed
+
+    Returns:
+        LocalQueryService: A service searching the products
+    """
+    rng = np.random.default_rng(seed)
+    items = []
+    for i in range(count):
+        image_ids = [f"{rng.integers(2 ** 63):016x}" for _ in range(int(rng.integers(3, 8)))]
+        items.append({
+            "parent_asin": f"B0{i:08d}",
+            "main_category": "AMAZON FASHION",
+            "title": f"{rng.choice(STORES)} Women's {rng.choice(COLORS)} {rng.choice(GARMENTS)} {i}",
+            "average_rating": round(float(rng.uniform(1, 5)), 1),
+            "rating_number": int(rng.integers(0, 20000)),
+            "features": ["Machine Wash", "Imported"],
+            "description": [],
+            "price": round(float(rng.uniform(5, 200)), 2) if rng.random() > 0.2 else None,
+            "images": {
+                size: [f"https://m.media-amazon.com/images/I/{image_id}._AC_{suffix}_.jpg" for image_id in image_ids]
+                for size, suffix in (("thumb", "US40"), ("large", "SX466"), ("hi_res", "SL1500"))
+            } | {"variant": ["MAIN"] + [f"PT0{j}" for j in range(1, len(image_ids))]},
+            "videos": [],
+            "store": str(rng.choice(STORES)),
+            "categories": [],
+            "details": {"Is Discontinued By Manufacturer": "Yes"} if rng.random() < 0.05 else {},
+            "bought_together": None
+        })
+    centers = rng.normal(size=(max(count // 100, 1), EMBEDDING_DIM)).astype(np.float32)
+    embeddings = centers[rng.integers(0, len(centers), count)]
+    embeddings += 0.5 * rng.normal(size=(count, EMBEDDING_DIM)).astype(np.float32)
+    return LocalQueryService(items, embeddings)
+
+
+def load_catalog(catalog_path: Path, synthetic_count: int, seed: int) -> LocalQueryService:
+    """
+    Load the embedded sample dataset, or generate a synthetic catalog without it.
+
+    Args:
+        catalog_path (Path): Path of the embedded dataset on disk
+        synthetic_count (int): Number of synthetic products if the dataset is missing
+        seed (int): Random seed of the synthetic catalog
+
+    Returns:
+        LocalQueryService: A service searching the catalog
+    """
+    if any(catalog_path.glob("*.arrow")):
+        try:
+            return LocalQueryService.from_dataset(catalog_path)
+        except ImportError:
+            print("The datasets package is not installed, using a synthetic catalog")
+    return synthetic_catalog(synthetic_count, seed)
+
+
+def select_row(row: Dict[str, Any], select: str) -> Dict[str, Any]:
+    """
+    Apply a PostgREST `select` to a row.
+
+    Supports plain columns, `*`, and aliased JSON paths such as
+    `thumbnail:images->thumb->>0`.
+
+    Args:
+        row (Dict[str, Any]): The complete row
+        select (str): Comma-separated columns
+
+    Returns:
+        Dict[str, Any]: The selected columns
+    """
+    selected: Dict[str, Any] = {}
+    for column in select.split(","):
+        if column == "*":
+            selected.update(row)
+            continue
+        alias, _, expression = column.rpartition(":")
+        path = re.split(r"->>?", expression)
+        value = row.get(path[0])
+        for key in path[1:]:
+            if isinstance(value, list):
+                value = value[int(key)] if int(key) < len(value) else None
+            elif isinstance(value, dict):
+                value = value.get(key)
+            else:
+                value = None
+        selected[alias or path[0]] = value
+    return selected
+
+
+def response_object(model: str, text: str, input_tokens: int) -> Dict[str, Any]:
+    """
+    Build a completed Responses API object with a single text output.
+
+    Args:
+        model (str): The requested model
+        text (str): The output text
+        input_tokens (int): Tokens reported for the input
+
+    Returns:
+        Dict[str, Any]: The response object
+    """
+    output_tokens = max(len(text) // 4, 1)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": "completed",
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}]
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens
+        }
+    }
+
+
+def create_app(catalog: LocalQueryService, latencies: Dict[str, LatencyDistribution], seed: int) -> FastAPI:
+    """
+    Create the stand-in server.
+
+    Args:
+        catalog (LocalQueryService): The searched catalog
+        latencies (Dict[str, LatencyDistribution]): Latency of the "filters",
+            "recommendation", "embeddings" and "supabase" endpoints
+        seed (int): Random seed of the latencies
+
+    Returns:
+        FastAPI: The stand-in application
+    """
+    app = FastAPI(title="OpenAI and Supabase stand-ins")
+    rng = np.random.default_rng(seed)
+    embeddings = catalog.embeddings
+
+    async def wait(endpoint: str) -> None:
+        await asyncio.sleep(latencies[endpoint].sample(rng))
+
+    def embed(text: str) -> np.ndarray:
+        # Each prompt lands next to a catalog item chosen by its hash
+        digest = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+        prompt_rng = np.random.default_rng(digest)
+        if embeddings is not None:
+            vector = embeddings[digest % len(embeddings)] + 0.01 * prompt_rng.normal(size=embeddings.shape[1])
+        else:
+            vector = prompt_rng.normal(size=EMBEDDING_DIM)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    @app.get("/health")
+    async def health() -> Dict[str, Any]:
+        return {"status": "ok", "items": len(catalog.items)}
+
+    @app.post("/v1/embeddings")
+    async def create_embeddings(request: Request) -> Dict[str, Any]:
+        body = await request.json()
+        inputs = [body["input"]] if isinstance(body["input"], str) else body["input"]
+        await wait("embeddings")
+        data = []
+        for index, text in enumerate(inputs):
+            vector = embed(text)
+            encoded = (
+                base64.b64encode(vector.tobytes()).decode()
+                if body.get("encoding_format") == "base64" else vector.tolist()
+            )
+            data.append({"object": "embedding", "index": index, "embedding": encoded})
+        tokens = sum(max(len(text) // 4, 1) for text in inputs)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body["model"],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        }
+
+    @app.post("/v1/responses")
+    async def create_response(request: Request) -> Any:
+        body = await request.json()
+        schema_name = ((body.get("text") or {}).get("format") or {}).get("name")
+        input_tokens = max(len(json.dumps(body.get("input"))) // 4, 1)
+
+        if schema_name == "filter_schema":
+            await wait("filters")
+            prompt = body["input"][-1]["content"]
+            price = re.search(r"under \$?(\d+)", prompt)
+            text = json.dumps({
+                "is_related_to_fashion": True,
+                "min_price": None,
+                "max_price": float(price.group(1)) if price else None,
+                "min_avg_rating": None,
+                "max_avg_rating": None,
+                "min_rating_count": None,
+                "max_rating_count": None,
+                "store_name": None,
+                "discontinued": None
+            })
+            return response_object(body["model"], text, input_tokens)
+
+        recommendation = "These picks balance style, price and strong reviews, so start with the top result."
+        if not body.get("stream"):
+            await wait("recommendation")
+            text = json.dumps({"response": recommendation}) if schema_name else recommendation
+            return response_object(body["model"], text, input_tokens)
+
+        async def events() -> AsyncIterator[bytes]:
+            # Spread the latency over the deltas, like a model generating text
+            words = recommendation.split(" ")
+            total_latency = latencies["recommendation"].sample(rng)
+            for sequence_number, word in enumerate(words):
+                await asyncio.sleep(total_latency / len(words))
+                event = {
+                    "type": "response.output_text.delta",
+                    "item_id": "msg_stub",
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": word if sequence_number == 0 else " " + word,
+                    "sequence_number": sequence_number
+                }
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+            completed = {
+                "type": "response.completed",
+                "response": response_object(body["model"], recommendation, input_tokens),
+                "sequence_number": len(words)
+            }
+            yield f"event: response.completed\ndata: {json.dumps(completed)}\n\n".encode()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/rest/v1/rpc/get_fashion_items")
+    async def get_fashion_items(request: Request, select: str = "*") -> JSONResponse:
+        body = await request.json()
+        await wait("supabase")
+        # PostgREST only finds the function when every argument is given
+        if set(body) != set(RPC_ARGUMENTS):
+            return JSONResponse({
+                "code": "PGRST202",
+                "details": None,
+                "hint": None,
+                "message": f"Could not find the function public.get_fashion_items({', '.join(sorted(body))})"
+            }, status_code=404)
+        rows = catalog.search(
+            body["prompt_embedding"],
+            body,
+            match_threshold=body.get("match_threshold", MATCH_THRESHOLD),
+            match_count=body.get("match_count", 10)
+        )
+        return JSONResponse([select_row(row, select) for row in rows])
+
+    @app.get("/rest/v1/fashion_products")
+    async def get_fashion_products(select: str = "*", parent_asin: Optional[str] = None) -> JSONResponse:
+        await wait("supabase")
+        asins: List[str] = []
+        if parent_asin and parent_asin.startswith("in.("):
+            asins = [asin.strip('"') for asin in parent_asin[4:-1].split(",") if asin]
+        items = await catalog.get_items(asins)
+        return JSONResponse([select_row(item, select) for item in items.values()])
+
+    return app
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Serve local stand-ins for the OpenAI and Supabase APIs')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8900, help='Port to bind (default: 8900)')
+    parser.add_argument('--catalog-path', type=Path, default=DEFAULT_CATALOG_PATH,
+                        help='Embedded dataset served as the catalog (default: the sample dataset)')
+    parser.add_argument('--synthetic-count', type=int, default=20000,
+                        help='Synthetic products generated if the dataset is missing (default: 20000)')
+    parser.add_argument('--filter-latency', type=LatencyDistribution.parse, default=LatencyDistribution(400, 0.4),
+                        help='Latency of filter extraction, as MEDIAN_MS[:SIGMA] (default: 400:0.4)')
+    parser.add_argument('--recommendation-latency', type=LatencyDistribution.parse,
+                        default=LatencyDistribution(900, 0.4),
+                        help='Latency of recommendations, as MEDIAN_MS[:SIGMA] (default: 900:0.4)')
+    parser.add_argument('--embedding-latency', type=LatencyDistribution.parse, default=LatencyDistribution(150, 0.5),
+                        help='Latency of embeddings, as MEDIAN_MS[:SIGMA] (default: 150:0.5)')
+    parser.add_argument('--supabase-latency', type=LatencyDistribution.parse, default=LatencyDistribution(80, 0.5),
+                        help='Latency of Supabase queries, as MEDIAN_MS[:SIGMA] (default: 80:0.5)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    catalog = load_catalog(args.catalog_path, args.synthetic_count, args.seed)
+    latencies = {
+        "filters": args.filter_latency,
+        "recommendation": args.recommendation_latency,
+        "embeddings": args.embedding_latency,
+        "supabase": args.supabase_latency
+    }
+    uvicorn.run(create_app(catalog, latencies, args.seed), host=args.host, port=args.port, log_level="warning")
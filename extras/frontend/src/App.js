@@ -6,6 +6,12 @@ import ActiveFilters from './components/ActiveFilters';
 
 const API_URL = 'http://localhost:8000';
 
+// Fields shown by ProductCard; searches return a compact set unless asked for more
+const SEARCH_FIELDS = [
+  'parent_asin', 'title', 'images', 'price', 'average_rating',
+  'rating_number', 'store', 'discontinued_item', 'score',
+];
+
 function App() {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(false);
@@ -14,6 +20,28 @@ function App() {
   const [warnings, setWarnings] = useState([]);
   const [filters, setFilters] = useState(null);
 
+  const fetchRecommendation = async (recommendationId) => {
+    try {
+      // Long-poll until the recommendation is ready
+      for (let attempt = 0; attempt < 3; attempt++) {
+        const response = await fetch(`${API_URL}/recommendations/${recommendationId}?wait=10`);
+        if (!response.ok) {
+          return;
+        }
+        const data = await response.json();
+        if (data.status === 'done') {
+          setRecommendation(data.recommendation);
+          return;
+        }
+        if (data.status === 'failed') {
+          return;
+        }
+      }
+    } catch (err) {
+      console.error('Error fetching recommendation:', err);
+    }
+  };
+
   const handleSearch = async (prompt) => {
     setLoading(true);
     setError(null);
@@ -28,7 +56,7 @@ function App() {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ prompt }),
+        body: JSON.stringify({ prompt, fields: SEARCH_FIELDS }),
       });
       
       // Create a delay promise to ensure loading shows for at least 1 second
@@ -46,6 +74,9 @@ function App() {
       // Check for recommendation field (accounting for the typo in the API response)
       if (data.recommentation || data.recommendation) {
         setRecommendation(data.recommentation || data.recommendation);
+      } else if (data.recommendation_id) {
+        // The recommendation is generated after the results; fetch it without blocking them
+        fetchRecommendation(data.recommendation_id);
       }
       
       // Check for warnings field
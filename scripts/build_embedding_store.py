@@ -0,0 +1,67 @@
+"""
+Quantized Embedding Store Build Script
+
+This script builds the quantized embedding store used by the app's local
+query backend, either from the fashion_product_embeddings table in Supabase
+or from an embedded dataset on disk, and saves it to a directory that the
+app loads at startup (see EMBEDDING_STORE_PATH).
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+from build_hnsw_index import load_embeddings_from_disk, load_embeddings_from_supabase
+
+# The embedding store is shared with the app's services
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+from services.quantized_store import CODE_DTYPES, QuantizedEmbeddingStore
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Build the quantized embedding store')
+
+    parser.add_argument(
+        '--input-path',
+        type=str,
+        default=None,
+        help='Path to an embedded dataset on disk (default: read fashion_product_embeddings from Supabase)'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=str,
+        default="data/embedding_store",
+        help='Directory to save the store to (default: data/embedding_store)'
+    )
+
+    parser.add_argument(
+        '--code-dtype',
+        choices=CODE_DTYPES,
+        default="int8",
+        help='Type of the quantized codes scanned on every search (default: int8)'
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    if args.input_path:
+        keys, vectors = load_embeddings_from_disk(args.input_path)
+    else:
+        keys, vectors = load_embeddings_from_supabase()
+
+    store = QuantizedEmbeddingStore.build(keys, vectors, args.output, args.code_dtype)
+    print(
+        f"Saved {len(store)} {args.code_dtype} embeddings to {args.output} "
+        f"({store.resident_bytes / 2**20:.1f} MiB resident, "
+        f"{store.vectors.nbytes / 2**20:.1f} MiB memory-mapped)"
+    )
@@ -0,0 +1,145 @@
+"""
+HNSW Index Build Script
+
+This script builds the in-process HNSW index used by the app's local query
+backend, either from the fashion_product_embeddings table in Supabase or from
+an embedded dataset on disk, and saves it to a directory that the app
+memory-maps at startup (see HNSW_INDEX_PATH).
+"""
+
+import os
+import sys
+import json
+import argparse
+import time
+from pathlib import Path
+from typing import List, Tuple
+from dotenv import load_dotenv
+
+# The HNSW index is shared with the app's services
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+from services.hnsw_index import HNSWIndex
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Number of rows fetched from Supabase per request
+PAGE_SIZE = 1000
+
+
+def load_embeddings_from_supabase() -> Tuple[List[str], List[List[float]]]:
+    """
+    Fetch every product embedding from the fashion_product_embeddings table.
+
+    Returns:
+        Tuple[List[str], List[List[float]]]: Parent ASINs and their embeddings
+    """
+    from supabase import create_client
+
+    supabase_client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+    keys, vectors = [], []
+    start = 0
+    while True:
+        rows = (
+            supabase_client.table("fashion_product_embeddings")
+            .select("parent_asin, embedding")
+            .order("parent_asin")
+            .range(start, start + PAGE_SIZE - 1)
+            .execute()
+        ).data
+        for row in rows:
+            keys.append(row["parent_asin"])
+            # pgvector columns are returned as strings such as "[0.1,0.2]"
+            embedding = row["embedding"]
+            vectors.append(json.loads(embedding) if isinstance(embedding, str) else embedding)
+        print(f"Fetched {len(keys)} embeddings")
+        if len(rows) < PAGE_SIZE:
+            return keys, vectors
+        start += PAGE_SIZE
+
+
+def load_embeddings_from_disk(dataset_path: str) -> Tuple[List[str], List[List[float]]]:
+    """
+    Read the product embeddings from a dataset saved to disk.
+
+    Args:
+        dataset_path (str): Path to the dataset on disk
+
+    Returns:
+        Tuple[List[str], List[List[float]]]: Parent ASINs and their embeddings
+    """
+    from datasets import load_from_disk
+
+    data = load_from_disk(dataset_path)
+    print(f"Loaded {len(data)} records from {dataset_path}")
+    return data["parent_asin"], data["embedding"]
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Parse command line arguments for the script.
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Build the in-process HNSW index')
+
+    parser.add_argument(
+        '--input-path',
+        type=str,
+        default=None,
+        help='Path to an embedded dataset on disk (default: read fashion_product_embeddings from Supabase)'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=str,
+        default="data/hnsw_index",
+        help='Directory to save the index to (default: data/hnsw_index)'
+    )
+
+    parser.add_argument(
+        '--M',
+        type=int,
+        default=16,
+        help='Maximum number of neighbors per node on the upper layers (default: 16)'
+    )
+
+    parser.add_argument(
+        '--ef-construction',
+        type=int,
+        default=200,
+        help='Candidate list size while building; higher builds a better graph more slowly (default: 200)'
+    )
+
+    parser.add_argument(
+        '--ef-search',
+        type=int,
+        default=64,
+        help='Default candidate list size for searches, saved with the index (default: 64)'
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    if args.input_path:
+        keys, vectors = load_embeddings_from_disk(args.input_path)
+    else:
+        keys, vectors = load_embeddings_from_supabase()
+
+    print(f"Building HNSW index over {len(keys)} embeddings...")
+    start = time.perf_counter()
+    index = HNSWIndex.build(
+        keys,
+        vectors,
+        M=args.M,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search
+    )
+    print(f"Built index in {time.perf_counter() - start:.1f}s")
+
+    index.save(args.output)
+    print(f"Saved index to {args.output}")
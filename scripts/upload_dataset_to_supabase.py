@@ -7,13 +7,20 @@ enriched data to disk for later use in search applications.
 """
 
 import os
+import sys
 import argparse
+from pathlib import Path
 from supabase import create_client, Client
 from openai import OpenAI
 import threading
+from typing import Any, Optional
 from dotenv import load_dotenv
 from datasets import load_dataset, load_from_disk
-from utils import upsert_fashion_product, process_product
+from utils import upsert_fashion_product, process_product, invalidate_cached_items
+
+# The HNSW index is shared with the app's services
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
+from services.hnsw_index import HNSWIndex
 
 # Load environment variables from .env file
 load_dotenv()
@@ -32,36 +39,55 @@ def process_dataset_from_huggingface_hub(
     split: str,
     limit: int,
     num_proc: int
-) -> None:
+) -> Any:
     """
     Process a dataset from Hugging Face Hub.
     
+    Embeddings are generated for each product, and the products whose
+    embedding could be generated are upserted into the database.
+    
     Args:
         dataset_name (str): Name of the dataset on Hugging Face Hub
         data_files (str): Specific data files to load
         split (str): Dataset split to use (e.g., "train", "full")
         limit (int): Maximum number of records to process
         num_proc (int): Number of processes to use for parallel processing
+    
+    Returns:
+        Dataset: The uploaded products, with an "embedding" column
     """
     # Load the dataset using the specified parameters
     dataset = load_dataset(dataset_name, data_files, split=split)
     print(f"Loaded dataset with {len(dataset)} records")
     dataset = dataset.select(range(min(limit, len(dataset))))
-    dataset.map(
+    data = dataset.map(
         lambda x: process_product(x, openai_client), 
         num_proc=num_proc,
         remove_columns=[]
     )
+    
+    # Products whose processing failed are left without an embedding
+    data = data.filter(lambda x: x.get("embedding") is not None, num_proc=num_proc)
+    print(f"Generated embeddings for {len(data)} records")
+    
+    data.map(
+        lambda x: upsert_fashion_product(supabase_client, x, x['embedding']), 
+        num_proc=num_proc, 
+        remove_columns=[]
+    )
+    return data
 
-def process_dataset_from_disk(dataset_path: str, limit: int, num_proc: int) -> None:
+def process_dataset_from_disk(dataset_path: str, limit: int, num_proc: int) -> Any:
     """
     Process a dataset from a local file path.
     
     Args:
         dataset_path (str): Path to the dataset on disk
-        
+        limit (int): Maximum number of records to process
+        num_proc (int): Number of processes to use for parallel processing
+    
     Returns:
-        Dataset: A Hugging Face dataset object
+        Dataset: The uploaded products, with an "embedding" column
     """
     
     # Load the dataset from disk
@@ -72,9 +98,64 @@ def process_dataset_from_disk(dataset_path: str, limit: int, num_proc: int) -> N
     
     data.map(
         lambda x: upsert_fashion_product(supabase_client, x, x['embedding'] ), 
-        num_proc=args.num_proc, 
+        num_proc=num_proc, 
         remove_columns=[]
     )
+    return data
+
+
+def refresh_after_upload(
+    data: Any,
+    hnsw_index_path: Optional[str] = None,
+    api_url: Optional[str] = None
+) -> None:
+    """
+    Make uploaded products visible to the in-process index and a running API.
+
+    Runs after either upload path, so products from the Hugging Face Hub
+    and from disk are indexed and invalidated alike.
+
+    Args:
+        data (Dataset): The uploaded products, with an "embedding" column
+        hnsw_index_path (Optional[str]): Directory of an in-process HNSW index
+                                         to insert the uploaded embeddings into
+        api_url (Optional[str]): Base URL of a running API whose item cache
+                                 should drop the uploaded products, using the
+                                 ADMIN_TOKEN environment variable
+    """
+    if len(data) == 0:
+        return
+
+    if hnsw_index_path:
+        update_hnsw_index_file(hnsw_index_path, data)
+    
+    if api_url:
+        invalidated = invalidate_cached_items(api_url, data["parent_asin"], os.getenv("ADMIN_TOKEN"))
+        print(f"Invalidated {invalidated} cached items at {api_url}")
+
+
+def update_hnsw_index_file(hnsw_index_path: str, data: Any) -> None:
+    """
+    Insert the embeddings of uploaded products into an on-disk HNSW index.
+
+    The upserts run in worker processes, so the index is updated afterwards
+    in this process. Products already in the index are updated in place,
+    and a missing index is created. A running API loads the index only at
+    startup, so it must be restarted to search the new embeddings.
+
+    Args:
+        hnsw_index_path (str): Directory of the HNSW index
+        data (Dataset): The uploaded products, with an "embedding" column
+    """
+    if (Path(hnsw_index_path) / "meta.json").exists():
+        hnsw_index = HNSWIndex.load(hnsw_index_path, mmap=False)
+    else:
+        hnsw_index = HNSWIndex(dim=len(data[0]["embedding"]))
+
+    print(f"Inserting {len(data)} embeddings into the HNSW index at {hnsw_index_path}")
+    for parent_asin, embedding in zip(data["parent_asin"], data["embedding"]):
+        hnsw_index.insert(parent_asin, embedding)
+    hnsw_index.save(hnsw_index_path)
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -117,6 +198,26 @@ def parse_arguments() -> argparse.Namespace:
         help='Path to the dataset on disk (required if --generate-embeddings is not used)'
     )
 
+    parser.add_argument(
+        '--hnsw-index-path', 
+        type=str, 
+        default=None,
+        help='Directory of an in-process HNSW index to update with the uploaded embeddings'
+    )
+    
+    parser.add_argument(
+        '--api-url', 
+        type=str, 
+        default=None,
+        help='Base URL of a running Fashion Query API whose item cache should drop the uploaded products (requires ADMIN_TOKEN)'
+    )
+    
+    parser.add_argument(
+        '--skip-reindex', 
+        action='store_true',
+        help='Skip rebuilding the Postgres HNSW index after the upload'
+    )
+
     # Parse the arguments
     args = parser.parse_args()
 
@@ -124,6 +225,10 @@ def parse_arguments() -> argparse.Namespace:
     if not args.generate_embeddings and not args.input_path:
         parser.error('--input-path is required when --generate-embeddings is not used')
 
+    # The API only accepts invalidations with its admin token
+    if args.api_url and not os.getenv("ADMIN_TOKEN"):
+        parser.error('--api-url requires the ADMIN_TOKEN environment variable')
+
     return args
 
 
@@ -133,7 +238,7 @@ if __name__ == "__main__":
         
     # Handle loading from Hugging Face or local dataset     
     if args.generate_embeddings:
-        process_dataset_from_huggingface_hub(
+        data = process_dataset_from_huggingface_hub(
             "McAuley-Lab/Amazon-Reviews-2023",
             "raw_meta_Amazon_Fashion",
             "full",
@@ -141,10 +246,13 @@ if __name__ == "__main__":
             args.num_proc
         )
     else:
-        process_dataset_from_disk(args.input_path, args.limit, args.num_proc)
+        data = process_dataset_from_disk(args.input_path, args.limit, args.num_proc)
+    
+    refresh_after_upload(data, args.hnsw_index_path, args.api_url)
     
     # Re-index the HNSW index on the embeddings table
-    print("Updating HNSW index...")
-    supabase_client.rpc('update_hnsw_index').execute()
-    print("Index update complete!")
+    if not args.skip_reindex:
+        print("Updating HNSW index...")
+        supabase_client.rpc('update_hnsw_index').execute()
+        print("Index update complete!")
     
\ No newline at end of file
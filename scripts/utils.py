@@ -11,6 +11,7 @@ import json
 from typing import Dict, List, Any, Optional, Union
 import traceback
 import threading
+import urllib.request
 from time import sleep
 
 # Add a lock for thread-safe printing in multiprocessing
@@ -152,6 +153,36 @@ def generate_product_embedding(
     return response.data[0].embedding
 
 
+# Product fields upserted with the product, each passed as a "p_"-prefixed parameter
+UPSERT_FIELDS = [
+    "main_category", "title", "average_rating", "rating_number", "features", "description",
+    "price", "images", "videos", "store", "categories", "details", "bought_together"
+]
+_UPSERT_PARAMETERS = [(field, "p_" + field) for field in UPSERT_FIELDS]
+
+
+def build_upsert_payload(product: Dict[str, Any], embedding: List[float]) -> Dict[str, Any]:
+    """
+    Build the parameters of the 'upsert_fashion_product' RPC for a product.
+
+    The dataset stores missing values as the string "None", which is
+    converted to an actual None so the database stores null.
+
+    Args:
+        product (Dict[str, Any]): Product data dictionary
+        embedding (List[float]): Vector embedding for the product
+
+    Returns:
+        Dict[str, Any]: The RPC parameters
+    """
+    payload = {"p_parent_asin": product["parent_asin"]}
+    for field, parameter in _UPSERT_PARAMETERS:
+        value = product[field]
+        payload[parameter] = None if value == "None" else value
+    payload["p_embedding"] = embedding
+    return payload
+
+
 def upsert_fashion_product(
     supabase_client: Any, 
     product: Dict[str, Any], 
@@ -172,30 +203,41 @@ def upsert_fashion_product(
     Returns:
         None
     """
-    # Process each field to convert "None" strings to actual None values
-    # This ensures proper handling of null values in the database
-    response = (
-        supabase_client.rpc(
-            "upsert_fashion_product",
-            {
-                "p_parent_asin": product["parent_asin"],
-                "p_main_category": product["main_category"] if product["main_category"] != "None" else None,
-                "p_title": product["title"] if product["title"] != "None" else None,
-                "p_average_rating": product["average_rating"] if product["average_rating"] != "None" else None,
-                "p_rating_number": product["rating_number"] if product["rating_number"] != "None" else None,
-                "p_features": product["features"] if product["features"] != "None" else None,
-                "p_description": product["description"] if product["description"] != "None" else None,
-                "p_price": product["price"] if product["price"] != "None" else None,
-                "p_images": product["images"] if product["images"] != "None" else None,
-                "p_videos": product["videos"] if product["videos"] != "None" else None,
-                "p_store": product["store"] if product["store"] != "None" else None,
-                "p_categories": product["categories"] if product["categories"] != "None" else None,
-                "p_details": product["details"] if product["details"] != "None" else None,
-                "p_bought_together": product["bought_together"] if product["bought_together"] != "None" else None,
-                "p_embedding": embedding
-            }
-        ).execute()
-    )
+    supabase_client.rpc("upsert_fashion_product", build_upsert_payload(product, embedding)).execute()
+    
+    
+def invalidate_cached_items(
+    api_url: str,
+    parent_asins: List[str],
+    admin_token: str,
+    batch_size: int = 1000
+) -> int:
+    """
+    Ask a running Fashion Query API to drop rewritten products from its item cache.
+    
+    Should be called after upserting products, so that the API does not keep
+    serving their previous data until the cache entries expire.
+    
+    Args:
+        api_url (str): Base URL of the API, e.g. http://127.0.0.1:8000
+        parent_asins (List[str]): Parent ASINs of the upserted products
+        admin_token (str): The API's ADMIN_TOKEN, sent in the X-Admin-Token header
+        batch_size (int): Number of ASINs sent per request
+    
+    Returns:
+        int: Number of products that were cached by the API
+    """
+    invalidated = 0
+    for start in range(0, len(parent_asins), batch_size):
+        request = urllib.request.Request(
+            f"{api_url.rstrip('/')}/items/invalidate",
+            data=json.dumps({"asins": parent_asins[start:start + batch_size]}).encode(),
+            headers={"Content-Type": "application/json", "X-Admin-Token": admin_token},
+            method="POST"
+        )
+        with urllib.request.urlopen(request) as response:
+            invalidated += json.load(response)["invalidated"]
+    return invalidated
     
     
 def process_product(product: Dict[str, Any], openai_client: OpenAI) -> Optional[Dict[str, Any]]:
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The services are imported the way the app imports them, from the app directory
+sys.path.append(str(Path(__file__).resolve().parent.parent / "app"))
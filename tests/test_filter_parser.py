@@ -0,0 +1,44 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from services.filter_parser import FilterParser
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "app" / "schemas" / "filter_schema.json"
+
+
+@pytest.fixture
+def parser():
+    return FilterParser(json.loads(SCHEMA_PATH.read_text()), known_stores=["Levi's", "Amazon Essentials"])
+
+
+@pytest.mark.parametrize("prompt", [
+    "ring light",
+    "belt sander",
+    "watch dogs game",
+    "flat iron",
+    "shoe rack",
+    "suit yourself",
+    "bow and arrow"
+])
+def test_prompts_with_other_meanings_are_left_to_the_llm(parser, prompt):
+    assert parser.parse(prompt) is None
+
+
+@pytest.mark.parametrize("prompt", ["dresses", "jeans", "Sneakers"])
+def test_fashion_terms_alone_skip_the_llm(parser, prompt):
+    filters, is_fashion_related = parser.parse(prompt)
+    assert is_fashion_related
+    assert all(value is None for value in filters.values())
+
+
+def test_parsed_filters_skip_the_llm(parser):
+    filters, is_fashion_related = parser.parse("red summer dress under $50 from Levi's")
+    assert is_fashion_related
+    assert filters["max_price"] == 50
+    assert filters["store_name"] == "Levi's"
+
+
+def test_unparsed_descriptions_are_left_to_the_llm(parser):
+    assert parser.parse("red summer dress") is None
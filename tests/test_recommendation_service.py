@@ -0,0 +1,56 @@
+import asyncio
+
+from services.cache import LRUCache
+from services.recommendation_service import RecommendationService
+
+
+def items(index):
+    return [{"parent_asin": f"B{index:04d}"}]
+
+
+def test_jobs_beyond_the_queue_are_refused():
+    async def run():
+        release = asyncio.Event()
+        started = []
+
+        async def generate(prompt, ranked_items):
+            started.append(prompt)
+            await release.wait()
+            return f"recommendation for {prompt}"
+
+        service = RecommendationService(LRUCache(100), max_concurrency=2, max_queue_size=3)
+        ids = [service.submit(f"prompt {i}", items(i), generate) for i in range(4)]
+        assert all(ids[:3]) and ids[3] is None
+        # The workers take two jobs off the queue, making room for two more
+        await asyncio.sleep(0)
+        ids += [service.submit(f"prompt {i}", items(i), generate) for i in range(4, 8)]
+
+        assert all(ids[4:6]) and ids[6:] == [None, None]
+        assert len(started) == 2
+        assert service.stats()["rejected"] == 3
+
+        release.set()
+        accepted = [recommendation_id for recommendation_id in ids if recommendation_id is not None]
+        results = [await service.wait(recommendation_id, timeout=1) for recommendation_id in accepted]
+        assert [result["status"] for result in results] == ["done"] * 5
+        assert service.stats()["pending"] == 0
+
+    asyncio.run(run())
+
+
+def test_finished_recommendations_are_not_queued_again():
+    async def run():
+        calls = []
+
+        async def generate(prompt, ranked_items):
+            calls.append(prompt)
+            return "text"
+
+        service = RecommendationService(LRUCache(100), max_concurrency=1, max_queue_size=1)
+        recommendation_id = service.submit("boots", items(0), generate)
+        assert (await service.wait(recommendation_id, timeout=1))["recommendation"] == "text"
+        assert service.submit("Boots", items(0), generate) == recommendation_id
+        assert service.peek(recommendation_id) == "text"
+        assert calls == ["boots"]
+
+    asyncio.run(run())
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from services.cache import LRUCache
+from services.query_service import MATCH_COUNT, MAX_MATCH_COUNT, QueryService
+from services.search_service import SearchService
+
+
+class RecordingRequest:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, *columns):
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows)
+
+
+class RecordingSupabase:
+    """Records the parameters of every RPC call."""
+
+    def __init__(self):
+        self.rpc_calls = []
+
+    def rpc(self, name, params):
+        self.rpc_calls.append((name, params))
+        return RecordingRequest([])
+
+
+class CatalogSupabase(RecordingSupabase):
+    """Returns as many matching rows as requested, nearest first."""
+
+    def rpc(self, name, params):
+        super().rpc(name, params)
+        return RecordingRequest([
+            {"parent_asin": f"B{i:03d}", "title": f"Item {i}", "cosine_distance": i / 1000,
+             "average_rating": 4.0, "rating_number": i, "price": 10.0, "images": None}
+            for i in range(params["match_count"])
+        ])
+
+
+class FailingResponses:
+    async def create(self, **kwargs):
+        raise RuntimeError("filter extraction failed")
+
+
+class FixedEmbeddings:
+    async def generate_prompt_embedding(self, prompt):
+        return [0.1] * 1536
+
+
+class RejectingEmbeddings(FixedEmbeddings):
+    """Fails like the embeddings API for any request containing an invalid prompt."""
+
+    async def generate_prompt_embedding(self, prompt):
+        if prompt == "invalid":
+            raise ValueError("invalid input")
+        return await super().generate_prompt_embedding(prompt)
+
+    async def generate_prompt_embeddings(self, prompts):
+        return [await self.generate_prompt_embedding(prompt) for prompt in prompts]
+
+
+class FashionFilters:
+    async def create(self, **kwargs):
+        return SimpleNamespace(output_text=json.dumps({
+            "is_related_to_fashion": True, "min_price": None, "max_price": None, "min_avg_rating": None,
+            "max_avg_rating": None, "min_rating_count": None, "max_rating_count": None, "store_name": None,
+            "discontinued": None
+        }), usage=None)
+
+
+def test_degraded_filters_send_every_filter_argument():
+    supabase = RecordingSupabase()
+    service = SearchService(
+        SimpleNamespace(responses=FailingResponses()),
+        FixedEmbeddings(),
+        QueryService(supabase),
+        use_filter_parser=False
+    )
+
+    response = asyncio.run(service.search("something to wear"))
+
+    assert "filters" in response["skipped_stages"]
+    name, params = supabase.rpc_calls[-1]
+    assert name == "get_fashion_items"
+    for key in service.filter_keys:
+        assert key in params and params[key] is None
+
+
+def test_an_invalid_prompt_only_fails_its_own_batch_result():
+    service = SearchService(
+        SimpleNamespace(responses=FashionFilters()),
+        RejectingEmbeddings(),
+        QueryService(RecordingSupabase()),
+        use_filter_parser=False
+    )
+
+    results = asyncio.run(service.search_batch(["red dress", "invalid", "blue jeans"]))
+
+    assert [result["prompt"] for result in results] == ["red dress", "invalid", "blue jeans"]
+    assert "error" in results[1]
+    assert "error" not in results[0] and "error" not in results[2]
+    assert results[0]["response"] == [] and results[2]["response"] == []
+
+
+def test_cursors_fetch_remaining_candidates_only_when_paging():
+    supabase = CatalogSupabase()
+    service = SearchService(
+        SimpleNamespace(responses=FashionFilters()),
+        FixedEmbeddings(),
+        QueryService(supabase),
+        use_filter_parser=False,
+        cursor_cache=LRUCache(max_size=10, ttl_seconds=60)
+    )
+
+    async def page_through():
+        response = await service.search("red dress")
+        assert [params["match_count"] for _, params in supabase.rpc_calls] == [MATCH_COUNT + 1]
+        pages = [response["response"]]
+        cursor = response["cursor"]
+        while cursor is not None:
+            page = await service.next_page(cursor, page_size=30)
+            pages.append(page["response"])
+            cursor = page["cursor"]
+        return pages
+
+    pages = asyncio.run(page_through())
+
+    assert len(pages[0]) == MATCH_COUNT
+    assert [params["match_count"] for _, params in supabase.rpc_calls] == [MATCH_COUNT + 1, MAX_MATCH_COUNT]
+    asins = [item["parent_asin"] for page in pages for item in page]
+    assert len(asins) == len(set(asins)) == MAX_MATCH_COUNT
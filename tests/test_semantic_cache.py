@@ -0,0 +1,43 @@
+import numpy as np
+
+from services.filter_parser import filter_tokens
+from services.semantic_cache import SemanticCache
+
+
+def embedding(seed, noise=0.0):
+    rng = np.random.default_rng(seed)
+    vector = rng.normal(size=64)
+    return (vector + noise * np.random.default_rng(seed + 1).normal(size=64)).tolist()
+
+
+def test_prompts_with_different_prices_do_not_share_responses():
+    cache = SemanticCache(max_size=10)
+    cache.store(embedding(0), {"filters": {"max_price": 30}}, filter_tokens("dresses under $30"))
+
+    # A near-identical embedding with another price misses
+    assert cache.lookup(embedding(0, noise=0.01), key=filter_tokens("dresses under $80")) is None
+    hit = cache.lookup(embedding(0, noise=0.01), key=filter_tokens("Dresses under $30"))
+    assert hit == {"filters": {"max_price": 30}}
+
+
+def test_prompts_with_different_stores_do_not_share_responses():
+    cache = SemanticCache(max_size=10)
+    cache.store(embedding(0), {"filters": {}}, filter_tokens("jeans from Levi's"))
+
+    assert cache.lookup(embedding(0), key=filter_tokens("jeans from Wrangler")) is None
+    assert cache.lookup(embedding(0), key=filter_tokens("jeans")) is None
+
+
+def test_modifying_a_hit_does_not_change_the_cache():
+    cache = SemanticCache(max_size=10)
+    response = {"response": [{"title": "Dress", "images": {"thumb": ["a.jpg"]}}], "warnings": []}
+    cache.store(embedding(0), response)
+    response["response"][0]["title"] = "Changed after storing"
+
+    hit = cache.lookup(embedding(0))
+    hit["response"][0]["images"]["thumb"].append("b.jpg")
+    hit["warnings"].append("stale")
+
+    assert cache.lookup(embedding(0)) == {
+        "response": [{"title": "Dress", "images": {"thumb": ["a.jpg"]}}], "warnings": []
+    }